@@ -0,0 +1,166 @@
+"""Whole-scene audit: every overlapping pair and every object outside the room, at once.
+
+Bounds of all objects are computed in one vectorized pass and the colliding pairs found
+by sweep and prune over the sorted x intervals, which costs O(n log n + k) for k
+candidate pairs instead of the O(n^2) of checking each object against all others.
+
+Scene files may be JSON or binary (see scene_binary); binary scenes are audited straight
+from their memory-mapped columns.
+
+Usage: python audit.py scene_state.json [more.json ...] [--mode obb] [--output report.json]
+Exits with 0 if every scene is clean, 1 if any has problems and 2 if any cannot be read.
+"""
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from geometry import rotated_bounds, footprint_corners, obb_overlaps, candidate_pairs
+from scene_binary import BinaryScene, load_scene_file
+
+# Slack in meters before an object counts as outside the room
+BOUNDARY_TOLERANCE = 1e-9
+
+def scene_arrays(scene_data):
+    """Placed objects of a scene_state.json dictionary as (descriptions, (N, 7) array of
+    x, y, z, width, depth, height, rotation), plus the descriptions of unplaced objects."""
+    if isinstance(scene_data, BinaryScene):
+        x, y, z, width, depth, height, rotation = scene_data.columns.astype(float)
+        placed = ~(np.isnan(x) | np.isnan(y))
+        z = np.where(np.isnan(z), height / 2, z)
+        params = np.stack([x, y, z, width, depth, height, rotation], axis=1)[placed]
+        unplaced = [scene_data.descriptions[i] for i in np.flatnonzero(~placed).tolist()]
+        return scene_data.descriptions.take(np.flatnonzero(placed)), params, unplaced
+    placed, unplaced = [], []
+    for obj in scene_data.get("objects", []):
+        if obj.get("x") is None or obj.get("y") is None:
+            unplaced.append(obj["description"])
+        else:
+            placed.append(obj)
+    params = np.array([[obj["x"], obj["y"], obj.get("z") if obj.get("z") is not None else obj["height"] / 2,
+                        obj["width"], obj["depth"], obj["height"], obj.get("rotation", 0)]
+                       for obj in placed], dtype=float).reshape(-1, 7)
+    return [obj["description"] for obj in placed], params, unplaced
+
+def colliding_pairs(params, mode="aabb"):
+    """Index pairs (i < j) of objects whose footprints and height intervals overlap.
+
+    Args:
+        params: (N, 7) array from scene_arrays
+        mode: "aabb" compares the rotated objects' axis-aligned bounds, as
+            dsl.check_overlap_with_existing does; "obb" confirms those hits with a
+            separating-axis test on the rotated footprints
+
+    Returns:
+        (i, j, overlap_x, overlap_y) arrays, the overlaps being those of the bounds
+    """
+    min_x, max_x, min_y, max_y = rotated_bounds(params[:, 0], params[:, 1], params[:, 3], params[:, 4], params[:, 6])
+    min_z = params[:, 2] - params[:, 5] / 2
+    max_z = params[:, 2] + params[:, 5] / 2
+    i, j = candidate_pairs(min_x, max_x)
+    # Objects at disjoint heights (stacked, wall-mounted) do not collide
+    hit = (max_y[i] > min_y[j]) & (min_y[i] < max_y[j]) & (max_z[i] > min_z[j]) & (min_z[i] < max_z[j])
+    i, j = np.minimum(i[hit], j[hit]), np.maximum(i[hit], j[hit])
+
+    if mode == "obb" and len(i):
+        corners = footprint_corners(params[:, :2], params[:, 3:5], params[:, 6])
+        keep = np.zeros(len(i), dtype=bool)
+        for first in np.unique(i):
+            rows = np.flatnonzero(i == first)
+            keep[rows] = obb_overlaps(corners[first], corners[j[rows]])
+        i, j = i[keep], j[keep]
+
+    order = np.lexsort((j, i))
+    i, j = i[order], j[order]
+    overlap_x = np.minimum(max_x[i], max_x[j]) - np.maximum(min_x[i], min_x[j])
+    overlap_y = np.minimum(max_y[i], max_y[j]) - np.maximum(min_y[i], min_y[j])
+    return i, j, overlap_x, overlap_y
+
+def boundary_violations(params, room):
+    """Per-object distance past each wall, floor and ceiling, as a (N, 6) array
+    (WEST, EAST, SOUTH, NORTH, FLOOR, CEILING), zero where inside."""
+    min_x, max_x, min_y, max_y = rotated_bounds(params[:, 0], params[:, 1], params[:, 3], params[:, 4], params[:, 6])
+    min_z = params[:, 2] - params[:, 5] / 2
+    max_z = params[:, 2] + params[:, 5] / 2
+    past = np.stack([-min_x, max_x - room["width"], -min_y, max_y - room["depth"],
+                     -min_z, max_z - room["height"]], axis=1)
+    return np.where(past > BOUNDARY_TOLERANCE, past, 0.0)
+
+SIDES = ["WEST", "EAST", "SOUTH", "NORTH", "FLOOR", "CEILING"]
+
+def audit_scene(scene_data, mode="aabb"):
+    """Audit a scene dictionary in the scene_state.json layout, or a BinaryScene.
+
+    Returns:
+        Report dict: object counts, "collisions" (pairs with their overlap in meters),
+        "out_of_bounds" (objects with the distance past each offending side),
+        "unplaced", "ok" and the audit time in milliseconds
+    """
+    start = time.perf_counter()
+    descriptions, params, unplaced = scene_arrays(scene_data)
+    i, j, overlap_x, overlap_y = colliding_pairs(params, mode)
+    collisions = [{"a": descriptions[a], "b": descriptions[b], "overlap_x": round(ox, 6), "overlap_y": round(oy, 6)}
+                  for a, b, ox, oy in zip(i.tolist(), j.tolist(), overlap_x.tolist(), overlap_y.tolist())]
+
+    out_of_bounds = []
+    room = scene_data.get("room") or {}
+    if all(room.get(key) for key in ("width", "depth", "height")):
+        past = boundary_violations(params, room)
+        for index in np.flatnonzero(past.any(axis=1)).tolist():
+            sides = {side: round(float(value), 6) for side, value in zip(SIDES, past[index]) if value}
+            out_of_bounds.append({"object": descriptions[index], "past": sides})
+
+    return {
+        "objects": len(descriptions) + len(unplaced),
+        "placed": len(descriptions),
+        "mode": mode,
+        "collisions": collisions,
+        "out_of_bounds": out_of_bounds,
+        "unplaced": unplaced,
+        "ok": not collisions and not out_of_bounds,
+        "elapsed_ms": round((time.perf_counter() - start) * 1e3, 3),
+    }
+
+def audit_file(json_file, mode="aabb"):
+    """Audit a scene file; returns the report, or None if the file cannot be read."""
+    try:
+        scene_data = load_scene_file(json_file)
+    except FileNotFoundError:
+        print(f"[Error] JSON file '{json_file}' not found.", file=sys.stderr)
+        return None
+    except json.JSONDecodeError:
+        print(f"[Error] Invalid JSON format in '{json_file}'.", file=sys.stderr)
+        return None
+    except ValueError as e:
+        print(f"[Error] {e}", file=sys.stderr)
+        return None
+    report = audit_scene(scene_data, mode)
+    report["scene"] = json_file
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report overlapping objects and objects outside the room.")
+    parser.add_argument("scenes", nargs="+", help="scene files (JSON or binary)")
+    parser.add_argument("--mode", choices=["aabb", "obb"], default="aabb", help="collision test (default aabb)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    reports = [audit_file(path, args.mode) for path in args.scenes]
+    readable = [report for report in reports if report is not None]
+    text = json.dumps(readable[0] if len(args.scenes) == 1 and readable else readable, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        for report in readable:
+            print(f"[Audit] {report['scene']}: {len(report['collisions'])} collision(s), "
+                  f"{len(report['out_of_bounds'])} out of bounds, {len(report['unplaced'])} unplaced")
+    else:
+        print(text)
+
+    if len(readable) < len(reports):
+        return 2
+    return 0 if all(report["ok"] for report in readable) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+"""Benchmarks for the scene pipeline.
+
+- scenes: synthetic rooms at any object count
+- corpus: natural-language commands for every classifier command type
+- stub_model: offline stand-ins for the BERT tokenizer and classifier
+- run: times each subsystem on its own and stores the results as JSON
+
+Run the suite from the repository root with `python -m benchmarks.run`. The standalone
+scripts bench_collision.py and bench_arrange.py cover collision modes and group layouts.
+"""
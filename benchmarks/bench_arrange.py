@@ -0,0 +1,60 @@
+"""Benchmark dsl.arrange_in_group formations on a lecture hall, with and without optimize.
+
+Usage: python benchmarks/bench_arrange.py [chair_count] [hall_width] [hall_depth]
+
+The hall holds a lectern, a front bench and a few pillars in the seating area. For each
+formation the script times the arrangement and counts the chairs left overlapping
+another object or outside the walls, first for the plain formation and then with the
+force-directed relaxation (optimize=True).
+"""
+import io
+import os
+import sys
+import time
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dsl
+
+FORMATIONS = ["grid", "auditorium", "packed", "row", "circle"]
+
+def build_hall(chairs, width, depth):
+    dsl.reset_scene()
+    dsl.set_room(width, depth, 4.0)
+    fixtures = [("lectern", 1.0, 0.6, width / 2, depth - 1.0), ("front bench", 6.0, 0.8, width / 2, depth - 2.5)]
+    fixtures += [(f"pillar {i}", 0.5, 0.5, width * (i + 1) / 4, depth / 2) for i in range(3)]
+    for desc, w, d, x, y in fixtures:
+        dsl.create_object(desc, w, d, 1.0, x, y, 0.5)
+    for i in range(chairs):
+        dsl.create_object(f"chair {i}", 0.5, 0.5, 0.9)
+
+def count_problems(descs):
+    members = [obj for obj in dsl.scene["objects"] if obj.description in descs]
+    return sum(dsl.check_overlap_with_existing(obj)[0] or not dsl.within_room_boundaries(obj) for obj in members)
+
+def run(formation, optimize, chairs, width, depth):
+    build_hall(chairs, width, depth)
+    descs = [f"chair {i}" for i in range(chairs)]
+    # The auditorium focus is the lectern, everything else is centred in the seating area
+    center_y = depth - 1.0 if formation == "auditorium" else depth / 2 - 1.0
+    start = time.perf_counter()
+    dsl.arrange_in_group(descs, formation, width / 2, center_y, spacing=0.15, optimize=optimize)
+    elapsed = time.perf_counter() - start
+    return elapsed, count_problems(set(descs))
+
+if __name__ == "__main__":
+    chairs = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    width = float(sys.argv[2]) if len(sys.argv) > 2 else 30.0
+    depth = float(sys.argv[3]) if len(sys.argv) > 3 else 20.0
+    # Scene saves go to a scratch directory, and the per-object messages are muted
+    os.chdir(tempfile.mkdtemp())
+    print(f"{chairs} chairs in a {width}x{depth} lecture hall")
+    for formation in FORMATIONS:
+        results = []
+        for optimize in (False, True):
+            with contextlib.redirect_stdout(io.StringIO()):
+                results.append(run(formation, optimize, chairs, width, depth))
+        (plain_time, plain_bad), (opt_time, opt_bad) = results
+        print(f"{formation:>10}: plain {plain_time * 1e3:7.1f} ms, {plain_bad:4d} chairs in conflict | "
+              f"optimize {opt_time * 1e3:7.1f} ms, {opt_bad:4d} chairs in conflict")
@@ -0,0 +1,75 @@
+"""Benchmark the memory held per SceneObject, against the layout before __slots__.
+
+Usage: python benchmarks/bench_memory.py [object_count]
+
+Both layouts are built from the same saved scene file, as loading a scene does, and the
+memory still allocated afterwards is measured with tracemalloc. The old layout had a
+per-instance __dict__, a bbox dict of three two-element lists and a separate facing
+string per loaded object.
+"""
+import os
+import sys
+import json
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dsl
+import log
+from benchmarks import scenes
+
+class LegacySceneObject:
+    """SceneObject as it was: attributes in a __dict__ and the bbox as a dict of lists."""
+
+    def __init__(self, description, width, depth, height):
+        self.description = description
+        self.width = width
+        self.depth = depth
+        self.height = height
+        self.x = None
+        self.y = None
+        self.z = None
+        self.rotation = 0
+        self.facing = "NORTH"
+        self.bbox = None
+        self.support = None
+
+def legacy_load(path):
+    with open(path) as f:
+        records = json.load(f)["objects"]
+    objects = []
+    for record in records:
+        obj = LegacySceneObject(record["description"], record["width"], record["depth"], record["height"])
+        obj.x, obj.y, obj.z = record["x"], record["y"], record["z"]
+        obj.rotation, obj.facing = record["rotation"], record["facing"]
+        half_width, half_depth, half_height = obj.width / 2, obj.depth / 2, obj.height / 2
+        obj.bbox = {"x": [obj.x - half_width, obj.x + half_width], "y": [obj.y - half_depth, obj.y + half_depth],
+                    "z": [obj.z - half_height, obj.z + half_height]}
+        objects.append(obj)
+    return objects
+
+def retained(build):
+    """Bytes still allocated after build() returns, with its result kept alive."""
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    result = build()
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    return result, used
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    log.set_level("warning")
+    path = os.path.join(tempfile.mkdtemp(prefix="text3d_bench_"), "scene.json")
+    scenes.write_scene(path, count)
+    dsl.reset_scene()
+
+    legacy, legacy_bytes = retained(lambda: legacy_load(path))
+    _, current_bytes = retained(lambda: dsl.load_scene(path))
+    objects = dsl.scene["objects"]
+    print(f"{len(objects)} objects loaded from a saved scene")
+    print(f"  before (__dict__, dict bbox): {legacy_bytes / len(legacy):7.1f} bytes/object")
+    print(f"  after (__slots__, tuple bounds): {current_bytes / len(objects):7.1f} bytes/object "
+          f"({legacy_bytes / current_bytes:.2f}x less)")
+
+    os.remove(path)
@@ -0,0 +1,77 @@
+"""Benchmark the per-command extraction cost of the nlp generators, without the spaCy parse.
+
+Usage: python benchmarks/bench_nlp_extract.py [object_count] [--baseline old_nlp.py]
+
+Every corpus command is parsed once up front and the generators are then timed with
+nlp.parse answering from that cache, so what is measured is the regex, keyword and
+scene-matching work each generator does on top of the parse. scene_state holds a
+synthetic room of object_count objects (default 1000), which is what reference matching
+searches. With --baseline, another copy of nlp.py (say, from before a change:
+git show <commit>:nlp.py > old_nlp.py) is timed the same way, sharing the parse cache:
+
+    git show HEAD~1:nlp.py > /tmp/old_nlp.py
+    python benchmarks/bench_nlp_extract.py --baseline /tmp/old_nlp.py
+"""
+import os
+import sys
+import timeit
+import argparse
+import importlib.util
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks import scenes, corpus
+
+def load_module(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def cache_parses(modules):
+    """Make every module's parse() answer repeated texts from one shared cache."""
+    parse, docs = modules[0].parse, {}
+
+    def cached(text):
+        if text not in docs:
+            docs[text] = parse(text)
+        return docs[text]
+    for module in modules:
+        module.parse = cached
+
+def per_command_us(module, repeat):
+    """Mean microseconds per command for each generator over its corpus commands."""
+    results = {}
+    for command_type, texts in corpus.COMMANDS.items():
+        func = getattr(module, command_type)
+        for text in texts:  # fills the parse cache outside the timing
+            func(text)
+        seconds = timeit.timeit(lambda: [func(text) for text in texts], number=repeat)
+        results[command_type] = seconds / repeat / len(texts) * 1e6
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("objects", type=int, nargs="?", default=1000)
+    parser.add_argument("--baseline", help="Another nlp.py to time for comparison")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    try:
+        import nlp
+    except (ImportError, OSError) as e:
+        print(f"[Bench] Skipped: nlp unavailable: {e}")
+        sys.exit(0)
+    modules = [nlp] + ([load_module(args.baseline, "nlp_baseline")] if args.baseline else [])
+    cache_parses(modules)
+    scene_state = scenes.scene_data(args.objects)
+    for module in modules:
+        module.scene_state = scene_state
+
+    current = per_command_us(nlp, args.repeat)
+    baseline = per_command_us(modules[1], args.repeat) if args.baseline else None
+    print(f"Extraction per command, spaCy parse excluded, {args.objects} objects in scene_state (us)")
+    for command_type, cost in current.items():
+        if baseline is None:
+            print(f"  {command_type:22} {cost:9.1f}")
+        else:
+            print(f"  {command_type:22} {baseline[command_type]:9.1f} -> {cost:9.1f}  "
+                  f"({baseline[command_type] / cost:.2f}x)")
@@ -0,0 +1,82 @@
+"""Benchmark rebuilding a scene from its command journal.
+
+Usage: python benchmarks/bench_replay.py [command_count]
+
+A synthetic session (creations, moves, rotations, relative placements, stacking, undo
+and redo on a large room) is run once as the interactive loop runs it, printing and
+saving after every command, while a journal records it. The journal is then replayed
+in full, replayed again taking checkpoints, and resumed from its last checkpoint; each
+rebuilt scene is checked against the recorded one.
+"""
+import io
+import os
+import sys
+import time
+import random
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dsl
+import log
+import journal
+
+DIRECTIONS = ["NORTH", "EAST", "SOUTH", "WEST"]
+
+def session(count, seed=0):
+    """Run count DSL commands on a 40 m square room."""
+    rng = random.Random(seed)
+    names = []
+    for i in range(count):
+        r = rng.random()
+        if r < 0.3 or len(names) < 5:
+            names.append(f"box {i}")
+            dsl.create_object(names[-1], 0.5, 0.5, 0.5, rng.uniform(1, 39), rng.uniform(1, 39), 0.25)
+        elif r < 0.55:
+            dsl.move_object(rng.choice(names), rng.choice(DIRECTIONS), 0.1)
+        elif r < 0.7:
+            dsl.rotate_object(rng.choice(names), 1)
+        elif r < 0.8:
+            dsl.place_relative(rng.choice(names), rng.choice(names), "EAST", 0.1)
+        elif r < 0.85:
+            dsl.undo()
+        elif r < 0.88:
+            dsl.redo()
+        else:
+            dsl.place_on_top(rng.choice(names), rng.choice(names))
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    scratch = tempfile.mkdtemp(prefix="text3d_bench_")
+    dsl.scene_file = os.path.join(scratch, "scene_state.json")
+    journal_file = os.path.join(scratch, "session.jsonl")
+
+    dsl.reset_scene()
+    with contextlib.redirect_stdout(io.StringIO()):
+        dsl.set_room(40.0, 40.0, 3.0)
+        with journal.Journal(journal_file):
+            _, recorded = timed(lambda: session(count))
+    final = dsl.scene_dict()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, full = timed(lambda: journal.replay(journal_file))
+        full_ok = dsl.scene_dict() == final
+        checkpoints = {}
+        _, with_checkpoints = timed(lambda: journal.replay(journal_file, checkpoint_every=max(count // 10, 1),
+                                                           checkpoints=checkpoints))
+        last = max(checkpoints)
+        resume_from = {index: data for index, data in checkpoints.items() if index < last}
+        _, resumed = timed(lambda: journal.replay(journal_file, checkpoints=resume_from))
+        resumed_ok = dsl.scene_dict() == final
+
+    print(f"{count} commands, {len(final['objects'])} objects in the final scene")
+    print(f"  interactive run (print + save each): {recorded:7.2f} s")
+    print(f"  replay:                              {full:7.2f} s  (scene identical: {full_ok})")
+    print(f"  replay taking {len(checkpoints)} checkpoints:      {with_checkpoints:7.2f} s  "
+          f"({sum(map(len, checkpoints.values())) / 1e6:.1f} MB)")
+    print(f"  resume from command {max(resume_from)}:          {resumed:7.2f} s  (scene identical: {resumed_ok})")
@@ -0,0 +1,69 @@
+"""Natural-language commands for every classifier command type, naming the objects of
+benchmarks.scenes rooms."""
+
+COMMANDS = {
+    "place_along_wall": [
+        "Place the bookshelf along the north wall",
+        "Put the sofa along the west wall at 0.3 with 0.1 clearance",
+        "Set the desk beside the wall to the east",
+    ],
+    "place_relative": [
+        "Place the chair to the east of the desk",
+        "Put the nightstand 0.2 meters west of the bed",
+        "Move the lamp south of the sofa",
+    ],
+    "create_object": [
+        "Create a table with dimensions 1.2 0.8 0.75",
+        "Create 3 chairs 0.5 0.5 0.9",
+        "Construct a wardrobe 1.0 0.6 2.0",
+    ],
+    "align_object": [
+        "Align the chair with the table at the left edge",
+        "Align the nightstand to the bed matching the top edge",
+        "Align the desk in line with the bookshelf",
+    ],
+    "place_on_top": [
+        "Place the lamp on top of the nightstand",
+        "Put the tv on top of the desk",
+        "Set the lamp on the coffee table",
+    ],
+    "arrange_in_group": [
+        "Arrange the chair, the nightstand and the lamp in a circle",
+        "Arrange the sofa and the coffee table together in a row",
+        "Group the chairs in a grid pattern with 0.3 spacing",
+    ],
+    "set_room": [
+        "Set the room to 5 by 4 by 3 meters",
+        "Make the room dimensions 8 6 3",
+        "Set the room size to 10 x 10 x 3.5",
+    ],
+    "rotate_object": [
+        "Rotate the sofa by 1 turn",
+        "Turn the desk 2 times",
+        "Orient the bed by 90 degrees",
+    ],
+    "mount_on_wall": [
+        "Mount the tv on the north wall",
+        "Hang the bookshelf on the east wall 0.1 from it",
+        "Install the lamp on the wall to the west",
+    ],
+    "place_relative_multi": [
+        "Place the lamp between the sofa and the table",
+        "Position the chair 0.3 west of a desk and 0.4 south of a bed",
+        "Put the nightstand relative to the bed and the desk",
+    ],
+    "move_object": [
+        "Move the table north by 1 meter",
+        "Shift the sofa 0.5 west",
+        "Relocate the chair east 2 meters",
+    ],
+    "place_in_room_corner": [
+        "Place the bookshelf in the top left corner",
+        "Put the desk at the corner lower right",
+        "Set the bed in the room corner ne",
+    ],
+}
+
+def labelled():
+    """Every corpus command as (command type, text)."""
+    return [(command_type, text) for command_type, texts in COMMANDS.items() for text in texts]
@@ -0,0 +1,276 @@
+"""Time each subsystem of the scene pipeline on synthetic rooms and store the results as JSON.
+
+Usage: python -m benchmarks.run [--counts 100 1000] [--repeat 20] [--only dsl_placement ...]
+                                [--output results.json] [--compare baseline.json]
+
+Each subsystem is timed on its own. DSL commands run against a populated room and are
+undone (outside the timing) after every call, so all repeats see the same scene. Scene
+files are written to a scratch directory and command output is muted. Subsystems whose
+optional dependency (spaCy, trimesh, matplotlib) is missing are recorded as skipped.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import numpy as np
+import dsl
+import log
+import dsl_class
+from benchmarks import scenes, corpus
+from benchmarks.stub_model import StubModel, StubTokenizer
+
+# A timing is flagged by --compare when it is this much slower than the baseline
+REGRESSION_RATIO = 1.25
+
+class Skip(Exception):
+    """Raised by a subsystem benchmark that cannot run here."""
+
+def measure(func, repeat, after=None):
+    """Call func repeat times with output muted and DSL logging off; return timing statistics
+    in milliseconds.
+
+    Args:
+        func: Callable to time
+        repeat: Number of timed calls
+        after: Optional callable run after each call, outside the timing (e.g. an undo)
+    """
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()), log.quiet():
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - start) * 1e3)
+            if after is not None:
+                after()
+    return {"calls": repeat, "mean_ms": statistics.fmean(samples), "median_ms": statistics.median(samples),
+            "min_ms": min(samples)}
+
+def _placed_room(count):
+    with contextlib.redirect_stdout(io.StringIO()):
+        scenes.populate(count)
+        for desc in ("lamp", "tv"):
+            obj = next(o for o in dsl.scene["objects"] if o.description == desc)
+            obj.x = obj.y = obj.z = obj.bounds = None
+
+def bench_dsl_placement(count, repeat):
+    """Every DSL placement primitive on a populated room."""
+    members = [f"item {i}" for i in range(min(count, 10))]
+    calls = {
+        "set_room": lambda: dsl.set_room(dsl.scene["room_width"] + 1, dsl.scene["room_depth"], 3.0),
+        "create_object": lambda: dsl.create_object("stool", 0.4, 0.4, 0.5, 0.5, 0.5, 0.25),
+        "place_relative": lambda: dsl.place_relative("chair", "desk", "EAST", 0.1),
+        "place_along_wall": lambda: dsl.place_along_wall("bookshelf", "NORTH", 0.5, 0.05),
+        "place_in_room_corner": lambda: dsl.place_in_room_corner("bed", "SW", 0.05),
+        "place_on_top": lambda: dsl.place_on_top("lamp", "nightstand"),
+        "mount_on_wall": lambda: dsl.mount_on_wall("tv", "NORTH", 0.05, 0.5, 1.5),
+        "move_object": lambda: dsl.move_object("table", "EAST", 0.2),
+        "rotate_object": lambda: dsl.rotate_object("sofa", 1),
+        "align_object": lambda: dsl.align_object("chair", "corner", "SW", "table", "SE", 0.2),
+        "arrange_in_group": lambda: dsl.arrange_in_group(members, "grid", spacing=0.2),
+        "arrange_in_group_optimize": lambda: dsl.arrange_in_group(members, "grid", spacing=0.2, optimize=True),
+        "place_relative_multi": lambda: dsl.place_relative_multi("chair", ["desk", "table"], ["EAST", "WEST"], [0.1, 0.1]),
+    }
+    results = {}
+    for name, call in calls.items():
+        _placed_room(count)
+        results[name] = measure(call, repeat, after=dsl.undo)
+    return results
+
+def bench_check_overlap(count, repeat):
+    """check_overlap_with_existing for a sample of objects, in both collision modes."""
+    results = {}
+    for rotated in (False, True):
+        scenes.populate(count, rotated=rotated)
+        sample = dsl.scene["objects"][::max(len(dsl.scene["objects"]) // 50, 1)]
+        for mode in ("aabb", "obb"):
+            stats = measure(lambda: [dsl.check_overlap_with_existing(obj, mode) for obj in sample], repeat)
+            per_check = {key: value / len(sample) if key.endswith("_ms") else value for key, value in stats.items()}
+            results[f"{mode}{'_rotated' if rotated else ''}_per_check"] = per_check
+    return results
+
+def bench_save_scene(count, repeat):
+    """Saving, and reloading the saved file (which replaces the scene with an equal one)."""
+    scenes.populate(count)
+    return {"save_scene": measure(dsl.save_scene, repeat), "scene_dict": measure(dsl.scene_dict, repeat),
+            "load_scene": measure(lambda: dsl.load_scene("scene_state.json"), repeat)}
+
+def bench_scene_diff(count, repeat):
+    """Diffing a scene against itself after a few commands, and applying the patch (undone
+    after each call by applying the reverse patch)."""
+    import scene_diff
+    scenes.populate(count)
+    old = dsl.scene_dict()
+    with log.quiet():
+        dsl.move_object("table", "EAST", 0.2)
+        dsl.rotate_object("sofa", 1)
+        dsl.place_on_top("lamp", "nightstand")
+        new = dsl.scene_dict()
+        patch, reverse = scene_diff.diff_scenes(old, new), scene_diff.diff_scenes(new, old)
+        scene_diff.apply_patch(reverse)
+    return {"diff_scenes": measure(lambda: scene_diff.diff_scenes(old, new), repeat),
+            "apply_patch": measure(lambda: scene_diff.apply_patch(patch), repeat,
+                                   after=lambda: scene_diff.apply_patch(reverse))}
+
+def bench_nlp(count, repeat):
+    """DSL generation from text for every command type (spaCy parse included)."""
+    try:
+        import nlp
+    except (ImportError, OSError) as e:
+        raise Skip(f"nlp unavailable: {e}")
+    nlp.scene_state = scenes.scene_data(count)
+    results = {}
+    for command_type, texts in corpus.COMMANDS.items():
+        func = getattr(nlp, command_type)
+        stats = measure(lambda: [func(text) for text in texts], repeat)
+        results[command_type] = {key: value / len(texts) if key.endswith("_ms") else value for key, value in stats.items()}
+    return results
+
+def bench_keyword_embedding(count, repeat):
+    texts = [text for _, text in corpus.labelled()]
+    stats = measure(lambda: [dsl_class.create_keyword_embedding(text) for text in texts], repeat)
+    return {"per_command": {key: value / len(texts) if key.endswith("_ms") else value for key, value in stats.items()}}
+
+def bench_classify(count, repeat):
+    """predict_dsl with the stub tokenizer and model, plus the stub's corpus accuracy."""
+    model, tokenizer = StubModel(), StubTokenizer()
+    labelled = corpus.labelled()
+    stats = measure(lambda: [dsl_class.predict_dsl(text, model, tokenizer) for _, text in labelled], repeat)
+    result = {key: value / len(labelled) if key.endswith("_ms") else value for key, value in stats.items()}
+    result["stub_accuracy"] = sum(dsl_class.predict_dsl(text, model, tokenizer) == label
+                                  for label, text in labelled) / len(labelled)
+    return {"predict_dsl_stub": result}
+
+def bench_sc_transform(count, repeat):
+    """sc.transform_glb on a unit box mesh."""
+    try:
+        import trimesh
+        import sc
+    except ImportError as e:
+        raise Skip(f"sc unavailable: {e}")
+    trimesh.creation.box(extents=(1.0, 1.0, 1.0)).export("box.glb")
+    params = {"description": "box", "length": 1.2, "width": 0.8, "height": 0.75,
+              "x": 1.0, "y": 2.0, "z": 0.375, "facing": "EAST"}
+    return {"transform_glb": measure(lambda: sc.transform_glb("box.glb", "box_out.glb", params), repeat)}
+
+def bench_viz(count, repeat):
+    """3-D rendering to an image, the SVG floor plan and the scene audit of one scene file."""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import viz
+    except ImportError as e:
+        raise Skip(f"viz unavailable: {e}")
+    import floorplan
+    import audit
+    scenes.write_scene("bench_scene.json", count)
+    data = scenes.scene_data(count)
+    return {
+        "visualize_scene_png": measure(lambda: viz.visualize_scene("bench_scene.json", "bench_scene.png"), max(repeat // 4, 1)),
+        "floorplan_svg": measure(lambda: floorplan.render_floorplan("bench_scene.json", "bench_scene.svg"), repeat),
+        "audit_scene": measure(lambda: audit.audit_scene(data), repeat),
+    }
+
+SUBSYSTEMS = {
+    "dsl_placement": bench_dsl_placement,
+    "check_overlap": bench_check_overlap,
+    "save_scene": bench_save_scene,
+    "scene_diff": bench_scene_diff,
+    "nlp": bench_nlp,
+    "keyword_embedding": bench_keyword_embedding,
+    "classify": bench_classify,
+    "sc_transform": bench_sc_transform,
+    "viz": bench_viz,
+}
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(counts, repeat, only=None):
+    """Run the selected subsystems at each object count; returns the results document."""
+    results, skipped = {}, {}
+    scratch = tempfile.mkdtemp(prefix="text3d_bench_")
+    cwd = os.getcwd()
+    os.chdir(scratch)
+    try:
+        for name, bench in SUBSYSTEMS.items():
+            if only and name not in only:
+                continue
+            for count in counts:
+                print(f"[Bench] {name} @ {count} objects")
+                try:
+                    results.setdefault(name, {})[str(count)] = bench(count, repeat)
+                except Skip as e:
+                    skipped[name] = str(e)
+                    results.pop(name, None)
+                    break
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(scratch, ignore_errors=True)
+    return {
+        "meta": {"commit": git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "numpy": np.__version__, "platform": platform.platform(), "counts": counts, "repeat": repeat},
+        "results": results,
+        "skipped": skipped,
+    }
+
+def compare(current, baseline):
+    """Print each timing next to the baseline's; returns the cases slower than REGRESSION_RATIO."""
+    regressions = []
+    for name, by_count in current["results"].items():
+        for count, cases in by_count.items():
+            for case, stats in cases.items():
+                old = baseline.get("results", {}).get(name, {}).get(count, {}).get(case)
+                if not old or not old.get("median_ms"):
+                    continue
+                ratio = stats["median_ms"] / old["median_ms"]
+                flag = "  REGRESSION" if ratio > REGRESSION_RATIO else ""
+                print(f"[Bench] {name}/{count}/{case}: {old['median_ms']:.3f} -> {stats['median_ms']:.3f} ms "
+                      f"({ratio:.2f}x){flag}")
+                if flag:
+                    regressions.append(f"{name}/{count}/{case}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scene pipeline subsystems.")
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 1000], help="object counts (default 100 1000)")
+    parser.add_argument("--repeat", type=int, default=20, help="timed calls per case (default 20)")
+    parser.add_argument("--only", nargs="+", choices=list(SUBSYSTEMS), help="subsystems to run")
+    parser.add_argument("--output", help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    document = run(args.counts, args.repeat, args.only)
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"{document['meta']['commit'] or 'results'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"[Bench] Results written to {output}")
+    for name, reason in document["skipped"].items():
+        print(f"[Bench] Skipped {name}: {reason}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(document, json.load(f))
+        if regressions:
+            print(f"[Bench] {len(regressions)} regression(s) over {REGRESSION_RATIO}x")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Synthetic rooms for benchmarks: named furniture the command corpus refers to, plus
+filler objects on a jittered grid, sized so the room grows with the object count."""
+import math
+import json
+import random
+import dsl
+
+# (description, width, depth, height) of the objects the corpus commands name
+ANCHORS = [
+    ("table", 1.6, 0.9, 0.75),
+    ("sofa", 2.0, 0.9, 0.85),
+    ("bed", 1.6, 2.0, 0.5),
+    ("bookshelf", 0.9, 0.3, 1.8),
+    ("desk", 1.2, 0.6, 0.75),
+    ("chair", 0.5, 0.5, 0.9),
+    ("lamp", 0.3, 0.3, 0.5),
+    ("tv", 1.2, 0.1, 0.7),
+    ("nightstand", 0.5, 0.4, 0.55),
+    ("coffee table", 1.0, 0.6, 0.45),
+]
+
+# Floor area per object, in square meters
+CELL = 1.6
+
+def room_size(count):
+    """Side of the square room holding count objects on the benchmark grid."""
+    return max(6.0, math.ceil(math.sqrt(count + len(ANCHORS))) * CELL)
+
+def populate(count, seed=0, rotated=False):
+    """Reset dsl.scene to a synthetic room with the anchors and count filler objects.
+
+    The scene is built directly, so nothing is saved and no undo history is recorded.
+
+    Args:
+        count: Number of filler objects
+        seed: Random seed for sizes and jitter
+        rotated: Give filler objects random quarter turns
+
+    Returns:
+        dsl.scene
+    """
+    rng = random.Random(seed)
+    side = room_size(count)
+    dsl.reset_scene()
+    dsl.scene.update(room_width=side, room_depth=side, room_height=3.0)
+    columns = int(side // CELL)
+    specs = list(ANCHORS) + [(f"item {i}", rng.uniform(0.3, 1.2), rng.uniform(0.3, 1.2), rng.uniform(0.3, 1.5))
+                             for i in range(count)]
+    for index, (desc, width, depth, height) in enumerate(specs):
+        obj = dsl.SceneObject(desc, width, depth, height)
+        row, column = divmod(index, columns)
+        slack = max(CELL - max(width, depth), 0) / 2
+        obj.x = (column + 0.5) * CELL + rng.uniform(-slack, slack)
+        obj.y = (row + 0.5) * CELL + rng.uniform(-slack, slack)
+        obj.z = height / 2
+        if rotated and desc.startswith("item"):
+            obj.rotation = 90 * rng.randrange(4)
+        dsl.scene["objects"].append(obj)
+    dsl.refit_bboxes()
+    return dsl.scene
+
+def scene_data(count, seed=0, rotated=False):
+    """A synthetic room as a dictionary in the scene_state.json layout."""
+    populate(count, seed, rotated)
+    return dsl.scene_dict()
+
+def write_scene(path, count, seed=0, rotated=False):
+    """Write a synthetic room to a scene file and return its path."""
+    with open(path, "w") as f:
+        json.dump(scene_data(count, seed, rotated), f)
+    return path
@@ -0,0 +1,45 @@
+"""Offline stand-ins for the BERT tokenizer and classifier used by dsl_class.predict_dsl.
+
+The stub model scores each command type by the keyword features that dsl_class groups
+under it, so classification runs without TensorFlow or model weights. Its timings cover
+tokenization and keyword features only, not BERT inference.
+"""
+import zlib
+import numpy as np
+import dsl_class
+
+# Keywords per command type, in dsl_class.keywords order
+KEYWORD_GROUPS = [3, 6, 3, 4, 3, 4, 3, 4, 4, 3, 3, 3]
+
+class StubTokenizer:
+    """Hashes whitespace tokens into a fixed vocabulary, padded like the BERT tokenizer."""
+
+    def __init__(self, vocab_size=30522):
+        self.vocab_size = vocab_size
+
+    def __call__(self, texts, padding='max_length', truncation=True, max_length=50, return_tensors=None):
+        ids = np.zeros((len(texts), max_length), dtype=np.int32)
+        mask = np.zeros((len(texts), max_length), dtype=np.int32)
+        for row, text in enumerate(texts):
+            tokens = [101] + [zlib.crc32(tok.encode()) % self.vocab_size for tok in text.lower().split()] + [102]
+            tokens = tokens[:max_length] if truncation else tokens
+            ids[row, :len(tokens)] = tokens
+            mask[row, :len(tokens)] = 1
+        return {"input_ids": ids, "attention_mask": mask}
+
+class StubModel:
+    """Linear scoring of the keyword embedding: one weight per keyword, for its command type."""
+
+    def __init__(self):
+        groups = np.repeat(np.arange(len(KEYWORD_GROUPS)), KEYWORD_GROUPS)
+        assert len(groups) == len(dsl_class.keywords), "keyword groups out of date with dsl_class.keywords"
+        weights = np.zeros((len(dsl_class.keywords) + 3, len(dsl_class.command_types)))
+        weights[np.arange(len(groups)), groups] = 1.0
+        index = dsl_class.command_types.index
+        weights[-3, index('align_object')] = 1.0
+        weights[-2, index('place_in_room_corner')] = 1.0
+        weights[-1, index('place_relative_multi')] = 0.5
+        self.weights = weights
+
+    def __call__(self, inputs):
+        return np.asarray(inputs['keyword_embedding'], dtype=float) @ self.weights
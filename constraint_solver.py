@@ -0,0 +1,423 @@
+"""Dependency graph over dsl.scene["constraints"] and incremental re-solving after edits.
+
+An object's latest placing constraint decides what it follows: relative, aligned and
+stacked placements follow their references; wall, corner and group placements pin it to
+the room. When an object moves, only its descendants are re-solved, in topological order:
+each is put back where its placing record puts it given the new reference positions,
+plus any MOVEs of its own since that placement, with the same collision handling as the
+primitive that recorded it.
+
+Usage: python constraint_solver.py <scene file>   (checks that compacting its log is safe)
+"""
+import sys
+import json
+from collections import deque
+import dsl
+import profiling
+import log
+
+# Constraint type -> (field naming the placed object, field(s) naming its references)
+RELATIVE_CONSTRAINTS = {
+    "PLACE_RELATIVE": ("target", "reference"),
+    "ALIGN_CORNERS": ("target", "reference"),
+    "ALIGN_OBJECT": ("target", "reference"),
+    "PLACE_ON_TOP": ("top", "bottom"),
+    "PLACE_RELATIVE_MULTI": ("target", "references"),
+}
+
+# Constraint types that place objects against the room itself
+ABSOLUTE_CONSTRAINTS = {
+    "MOUNT_ON_WALL": "object",
+    "PLACE_ALONG_WALL": "object",
+    "PLACE_ROOM_CORNER": "object",
+    "ARRANGE_IN_GROUP": "objects",
+}
+
+# Dependents that also follow their references vertically
+STACKED_CONSTRAINTS = {"PLACE_ON_TOP"}
+
+# Unit displacement of a MOVE in each direction
+MOVE_VECTORS = {"NORTH": (0, 1), "EAST": (1, 0), "SOUTH": (0, -1), "WEST": (-1, 0)}
+
+class ConstraintGraph:
+    """Parent/child links between objects, built from a constraints list and kept in sync
+    by consuming only the records appended since the last sync."""
+
+    def __init__(self, constraints):
+        self.source = constraints
+        self.processed = 0
+        self.last = None  # last record consumed, to notice the list being rewritten
+        self.parents = {}  # description -> (constraint type, [reference descriptions])
+        self.children = {}  # description -> set of dependent descriptions
+        self.placements = {}  # description -> its latest relative placement record
+        self.offsets = {}  # description -> [dx, dy] it was MOVEd by since its latest placement
+        self.sync()
+
+    def is_current(self, constraints):
+        return (constraints is self.source and self.processed <= len(constraints) and
+                (self.processed == 0 or constraints[self.processed - 1] is self.last))
+
+    def _set_parents(self, desc, kind, refs):
+        old = self.parents.pop(desc, None)
+        if old is not None:
+            for ref in old[1]:
+                self.children.get(ref, set()).discard(desc)
+        if refs:
+            self.parents[desc] = (kind, refs)
+            for ref in refs:
+                self.children.setdefault(ref, set()).add(desc)
+
+    def sync(self):
+        """Fold constraints appended since the last sync into the graph."""
+        for constraint in self.source[self.processed:]:
+            details = constraint.details
+            if constraint.type in RELATIVE_CONSTRAINTS:
+                target_key, ref_key = RELATIVE_CONSTRAINTS[constraint.type]
+                refs = details[ref_key]
+                self._set_parents(details[target_key], constraint.type, list(refs) if isinstance(refs, list) else [refs])
+                self.placements[details[target_key]] = constraint
+                self.offsets.pop(details[target_key], None)
+            elif constraint.type in ABSOLUTE_CONSTRAINTS:
+                placed = details[ABSOLUTE_CONSTRAINTS[constraint.type]]
+                for desc in (placed if isinstance(placed, list) else [placed]):
+                    self._set_parents(desc, constraint.type, [])
+                    self.placements.pop(desc, None)
+                    self.offsets.pop(desc, None)
+            elif constraint.type == "MOVE":
+                ux, uy = MOVE_VECTORS.get(details["direction"], (0, 0))
+                offset = self.offsets.setdefault(details["object"], [0.0, 0.0])
+                offset[0] += ux * details["distance"]
+                offset[1] += uy * details["distance"]
+        self.processed = len(self.source)
+        self.last = self.source[-1] if self.source else None
+
+    def descendants_in_order(self, roots):
+        """Objects depending (transitively) on any of roots, parents before children.
+
+        Objects caught in a dependency cycle are left out.
+        """
+        roots = set(roots)
+        affected = set()
+        queue = deque(roots)
+        while queue:
+            for child in self.children.get(queue.popleft(), ()):
+                if child not in affected and child not in roots:
+                    affected.add(child)
+                    queue.append(child)
+
+        # Kahn's algorithm restricted to the affected subgraph
+        pending = {desc: sum(ref in affected for ref in self.parents[desc][1]) for desc in affected}
+        queue = deque(desc for desc, count in pending.items() if count == 0)
+        order = []
+        while queue:
+            desc = queue.popleft()
+            order.append(desc)
+            for child in self.children.get(desc, ()):
+                if child in pending:
+                    pending[child] -= 1
+                    if pending[child] == 0:
+                        queue.append(child)
+        if len(order) < len(affected):
+            skipped = sorted(affected - set(order))
+            log.warning("Constraint cycle involving %s - those objects were not re-solved", skipped)
+        return order
+
+_graph = None
+
+def constraint_graph(scene=None):
+    """Return the dependency graph for a scene's constraints, rebuilding it only if the
+    constraints list was replaced, truncated or rewritten (e.g. by undo) since the last call."""
+    global _graph
+    constraints = (scene or dsl.scene)["constraints"]
+    if _graph is None or not _graph.is_current(constraints):
+        _graph = ConstraintGraph(constraints)
+    else:
+        _graph.sync()
+    return _graph
+
+def _solved_position(obj, record, objects):
+    """Where obj's placing record puts it given its references' current positions, as
+    (x, y, z), or None if a reference is missing or unplaced."""
+    details = record.details
+    ref_key = RELATIVE_CONSTRAINTS[record.type][1]
+    names = details[ref_key] if isinstance(details[ref_key], list) else [details[ref_key]]
+    refs = [objects.get(name) for name in names]
+    if any(ref is None or ref.x is None for ref in refs):
+        return None
+    if record.type == "PLACE_ON_TOP":
+        return dsl.on_top_position(obj, refs[0], details["x_offset"], details["y_offset"], details["z_offset"])
+    if record.type == "PLACE_RELATIVE":
+        position = dsl.relative_position(obj, refs[0], details["direction"], details["distance"],
+                                         details.get("offset_x", 0), details.get("offset_y", 0))
+    elif record.type == "ALIGN_CORNERS":
+        position = dsl.corner_alignment_position(obj, details["target_corner"], refs[0], details["reference_corner"],
+                                                 details["distance"])
+    elif record.type == "ALIGN_OBJECT":
+        position = dsl.aligned_position(obj, details["mode"], details["target_anchor"], refs[0],
+                                        details["reference_anchor"], details["offset"], details["direction"])
+    else:  # PLACE_RELATIVE_MULTI
+        position = dsl.relative_multi_position(obj, refs, details["directions"], details["distances"])
+    return None if position is None else (position[0], position[1], obj.height / 2)
+
+@profiling.timed("propagate")
+def propagate(moved):
+    """Re-solve everything that depends on `moved` after it was moved, rotated or re-placed.
+
+    Each dependent is recomputed from its placing record and its own MOVEs since, then
+    checked like the primitive that placed it: stacked objects against the other objects
+    on their base, the rest against the scene and the room (moving to the nearest free
+    spot if they collide).
+
+    Args:
+        moved: The SceneObject that moved, or a list of them
+
+    Returns:
+        Descriptions of the dependents that were repositioned, in solve order
+    """
+    moved = moved if isinstance(moved, list) else [moved]
+    graph = constraint_graph()
+    order = graph.descendants_in_order(obj.description for obj in moved)
+    if not order:
+        return []
+
+    objects = {obj.description: obj for obj in dsl.scene["objects"]}
+    solved = []
+    for desc in order:
+        obj = objects.get(desc)
+        record = graph.placements.get(desc)
+        if obj is None or obj.x is None or record is None:
+            continue
+        position = _solved_position(obj, record, objects)
+        if position is None:
+            continue
+        dx, dy = graph.offsets.get(desc, (0.0, 0.0))
+        x, y, z = position[0] + dx, position[1] + dy, position[2]
+
+        if record.type in STACKED_CONSTRAINTS:
+            base = objects[record.details["bottom"]]
+            overlaps, overlapping_obj = dsl.settle_on_top(obj, base, x, y, z, supported=not record.details["z_offset"])
+        else:
+            overlaps, overlapping_obj = dsl.settle_placement(obj, x, y, z)
+            if not dsl.within_room_boundaries(obj):
+                log.warning("%s is outside room boundaries after re-solving", desc)
+        if overlaps:
+            log.warning("%s overlaps with %s after re-solving", desc, overlapping_obj)
+        solved.append(desc)
+
+    profiling.count("objects_resolved", len(solved))
+    log.info("Re-solved %s object(s) depending on %s", len(solved), ", ".join(obj.description for obj in moved))
+    return solved
+
+# Placements that set nothing but the object's position, so a later placement of the same
+# object fully supersedes them (the others also set its facing, rotation or support)
+POSITION_ONLY_CONSTRAINTS = {"PLACE_RELATIVE", "ALIGN_CORNERS", "ALIGN_OBJECT", "PLACE_RELATIVE_MULTI"}
+
+# Constraint type -> (dsl primitive that recorded it, its arguments as record fields in order)
+REPLAY_COMMANDS = {
+    "PLACE_RELATIVE": ("place_relative", ("target", "reference", "direction", "distance", "offset_x", "offset_y")),
+    "ALIGN_CORNERS": ("align_corners", ("target", "target_corner", "reference", "reference_corner", "distance")),
+    "ALIGN_OBJECT": ("align_object", ("target", "mode", "target_anchor", "reference", "reference_anchor", "offset",
+                                      "direction")),
+    "PLACE_ON_TOP": ("place_on_top", ("top", "bottom", "x_offset", "y_offset", "z_offset")),
+    "PLACE_RELATIVE_MULTI": ("place_relative_multi", ("target", "references", "directions", "distances")),
+    "MOUNT_ON_WALL": ("mount_on_wall", ("object", "wall", "distance", "position", "height")),
+    "PLACE_ALONG_WALL": ("place_along_wall", ("object", "wall", "position", "wall_distance")),
+    "PLACE_ROOM_CORNER": ("place_in_room_corner", ("object", "corner", "wall_distance", "facing")),
+    "ARRANGE_IN_GROUP": ("arrange_in_group", ("objects", "formation", "center_x", "center_y", "height", "spacing",
+                                              "facing", "columns", "optimize")),
+    "MOVE": ("move_object", ("object", "direction", "distance")),
+    "ROTATE": ("rotate_object", ("object", "turns")),
+}
+
+def _placed_objects(constraint):
+    """Descriptions an absolute or relative placement record positions."""
+    if constraint.type in RELATIVE_CONSTRAINTS:
+        return [constraint.details[RELATIVE_CONSTRAINTS[constraint.type][0]]]
+    placed = constraint.details[ABSOLUTE_CONSTRAINTS[constraint.type]]
+    return list(placed) if isinstance(placed, list) else [placed]
+
+def _subject(constraint):
+    """The one object a MOVE, ROTATE or single-object placement record positions, else None."""
+    if constraint.type in ("MOVE", "ROTATE"):
+        return constraint.details["object"]
+    if constraint.type in RELATIVE_CONSTRAINTS or constraint.type in ABSOLUTE_CONSTRAINTS:
+        placed = _placed_objects(constraint)
+        return placed[0] if len(placed) == 1 else None
+    return None
+
+def replay_constraints(constraints, scene=None):
+    """Run the primitive behind every constraint record again, in order, on a scratch scene
+    holding the same room and objects, all unplaced.
+
+    The live scene, its undo history and the scene file are left untouched. Objects
+    placed only through create_object's coordinates have no record and stay unplaced.
+
+    Args:
+        constraints: Constraint records to replay
+        scene: Scene whose room and objects to start from (default dsl.scene)
+
+    Returns:
+        {description: (x, y, z, rotation, facing, support description)} after the replay
+    """
+    source = scene or dsl.scene
+    room = (source["room_width"], source["room_depth"], source["room_height"])
+    sizes = [(obj.description, obj.width, obj.depth, obj.height) for obj in source["objects"]]
+    live_scene = dict(dsl.scene)
+    live_history = {key: list(value) if isinstance(value, list) else value for key, value in dsl.history.items()}
+    live_save, live_hooks = dsl.save_enabled, list(dsl.command_hooks)
+    try:
+        dsl.save_enabled = False
+        dsl.command_hooks.clear()
+        dsl.history["current"] = None  # replayed commands must not join the running command's undo step
+        dsl.scene.clear()
+        dsl.scene.update(dsl.new_scene())
+        dsl.scene["room_width"], dsl.scene["room_depth"], dsl.scene["room_height"] = room
+        dsl.scene["objects"] = [dsl.SceneObject(*size) for size in sizes]
+        with log.quiet():
+            for constraint in constraints:
+                if constraint.type not in REPLAY_COMMANDS:
+                    continue
+                name, fields = REPLAY_COMMANDS[constraint.type]
+                args = []
+                for field in fields:  # records from older versions may lack trailing fields
+                    if field not in constraint.details:
+                        break
+                    args.append(constraint.details[field])
+                getattr(dsl, name)(*args)
+        return {obj.description: (obj.x, obj.y, obj.z, obj.rotation, obj.facing,
+                                  obj.support.description if obj.support is not None else None)
+                for obj in dsl.scene["objects"]}
+    finally:
+        dsl.scene.clear()
+        dsl.scene.update(live_scene)
+        for key, value in live_history.items():
+            if isinstance(value, list):
+                dsl.history[key][:] = value
+            else:
+                dsl.history[key] = value
+        dsl.save_enabled = live_save
+        dsl.command_hooks[:] = live_hooks
+
+def _same_replay(a, b):
+    """Whether two replay_constraints results agree (coordinates to within 1e-6 m)."""
+    if a.keys() != b.keys():
+        return False
+    for desc, state in a.items():
+        other = b[desc]
+        for value, other_value in zip(state, other):
+            if isinstance(value, float) and isinstance(other_value, float):
+                if abs(value - other_value) > 1e-6:
+                    return False
+            elif value != other_value:
+                return False
+    return True
+
+def compact_constraints(scene=None, report=True, verify=False):
+    """Collapse superseded records in scene["constraints"].
+
+    Only runs of adjacent records positioning the same object, with no other record
+    between them, are compacted, so the log keeps the order of everything that happened
+    relative to other objects:
+
+    - MOVEs, and placements that set only the position, are dropped when a later
+      placement of the object in the same run overrides them (a placement followed by
+      a ROTATE in the run stays, since the rotation needs it)
+    - Adjacent MOVEs fold into one net displacement per axis.
+
+    ROTATEs are kept as they are: rotate_object shifts the centre of a non-square object
+    depending on the rotation it starts from, so turns do not add up.
+
+    The list is replaced rather than edited in place, and only when a record was dropped
+    or rewritten.
+
+    Args:
+        scene: Scene to compact (default dsl.scene)
+        report: Print record counts and serialized sizes before and after
+        verify: Replay the log before and after compaction on scratch copies of the scene
+            (see replay_constraints) and keep the original if they end differently
+
+    Returns:
+        Dict with "before"/"after" record counts (and "bytes_before"/"bytes_after" if
+        report, "verified" if verify)
+    """
+    scene = scene or dsl.scene
+    constraints = scene["constraints"]
+    keep = [True] * len(constraints)
+
+    runs = []  # [subject, [indices]] of adjacent records positioning the same object
+    for i, constraint in enumerate(constraints):
+        desc = _subject(constraint)
+        if desc is not None and runs and runs[-1][0] == desc:
+            runs[-1][1].append(i)
+        else:
+            runs.append([desc, [i]])
+
+    net = {}  # index of the first MOVE of a folded group -> [dx, dy]
+    for desc, indices in runs:
+        if desc is None or len(indices) < 2:
+            continue
+        kinds = [constraints[i].type for i in indices]
+        placements = [k for k, kind in enumerate(kinds) if kind not in ("MOVE", "ROTATE")]
+        if placements:
+            last = placements[-1]
+            for k in range(last):
+                rotated_after = "ROTATE" in kinds[k + 1:last]
+                if kinds[k] == "MOVE" or (kinds[k] in POSITION_ONLY_CONSTRAINTS and not rotated_after):
+                    keep[indices[k]] = False
+        # Fold each stretch of adjacent MOVEs left into its first record
+        stretch = []
+        for i in indices + [None]:
+            if i is not None and keep[i] and constraints[i].type == "MOVE":
+                stretch.append(i)
+                continue
+            if len(stretch) > 1:
+                step = net[stretch[0]] = [0.0, 0.0]
+                for j in stretch:
+                    ux, uy = MOVE_VECTORS.get(constraints[j].details["direction"], (0, 0))
+                    step[0] += ux * constraints[j].details["distance"]
+                    step[1] += uy * constraints[j].details["distance"]
+                    keep[j] = j == stretch[0]
+            stretch = []
+
+    compacted = []
+    for i, constraint in enumerate(constraints):
+        if not keep[i]:
+            continue
+        if i in net:
+            dx, dy = (round(v, 9) for v in net[i])
+            desc = constraint.details["object"]
+            if dx:
+                compacted.append(dsl.Constraint("MOVE", {"object": desc, "direction": "EAST" if dx > 0 else "WEST", "distance": abs(dx)}))
+            if dy:
+                compacted.append(dsl.Constraint("MOVE", {"object": desc, "direction": "NORTH" if dy > 0 else "SOUTH", "distance": abs(dy)}))
+        else:
+            compacted.append(constraint)
+
+    changed = len(compacted) != len(constraints) or any(new is not old for new, old in zip(compacted, constraints))
+    result = {"before": len(constraints), "after": len(compacted)}
+    if verify:
+        result["verified"] = not changed or _same_replay(replay_constraints(constraints, scene),
+                                                         replay_constraints(compacted, scene))
+        if not result["verified"]:
+            log.warning("Compaction would change the replayed scene - constraints left as they were")
+            compacted, changed = constraints, False
+            result["after"] = len(constraints)
+    if report:
+        result["bytes_before"] = len(json.dumps([vars(c) for c in constraints]))
+        result["bytes_after"] = len(json.dumps([vars(c) for c in compacted]))
+        log.info("Compacted constraints: %s -> %s records (%.1f KB -> %.1f KB)", result['before'], result['after'],
+                 result['bytes_before'] / 1024, result['bytes_after'] / 1024)
+    # Keep the list (and with it the undo log's and the graph's view of it) unless
+    # compaction actually dropped or rewrote a record
+    if changed:
+        scene["constraints"] = compacted
+    return result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python constraint_solver.py <scene file>")
+        sys.exit(2)
+    if not dsl.load_scene(sys.argv[1]):
+        sys.exit(1)
+    sys.exit(0 if compact_constraints(verify=True)["verified"] else 1)
@@ -1,9 +1,63 @@
+import os
 import math
 import json
+import atexit
+import functools
+from contextlib import contextmanager
+import numpy as np
+import constraint_solver
+import profiling
+import log
+import storage
+from occupancy import OccupancyGrid
+from geometry import rotated_bounds, rotated_half_extents, footprint_corners, obb_overlaps, nearest_free_position, separate_boxes
+from scene_binary import BinaryScene, is_binary_scene, NO_FACING
 
-scene = {"objects": [], "constraints": [], "room_width": None, "room_depth": None, "room_height": None}
+# Optional faster JSON parser for loading big scenes
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def new_scene():
+    """Return an empty scene dictionary."""
+    return {"objects": [], "constraints": [], "room_width": None, "room_depth": None, "room_height": None,
+            "occupancy": None, "surfaces": {}}
+
+scene = new_scene()
+
+# Collision test used by check_overlap_with_existing: "aabb" compares axis-aligned bboxes,
+# "obb" confirms AABB hits with a separating-axis test on the rotated footprints
+collision_mode = "aabb"
+
+# Fold superseded constraint records on every save a command makes (see
+# constraint_solver.compact_constraints)
+compact_on_save = False
+
+# File save_scene writes. Every save replaces it atomically (temporary file + rename), so
+# readers always see a complete scene
+scene_file = "scene_state.json"
+
+# False turns save_scene into a no-op, for scratch copies of a scene (see variants.py)
+save_enabled = True
+
+# Every save forces the new file's data to disk before renaming it over the scene file, but
+# makes the rename itself durable (a directory fsync) on every Nth save only (group commit):
+# a crash can then bring back a scene up to N - 1 saves old, never a partial one. 1 syncs
+# every save, 0 leaves the directory to the OS
+fsync_every = 1
+
+# Gap in meters between an object's bottom and its support's top still counted as resting on it
+SUPPORT_TOLERANCE = 1e-6
+
+# Canonical facing strings, so objects loaded from files share them instead of each
+# holding its own copy
+FACINGS = {facing: facing for facing in ("NORTH", "EAST", "SOUTH", "WEST")}
 
 class SceneObject:
+    # No per-instance __dict__: large scenes hold one of these per object
+    __slots__ = ("description", "width", "depth", "height", "x", "y", "z", "rotation", "facing", "bounds", "support")
+
     def __init__(self, description, width, depth, height):
         self.description = description
         self.width = width
@@ -14,52 +68,404 @@ class SceneObject:
         self.z = None
         self.rotation = 0
         self.facing = "NORTH"
-        self.bbox = None
+        self.bounds = None  # (min_x, max_x, min_y, max_y, min_z, max_z) of the rotated box
+        self.support = None  # object whose top face this one rests on
+
+    @property
+    def bbox(self):
+        """The bounds as {"x": [min, max], "y": [...], "z": [...]}, or None if unplaced (a copy)."""
+        b = self.bounds
+        return None if b is None else {"x": [b[0], b[1]], "y": [b[2], b[3]], "z": [b[4], b[5]]}
+
+    @bbox.setter
+    def bbox(self, bbox):
+        self.bounds = None if bbox is None else (*bbox["x"], *bbox["y"], *bbox["z"])
 
     def __str__(self):
         if self.x is None or self.y is None or self.z is None:
             return f"{self.description} (unplaced)"
         return f"{self.description} at ({self.x:.2f}, {self.y:.2f}, {self.z:.2f})"
 
+# Callables hook(name, args, kwargs) told of every top-level call of a state-changing DSL
+# function once it returns (see journal.py). Names outside this module are module-qualified
+command_hooks = []
+
+# Depth of recorded calls in progress; calls they make themselves are not reported
+_recording = {"depth": 0}
+
+def recorded(func):
+    """Report top-level calls of a function that changes the scene to command_hooks."""
+    name = func.__name__ if func.__module__ == __name__ else f"{func.__module__}.{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not command_hooks:
+            return func(*args, **kwargs)
+        _recording["depth"] += 1
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            _recording["depth"] -= 1
+        if not _recording["depth"]:
+            for hook in list(command_hooks):
+                hook(name, args, kwargs)
+        return result
+    return wrapper
+
+@recorded
+def reset_scene():
+    """Empty the current scene in place, so every module holding a reference sees the reset."""
+    scene.clear()
+    scene.update(new_scene())
+    history["undo"].clear()
+    history["redo"].clear()
+
 class Constraint:
     def __init__(self, type, details):
         self.type = type
         self.details = details
 
-def calculate_position_and_bbox(obj, x, y, z):
+# Undo/redo stacks of per-command deltas. A delta holds the before/after state of only the
+# objects the command touched, the objects it created, the constraint records it appended
+# (or, if compaction rewrote the log, the records dropped and added with their positions)
+# and the room dimensions if it changed them, so memory grows with the size of each change
+# rather than with the scene.
+history = {"undo": [], "redo": [], "current": None, "limit": 500}
+
+def _object_state(obj):
+    return (obj.x, obj.y, obj.z, obj.rotation, obj.facing, obj.bounds, obj.support)
+
+def _restore_object_state(obj, state):
+    obj.x, obj.y, obj.z, obj.rotation, obj.facing, obj.bounds, support = state
+    set_support(obj, support)
+    update_occupancy(obj)
+
+def _room_state():
+    return (scene["room_width"], scene["room_depth"], scene["room_height"])
+
+def _touch(obj):
+    """Remember obj's state before the running command first changes it."""
+    change = history["current"]
+    if change is not None and obj not in change["before"]:
+        change["before"][obj] = _object_state(obj)
+
+def undoable(func):
+    """Record a DSL command's changes as one undo step and report the call to command_hooks.
+    Nested commands join the outer step."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if history["current"] is not None:
+            return func(*args, **kwargs)
+        constraints = scene["constraints"]
+        change = {"before": {}, "added": [], "room": _room_state(), "constraints": constraints,
+                  "constraint_count": len(constraints)}
+        history["current"] = change
+        try:
+            with profiling.stage(func.__name__):
+                return func(*args, **kwargs)
+        finally:
+            history["current"] = None
+            _commit_change(change)
+    return recorded(wrapper)
+
+def _commit_change(change):
+    change["after"] = {}
+    for obj, before in list(change["before"].items()):
+        after = _object_state(obj)
+        if after == before:
+            del change["before"][obj]
+        else:
+            change["after"][obj] = after
+    # Appended records; if the list was replaced (compaction on save), the records that are
+    # not in both the list before the command and the one after, with their positions,
+    # since compaction keeps the order of the records it does not touch
+    constraints, count = change.pop("constraints"), change.pop("constraint_count")
+    if scene["constraints"] is constraints:
+        change["appended"] = scene["constraints"][count:]
+    else:
+        kept = set(map(id, scene["constraints"]))
+        before = set(id(constraints[i]) for i in range(count))
+        change["appended"] = []
+        change["replaced"] = ([(i, constraints[i]) for i in range(count) if id(constraints[i]) not in kept],
+                              [(i, record) for i, record in enumerate(scene["constraints"]) if id(record) not in before])
+    change["room"] = (change["room"], _room_state()) if change["room"] != _room_state() else None
+    if change["before"] or change["added"] or change["appended"] or change.get("replaced") or change["room"]:
+        history["undo"].append(change)
+        del history["undo"][:-history["limit"]]
+        history["redo"].clear()
+
+def _remove_tail(items, removed):
+    """Remove the given items (by identity), which are normally the tail of the list."""
+    k = len(removed)
+    if k and all(a is b for a, b in zip(items[-k:], removed)):
+        del items[-k:]
+    elif k:
+        ids = {id(item) for item in removed}
+        items[:] = [item for item in items if id(item) not in ids]
+
+def _splice(items, remove, insert):
+    """A copy of items without the (index, item) pairs in remove, then with those in insert
+    put back at their indices."""
+    removed = {index for index, _ in remove}
+    result = [item for index, item in enumerate(items) if index not in removed]
+    for index, item in insert:
+        result.insert(index, item)
+    return result
+
+def _set_room_state(room):
+    scene["room_width"], scene["room_depth"], scene["room_height"] = room
+    if scene.get("occupancy") is not None:
+        enable_occupancy_grid(scene["occupancy"].resolution)
+
+@recorded
+def undo():
+    """Revert the most recent DSL command."""
+    if not history["undo"]:
+        log.warning("Nothing to undo")
+        return False
+    change = history["undo"].pop()
+    if change["room"]:
+        _set_room_state(change["room"][0])
+    for obj in change["added"]:
+        if scene.get("occupancy") is not None:
+            scene["occupancy"].clear(obj)
+    _remove_tail(scene["objects"], change["added"])
+    for obj, state in change["before"].items():
+        _restore_object_state(obj, state)
+    _remove_tail(scene["constraints"], change["appended"])
+    if change.get("replaced"):
+        dropped, added = change["replaced"]
+        scene["constraints"] = _splice(scene["constraints"], added, dropped)
+    history["redo"].append(change)
+    log.info("Undid change to %s object(s), %s created", len(change['before']), len(change['added']))
+    save_scene()
+    return True
+
+@recorded
+def redo():
+    """Re-apply the most recently undone DSL command."""
+    if not history["redo"]:
+        log.warning("Nothing to redo")
+        return False
+    change = history["redo"].pop()
+    if change["room"]:
+        _set_room_state(change["room"][1])
+    scene["objects"].extend(change["added"])
+    for obj, state in change["after"].items():
+        _restore_object_state(obj, state)
+    for obj in change["added"]:
+        update_occupancy(obj)
+    scene["constraints"].extend(change["appended"])
+    if change.get("replaced"):
+        dropped, added = change["replaced"]
+        scene["constraints"] = _splice(scene["constraints"], dropped, added)
+    history["undo"].append(change)
+    log.info("Redid change to %s object(s), %s created", len(change['after']), len(change['added']))
+    save_scene()
+    return True
+
+def fit_bounds(obj, x, y, z):
+    """Set obj's centre and bounds without recording, restamping or re-checking support,
+    so it also works on probe objects that are not in the scene."""
     obj.x, obj.y, obj.z = x, y, z
-    half_width = float(obj.width) / 2
-    half_depth = float(obj.depth) / 2
     half_height = float(obj.height) / 2
-    obj.bbox = {
-        "x": [x - half_width, x + half_width],
-        "y": [y - half_depth, y + half_depth],
-        "z": [z - half_height, z + half_height]
-    }
-    print(f"[Debug] Placed {obj.description} at ({x:.2f}, {y:.2f}, {z:.2f})")
-    print(f"[Debug] BBox: x={obj.bbox['x']}, y={obj.bbox['y']}")
+    # Axis-aligned bounds of the rotated footprint (same routine as the batched refit)
+    min_x, max_x, min_y, max_y = (float(v) for v in rotated_bounds(x, y, float(obj.width), float(obj.depth), obj.rotation))
+    obj.bounds = (min_x, max_x, min_y, max_y, z - half_height, z + half_height)
+
+def calculate_position_and_bbox(obj, x, y, z):
+    _touch(obj)
+    fit_bounds(obj, x, y, z)
+    update_occupancy(obj)
+    check_support(obj)
+    log.debug("Placed %s at (%.2f, %.2f, %.2f)", obj.description, x, y, z)
+    log.debug("BBox: x=[%s, %s], y=[%s, %s]", *obj.bounds[:4])
+
+def half_extents(obj):
+    """Half extents along x and y of obj's rotated footprint."""
+    half_x, half_y = rotated_half_extents(float(obj.width), float(obj.depth), obj.rotation)
+    return float(half_x), float(half_y)
+
+def update_occupancy(obj):
+    """Restamp obj's footprint on the occupancy grid (or clear it if unplaced), if the grid is enabled."""
+    grid = scene.get("occupancy")
+    if grid is None:
+        return
+    if obj.x is None or obj.bounds is None:
+        grid.clear(obj)
+    else:
+        grid.stamp(obj, *obj.bounds[:4])
 
-def check_overlap_with_existing(target):
+@recorded
+def enable_occupancy_grid(resolution=0.05):
+    """Rasterize the room into an occupancy grid and keep it updated as objects move.
+    
+    Args:
+        resolution: Cell size in meters (default 0.05)
+    """
+    if not all([scene["room_width"], scene["room_depth"]]):
+        log.error("Room dimensions must be set before enabling the occupancy grid")
+        return None
+    grid = OccupancyGrid(scene["room_width"], scene["room_depth"], resolution)
+    scene["occupancy"] = grid
     for obj in scene["objects"]:
-        if obj == target or obj.x is None:
+        update_occupancy(obj)
+    log.info("Occupancy grid enabled: %sx%s cells at %sm", grid.cols, grid.rows, resolution)
+    return grid
+
+@recorded
+def disable_occupancy_grid():
+    """Stop maintaining the occupancy grid."""
+    scene["occupancy"] = None
+
+def is_area_free(x, y, width, depth):
+    """True if a width x depth footprint centred at (x, y) is not covered by any object."""
+    grid = scene.get("occupancy")
+    if grid is not None:
+        return grid.is_free(x - width / 2, x + width / 2, y - depth / 2, y + depth / 2)
+    probe = SceneObject("_probe", width, depth, 0)
+    probe.x, probe.y, probe.z = x, y, 0
+    # The probe spans every height, so anything above the area counts
+    probe.bounds = (x - width / 2, x + width / 2, y - depth / 2, y + depth / 2, -math.inf, math.inf)
+    return not check_overlap_with_existing(probe)[0]
+
+def nearest_free_spot(x, y, width, depth):
+    """Centre of the free width x depth footprint nearest to (x, y), or None.
+    
+    Uses the occupancy grid when enabled (cell-aligned result), otherwise the exact search.
+    """
+    grid = scene.get("occupancy")
+    if grid is not None:
+        return grid.nearest_free(x, y, width / 2, depth / 2)
+    probe = SceneObject("_probe", width, depth, 0)
+    return find_free_position(probe, x, y)
+
+def objects_on(base):
+    """Objects resting on base's top face, from the per-surface index."""
+    return list(scene["surfaces"].get(base, ()))
+
+def set_support(obj, base):
+    """Record that obj rests on base (or on nothing if base is None), keeping the surface index in step."""
+    if obj.support is base:
+        return
+    if obj.support is not None:
+        resting = scene["surfaces"].get(obj.support, [])
+        if obj in resting:
+            resting.remove(obj)
+        if not resting:
+            scene["surfaces"].pop(obj.support, None)
+    obj.support = base
+    if base is not None:
+        scene["surfaces"].setdefault(base, []).append(obj)
+
+def check_support(obj):
+    """Detach obj from its support once its bottom no longer sits on the support's top
+    face, or its centre has moved off that face."""
+    base = obj.support
+    if base is None:
+        return
+    top = base.bounds
+    if (obj.bounds is None or top is None or abs(obj.bounds[4] - top[5]) > SUPPORT_TOLERANCE or
+            not (top[0] <= obj.x <= top[1] and top[2] <= obj.y <= top[3])):
+        log.debug("%s no longer rests on %s", obj.description, base.description)
+        set_support(obj, None)
+
+def find_free_position_on(target, base, x, y):
+    """Return the (x, y) nearest to the given point where target fits on base's top face
+    without overlapping the other objects resting there, or None if there is no such spot."""
+    x0, x1, y0, y1 = base.bounds[:4]
+    obstacles = [[obj.bounds[0] - x0, obj.bounds[1] - x0, obj.bounds[2] - y0, obj.bounds[3] - y0]
+                 for obj in objects_on(base) if obj is not target and obj.bounds is not None]
+    half_x = (target.bounds[1] - target.bounds[0]) / 2
+    half_y = (target.bounds[3] - target.bounds[2]) / 2
+    spot = nearest_free_position(x - x0, y - y0, half_x, half_y, obstacles, (x1 - x0, y1 - y0))
+    return None if spot is None else (spot[0] + x0, spot[1] + y0)
+
+def footprints(objs):
+    """Return the (N, 4, 2) rotated footprint corners of placed objects."""
+    return footprint_corners([[obj.x, obj.y] for obj in objs],
+                             [[obj.width, obj.depth] for obj in objs],
+                             [obj.rotation for obj in objs])
+
+def check_overlap_with_existing(target, mode=None, objects=None):
+    """Check target against every placed object.
+
+    Objects only collide if their height intervals overlap too, so an object resting on
+    another (or mounted above it) is not a conflict.
+
+    Args:
+        target: Object to test, with up-to-date bounds
+        mode: "aabb" or "obb" (default collision_mode). In "obb" mode the axis-aligned
+            test only pre-filters candidates, which are then confirmed by a separating-axis
+            test on the rotated footprints.
+        objects: Objects to test against (default all objects in the scene)
+
+    Returns:
+        (True, description of the first overlapping object) or (False, None)
+    """
+    with profiling.stage("collision_check"):
+        return _check_overlap(target, mode or collision_mode, scene["objects"] if objects is None else objects)
+
+def _check_overlap(target, mode, objects):
+    profiling.count("overlap_checks")
+    profiling.count("overlap_pairs_tested", len(objects))
+    candidates = []
+    min_x, max_x, min_y, max_y, min_z, max_z = target.bounds
+    for obj in objects:
+        if obj is target or obj.x is None:
             continue
-        if (target.bbox["x"][1] > obj.bbox["x"][0] and target.bbox["x"][0] < obj.bbox["x"][1] and
-            target.bbox["y"][1] > obj.bbox["y"][0] and target.bbox["y"][0] < obj.bbox["y"][1]):
-            return True, obj.description
+        b = obj.bounds
+        if max_x > b[0] and min_x < b[1] and max_y > b[2] and min_y < b[3] and max_z > b[4] and min_z < b[5]:
+            if mode != "obb":
+                return True, obj.description
+            candidates.append(obj)
+    if candidates:
+        hits = obb_overlaps(footprints([target])[0], footprints(candidates))
+        if hits.any():
+            return True, candidates[int(np.argmax(hits))].description
     return False, None
 
-def within_room_boundaries(obj):
-    if not all([scene["room_width"], scene["room_depth"], scene["room_height"]]):
+def find_free_position(target, x, y):
+    """Return the (x, y) nearest to the given point where target fits inside the room
+    without overlapping any placed object at its height, or None if there is no such spot."""
+    profiling.count("free_position_searches")
+    z0, z1 = target.bounds[4:] if target.bounds is not None else (-math.inf, math.inf)
+    obstacles = [obj.bounds[:4] for obj in scene["objects"]
+                 if obj is not target and obj.x is not None and obj.bounds[5] > z0 and obj.bounds[4] < z1]
+    room = (scene["room_width"], scene["room_depth"]) if scene["room_width"] and scene["room_depth"] else None
+    half_x, half_y = (float(v) for v in rotated_half_extents(float(target.width), float(target.depth), target.rotation))
+    return nearest_free_position(x, y, half_x, half_y, obstacles, room)
+
+def settle_placement(target, x, y, z):
+    """Place target at (x, y, z); on overlap or leaving the room, move it to the nearest free spot.
+    
+    Returns:
+        (overlaps, overlapping description) for the final position
+    """
+    calculate_position_and_bbox(target, x, y, z)
+    overlaps, overlapping_obj = check_overlap_with_existing(target)
+    if overlaps or not within_room_boundaries(target):
+        profiling.count("placement_retries")
+        free = find_free_position(target, x, y)
+        if free is not None:
+            reason = f"Overlap with {overlapping_obj}" if overlaps else "Out of room bounds"
+            log.warning("%s - moving %s to nearest free position (%.2f, %.2f)", reason, target.description, free[0], free[1])
+            calculate_position_and_bbox(target, free[0], free[1], z)
+            overlaps, overlapping_obj = check_overlap_with_existing(target)
+    return overlaps, overlapping_obj
+
+def within_room_boundaries(obj, room=None):
+    """Whether obj's bounds lie inside the room (default the scene's (width, depth, height))."""
+    room_width, room_depth, room_height = room or (scene["room_width"], scene["room_depth"], scene["room_height"])
+    if not all([room_width, room_depth, room_height]):
         return True
-    return (obj.bbox["x"][0] >= 0 and obj.bbox["x"][1] <= scene["room_width"] and
-            obj.bbox["y"][0] >= 0 and obj.bbox["y"][1] <= scene["room_depth"] and
-            obj.bbox["z"][0] >= 0 and obj.bbox["z"][1] <= scene["room_height"])
+    min_x, max_x, min_y, max_y, min_z, max_z = obj.bounds
+    return (min_x >= 0 and max_x <= room_width and min_y >= 0 and max_y <= room_depth and
+            min_z >= 0 and max_z <= room_height)
 
-def save_scene():
-    if not all([scene["room_width"], scene["room_depth"], scene["room_height"]]):
-        print("[Warning] Cannot save scene: Room dimensions incomplete")
-        return
-    scene_data = {
+def scene_dict():
+    """The scene in the scene_state.json layout (placed objects only)."""
+    return {
         "room": {
             "width": scene["room_width"],
             "depth": scene["room_depth"],
@@ -75,22 +481,152 @@ def save_scene():
                 "y": obj.y,
                 "z": obj.z,
                 "rotation": obj.rotation,
-                "facing": obj.facing
+                "facing": obj.facing,
+                "support": obj.support.description if obj.support is not None else None
             } for obj in scene["objects"] if obj.x is not None
         ],
         "constraints": [vars(constraint) for constraint in scene["constraints"]]
     }
-    with open("scene_state.json", "w") as f:
-        json.dump(scene_data, f, indent=4)
-    print("[DSL] Scene saved to scene_state.json")
 
+# File last written and the saves to it since the last directory fsync, and the depth of
+# deferred_saves blocks with whether a save was held back by one
+_saves = {"path": None, "unsynced": 0, "deferred": 0, "pending": False}
+
+@profiling.timed("save")
+def save_scene():
+    if not save_enabled:
+        return
+    if not all([scene["room_width"], scene["room_depth"], scene["room_height"]]):
+        log.warning("Cannot save scene: Room dimensions incomplete")
+        return
+    # Compaction only runs in the saves of a command, whose undo step records the list it
+    # replaces; outside one (undo, redo, a deferred flush) nothing would restore it
+    if compact_on_save and history["current"] is not None:
+        result = constraint_solver.compact_constraints(report=False)
+        if result["after"] < result["before"]:
+            log.info("Compacted constraints: %s -> %s records", result['before'], result['after'])
+    if _saves["deferred"]:
+        _saves["pending"] = True
+        return
+    if _saves["path"] != scene_file:
+        sync_scene()
+        _saves["path"] = scene_file
+    _saves["unsynced"] += 1
+    sync = fsync_every > 0 and _saves["unsynced"] >= fsync_every
+    with storage.atomic_open(scene_file, "w", sync_directory=sync) as f:
+        json.dump(scene_dict(), f, indent=4)
+    if sync:
+        _saves["unsynced"] = 0
+    log.info("Scene saved to %s", scene_file)
+
+def sync_scene():
+    """Make saves whose rename the fsync_every batching has not synced yet durable."""
+    if _saves["unsynced"] and os.path.exists(_saves["path"]):
+        storage.fsync_directory(_saves["path"])
+    _saves["unsynced"] = 0
+
+atexit.register(sync_scene)
+
+@contextmanager
+def deferred_saves():
+    """Hold back save_scene inside the block and write the scene once at the end, for bursts
+    of commands. Blocks nest; only the outermost one writes."""
+    _saves["deferred"] += 1
+    try:
+        yield
+    finally:
+        _saves["deferred"] -= 1
+        if not _saves["deferred"] and _saves["pending"]:
+            _saves["pending"] = False
+            save_scene()
+
+def _read_scene_file(path):
+    """A saved scene as (room, descriptions, (N, 7) float array of x, y, z, width, depth,
+    height, rotation with NaN for unplaced coordinates, facings, support descriptions,
+    constraint records)."""
+    if is_binary_scene(path):
+        data = BinaryScene(path)
+        descriptions = list(data.descriptions)
+        facings = [data.facings[code] if code != NO_FACING else None for code in data.facing_codes.tolist()]
+        supports = [descriptions[i] if i >= 0 else None for i in data.support.tolist()]
+        return (data.room, descriptions, data.columns.T.astype(float), facings, supports, data.constraints)
+    if orjson is not None:
+        with open(path, "rb") as f:
+            data = orjson.loads(f.read())
+    else:
+        with open(path, "r") as f:
+            data = json.load(f)
+    records = data.get("objects", [])
+    params = np.array([[record.get(key) for key in ("x", "y", "z", "width", "depth", "height", "rotation")]
+                       for record in records], dtype=float).reshape(-1, 7)
+    params[:, 6] = np.nan_to_num(params[:, 6])
+    return (data.get("room") or {}, [record["description"] for record in records], params,
+            [record.get("facing") for record in records], [record.get("support") for record in records],
+            data.get("constraints", []))
+
+@recorded
+@profiling.timed("load")
+def load_scene(path="scene_state.json"):
+    """Replace the current scene with one saved by save_scene (JSON or binary).
+
+    Objects, their bboxes (refitted in one vectorized pass), supports and constraint
+    records are rebuilt in bulk; undo history is cleared. An occupancy grid that was
+    enabled stays enabled for the loaded room.
+
+    Args:
+        path: Scene file to read (default scene_state.json)
+
+    Returns:
+        True if the scene was loaded, False if the file is missing or invalid
+    """
+    try:
+        room, descriptions, params, facings, supports, constraints = _read_scene_file(path)
+    except FileNotFoundError:
+        log.error("Scene file '%s' not found.", path)
+        return False
+    except ValueError as e:  # json.JSONDecodeError and orjson's error are ValueErrors
+        log.error("Invalid scene file '%s': %s", path, e)
+        return False
+
+    grid = scene.get("occupancy")
+    reset_scene()
+    scene["room_width"], scene["room_depth"], scene["room_height"] = room.get("width"), room.get("depth"), room.get("height")
+
+    objects = []
+    for description, (x, y, z, width, depth, height, rotation), facing in zip(descriptions, params.tolist(), facings):
+        obj = SceneObject(description, width, depth, height)
+        if x == x and y == y and z == z:  # NaN marks an unplaced coordinate
+            obj.x, obj.y, obj.z = x, y, z
+        obj.rotation = int(rotation) if rotation.is_integer() else rotation
+        obj.facing = FACINGS.get(facing) or facing or "NORTH"
+        objects.append(obj)
+    scene["objects"] = objects
+
+    placed = ~np.isnan(params[:, :3]).any(axis=1)
+    if placed.any():
+        _fit_bboxes([objects[i] for i in np.flatnonzero(placed).tolist()], params[placed])
+    by_description = {obj.description: obj for obj in objects}
+    for obj, support in zip(objects, supports):
+        if support in by_description:
+            set_support(obj, by_description[support])
+
+    scene["constraints"] = [Constraint(record["type"], record["details"]) for record in constraints]
+    if grid is not None and scene["room_width"] and scene["room_depth"]:
+        enable_occupancy_grid(grid.resolution)
+    log.info("Loaded %s object(s) and %s constraint(s) from %s", len(objects), len(scene["constraints"]), path)
+    return True
+
+@undoable
 def set_room(width, depth, height):
     scene["room_width"] = width
     scene["room_depth"] = depth
     scene["room_height"] = height
-    print(f"[DSL] Room set to {width}x{depth}x{height}")
+    log.info("Room set to %sx%sx%s", width, depth, height)
+    if scene.get("occupancy") is not None:
+        enable_occupancy_grid(scene["occupancy"].resolution)
     save_scene()
 
+@undoable
 def create_object(description, width, depth, height, x=None, y=None, z=None, quantity=1):
     """Creates one or more objects with unique descriptions, appending numeric suffixes if needed."""
     created_objects = []
@@ -114,6 +650,8 @@ def create_object(description, width, depth, height, x=None, y=None, z=None, qua
         # Create new object with unique description
         obj = SceneObject(new_desc, width, depth, height)
         scene["objects"].append(obj)
+        if history["current"] is not None:
+            history["current"]["added"].append(obj)
         existing_descs.append(new_desc.lower())  # Update to avoid future conflicts
         
         # Place object if coordinates provided
@@ -122,96 +660,78 @@ def create_object(description, width, depth, height, x=None, y=None, z=None, qua
             calculate_position_and_bbox(obj, x, y, z)
             overlaps, overlapping_obj = check_overlap_with_existing(obj)
             if overlaps:
-                print(f"[Warning] {new_desc} overlaps with {overlapping_obj} - adjust manually")
+                log.warning("%s overlaps with %s - adjust manually", new_desc, overlapping_obj)
             elif not within_room_boundaries(obj):
-                print(f"[Warning] {new_desc} out of room bounds - adjust manually")
+                log.warning("%s out of room bounds - adjust manually", new_desc)
             else:
-                print(f"[DSL] Created and placed {new_desc} at ({x:.2f}, {y:.2f}, {z:.2f})")
+                log.info("Created and placed %s at (%.2f, %.2f, %.2f)", new_desc, x, y, z)
             save_scene()
         else:
-            print(f"[DSL] Created {new_desc} (unplaced)")
+            log.info("Created %s (unplaced)", new_desc)
         
         created_objects.append(obj)
     
     # Return single object if quantity=1, else list of objects
     return created_objects[0] if quantity == 1 else created_objects
 
+def relative_position(target, ref, direction, distance=0, offset_x=0, offset_y=0):
+    """Centre (x, y) that puts target `distance` beyond the `direction` side of ref, or None
+    for an unknown direction. Sides are those of the rotated footprints."""
+    ref_x, ref_y = half_extents(ref)
+    target_x, target_y = half_extents(target)
+    if direction == "EAST":
+        return ref.x + ref_x + target_x + distance + offset_x, ref.y + offset_y
+    if direction == "WEST":
+        return ref.x - ref_x - target_x - distance + offset_x, ref.y + offset_y
+    if direction == "NORTH":
+        return ref.x + offset_x, ref.y + ref_y + target_y + distance + offset_y
+    if direction == "SOUTH":
+        return ref.x + offset_x, ref.y - ref_y - target_y - distance + offset_y
+    log.error("Unsupported direction %s", direction)
+    return None
+
+@undoable
 def place_relative(target_desc, ref_desc, direction, distance = 0, offset_x=0, offset_y=0):
     target = next((obj for obj in scene["objects"] if obj.description == target_desc), None)
     ref = next((obj for obj in scene["objects"] if obj.description == ref_desc), None)
     if not target or not ref:
-        print(f"[Error] Object {target_desc} or {ref_desc} not found")
+        log.error("Object %s or %s not found", target_desc, ref_desc)
         return
     if ref.x is None or ref.y is None:
-        print(f"[Error] Reference {ref_desc} must be placed first")
+        log.error("Reference %s must be placed first", ref_desc)
         return
 
-    # Store original coordinates in case we need to revert
-    original_x, original_y, original_z = target.x, target.y, target.z
-    original_bbox = target.bbox.copy() if hasattr(target, 'bbox') and target.bbox else None
+    # Store the original state (position, bounds and support) in case we need to revert
+    original_state = _object_state(target)
 
-    print(f"[Debug] Placing {target_desc} {direction} of {ref_desc} with distance={distance}, offset_x={offset_x}, offset_y={offset_y}")
-    if direction == "EAST":
-        x = ref.x + (ref.width / 2) + (target.width / 2) + distance + offset_x
-        y = ref.y + offset_y
-    elif direction == "WEST":
-        x = ref.x - (ref.width / 2) - (target.width / 2) - distance + offset_x
-        y = ref.y + offset_y
-    elif direction == "NORTH":
-        x = ref.x + offset_x
-        y = ref.y + (ref.depth / 2) + (target.depth / 2) + distance + offset_y
-    elif direction == "SOUTH":
-        x = ref.x + offset_x
-        y = ref.y - (ref.depth / 2) - (target.depth / 2) - distance + offset_y
-    else:
-        print(f"[Error] Unsupported direction {direction}")
+    log.debug("Placing %s %s of %s with distance=%s, offset_x=%s, offset_y=%s", target_desc, direction, ref_desc, distance, offset_x, offset_y)
+    position = relative_position(target, ref, direction, distance, offset_x, offset_y)
+    if position is None:
         return
+    x, y = position
 
     z = target.height / 2
-    calculate_position_and_bbox(target, x, y, z)
-    overlaps, overlapping_obj = check_overlap_with_existing(target)
-    max_tries = 5
-    try_count = 0
-    while overlaps and try_count < max_tries:
-        print(f"[Warning] Overlap with {overlapping_obj} - adjusting {target_desc} attempt {try_count+1}")
-        if direction in ["EAST", "WEST"]:
-            y -= target.depth  # Shift SOUTH
-        else:
-            x += target.width if direction in ["NORTH"] else -target.width  # Shift EAST/WEST
-        calculate_position_and_bbox(target, x, y, z)
-        overlaps, overlapping_obj = check_overlap_with_existing(target)
-        try_count += 1
+    overlaps, overlapping_obj = settle_placement(target, x, y, z)
     
     if overlaps or not within_room_boundaries(target):
-        # Revert the object to its original state if it was previously placed
-        if original_x is not None and original_y is not None and original_z is not None:
-            target.x, target.y, target.z = original_x, original_y, original_z
-            if original_bbox:
-                target.bbox = original_bbox
-            if overlaps:
-                print(f"[Warning] Failed to place {target_desc} - object overlapping with {overlapping_obj}")
-            else:
-                 print(f"[Warning] Failed to place {target_desc} - object outside room constraints")
+        # Revert the object to its original state (unplaced if it was not placed before)
+        _restore_object_state(target, original_state)
+        if overlaps:
+            log.warning("Failed to place %s - object overlapping with %s", target_desc, overlapping_obj)
         else:
-            # If it was not previously placed, reset coordinates to None
-            target.x, target.y, target.z = None, None, None
-            target.bbox = None
-            if overlaps:
-                print(f"[Warning] Failed to place {target_desc} - object overlapping with {overlapping_obj}")
-            else:
-                 print(f"[Warning] Failed to place {target_desc} - object outside room constraints")
+            log.warning("Failed to place %s - object outside room constraints", target_desc)
         return
 
     # Successfully placed
     scene["constraints"].append(Constraint("PLACE_RELATIVE", {"target": target_desc, "reference": ref_desc, "direction": direction, "distance": distance, "offset_x": offset_x, "offset_y": offset_y}))
-    print(f"[DSL] Placed {target_desc} at ({target.x:.2f}, {target.y:.2f}, {target.z:.2f})")
+    log.info("Placed %s at (%.2f, %.2f, %.2f)", target_desc, target.x, target.y, target.z)
+    constraint_solver.propagate(target)
     save_scene()
 
 def get_corner_position(obj, corner):
     if obj.x is None or obj.y is None:
         return None
-    half_width = obj.width / 2
-    half_depth = obj.depth / 2
+    half_width, half_depth = half_extents(obj)
     corners = {
         "NE": (obj.x + half_width, obj.y + half_depth),
         "NW": (obj.x - half_width, obj.y + half_depth),
@@ -220,25 +740,13 @@ def get_corner_position(obj, corner):
     }
     return corners.get(corner)
 
-def align_corners(target_desc, target_corner, ref_desc, ref_corner, distance):
-    target = next((obj for obj in scene["objects"] if obj.description == target_desc), None)
-    ref = next((obj for obj in scene["objects"] if obj.description == ref_desc), None)
-    if not target or not ref:
-        print(f"[Error] Object {target_desc} or {ref_desc} not found")
-        return
-    if ref.x is None or ref.y is None:
-        print(f"[Error] Reference {ref_desc} must be placed first")
-        return
-
-    # Store original coordinates in case we need to revert
-    original_x, original_y, original_z = target.x, target.y, target.z
-    original_bbox = target.bbox.copy() if hasattr(target, 'bbox') and target.bbox else None
-
-    print(f"[Debug] Aligning {target_desc} {target_corner} to {ref_desc} {ref_corner} with distance={distance}")
+def corner_alignment_position(target, target_corner, ref, ref_corner, distance):
+    """Centre (x, y) that puts target's `target_corner` `distance` diagonally off ref's
+    `ref_corner`, or None for an unknown corner."""
     ref_corner_pos = get_corner_position(ref, ref_corner)
     if ref_corner_pos is None:
-        print(f"[Error] Invalid corner {ref_corner} for {ref_desc}")
-        return
+        log.error("Invalid corner %s for %s", ref_corner, ref.description)
+        return None
     R_x, R_y = ref_corner_pos
 
     diag = distance / math.sqrt(2)
@@ -251,103 +759,84 @@ def align_corners(target_desc, target_corner, ref_desc, ref_corner, distance):
     elif target_corner == "NE" and ref_corner == "SW":
         dx, dy = diag, diag
     else:
-        print(f"[Warning] Using default offset for {target_corner}-{ref_corner}")
+        log.warning("Using default offset for %s-%s", target_corner, ref_corner)
         dx, dy = -distance, -distance
 
+    half_width, half_depth = half_extents(target)
     if target_corner == "SW":
-        x = R_x + dx + target.width / 2
-        y = R_y + dy + target.depth / 2
-    elif target_corner == "SE":
-        x = R_x + dx - target.width / 2
-        y = R_y + dy + target.depth / 2
-    elif target_corner == "NW":
-        x = R_x + dx + target.width / 2
-        y = R_y + dy - target.depth / 2
-    elif target_corner == "NE":
-        x = R_x + dx - target.width / 2
-        y = R_y + dy - target.depth / 2
-    else:
-        print(f"[Error] Invalid target corner {target_corner}")
+        return R_x + dx + half_width, R_y + dy + half_depth
+    if target_corner == "SE":
+        return R_x + dx - half_width, R_y + dy + half_depth
+    if target_corner == "NW":
+        return R_x + dx + half_width, R_y + dy - half_depth
+    if target_corner == "NE":
+        return R_x + dx - half_width, R_y + dy - half_depth
+    log.error("Invalid target corner %s", target_corner)
+    return None
+
+@undoable
+def align_corners(target_desc, target_corner, ref_desc, ref_corner, distance):
+    target = next((obj for obj in scene["objects"] if obj.description == target_desc), None)
+    ref = next((obj for obj in scene["objects"] if obj.description == ref_desc), None)
+    if not target or not ref:
+        log.error("Object %s or %s not found", target_desc, ref_desc)
+        return
+    if ref.x is None or ref.y is None:
+        log.error("Reference %s must be placed first", ref_desc)
+        return
+
+    # Store the original state (position, bounds and support) in case we need to revert
+    original_state = _object_state(target)
+
+    log.debug("Aligning %s %s to %s %s with distance=%s", target_desc, target_corner, ref_desc, ref_corner, distance)
+    position = corner_alignment_position(target, target_corner, ref, ref_corner, distance)
+    if position is None:
         return
+    x, y = position
 
     z = target.height / 2
-    calculate_position_and_bbox(target, x, y, z)
-    overlaps, overlapping_obj = check_overlap_with_existing(target)
-    max_tries = 5
-    try_count = 0
-    while overlaps and try_count < max_tries:
-        print(f"[Warning] Overlap with {overlapping_obj} - adjusting {target_desc} attempt {try_count+1}")
-        if 'EAST' in target_corner:
-            x += target.width
-        elif 'WEST' in target_corner:
-            x -= target.width
-        if 'NORTH' in target_corner:
-            y += target.depth
-        elif 'SOUTH' in target_corner:
-            y -= target.depth
-        calculate_position_and_bbox(target, x, y, z)
-        overlaps, overlapping_obj = check_overlap_with_existing(target)
-        try_count += 1
+    overlaps, overlapping_obj = settle_placement(target, x, y, z)
     
     if overlaps or not within_room_boundaries(target):
-        # Revert the object to its original state if it was previously placed
-        if original_x is not None and original_y is not None and original_z is not None:
-            target.x, target.y, target.z = original_x, original_y, original_z
-            if original_bbox:
-                target.bbox = original_bbox
-            print(f"[Warning] Failed to place {target_desc} - reverted to original position")
+        # Revert the object to its original state (unplaced if it was not placed before)
+        _restore_object_state(target, original_state)
+        if original_state[0] is not None:
+            log.warning("Failed to place %s - reverted to original position", target_desc)
         else:
-            # If it was not previously placed, reset coordinates to None
-            target.x, target.y, target.z = None, None, None
-            target.bbox = None
-            print(f"[Warning] Failed to place {target_desc} - object remains unplaced")
+            log.warning("Failed to place %s - object remains unplaced", target_desc)
         return
         
     # Successfully placed
     scene["constraints"].append(Constraint("ALIGN_CORNERS", {"target": target_desc, "target_corner": target_corner, "reference": ref_desc, "reference_corner": ref_corner, "distance": distance}))
-    print(f"[DSL] Placed {target_desc} at ({target.x:.2f}, {target.y:.2f}, {target.z:.2f})")
+    log.info("Placed %s at (%.2f, %.2f, %.2f)", target_desc, target.x, target.y, target.z)
+    constraint_solver.propagate(target)
     save_scene()
 
-def align_object(target_name, mode, target_anchor, ref_name, ref_anchor, offset=0.2, direction=None):
-    target = next((obj for obj in scene["objects"] if obj.description == target_name), None)
-    ref = next((obj for obj in scene["objects"] if obj.description == ref_name), None)
-
-    if target is None or ref is None:
-        print(f"[Error] One or both objects not found.")
-        return
-    if ref.x is None or ref.y is None:
-        print(f"[Error] Reference '{ref_name}' must be placed before alignment.")
-        return
-
-    # Store original coordinates in case we need to revert
-    original_x, original_y, original_z = target.x, target.y, target.z
-    original_bbox = target.bbox.copy() if hasattr(target, 'bbox') and target.bbox else None
-
-    def get_corner_pos(obj, anchor):
-        hw, hd = obj.width / 2, obj.depth / 2
-        return {
-            "NW": (obj.x - hw, obj.y + hd),
-            "NE": (obj.x + hw, obj.y + hd),
-            "SW": (obj.x - hw, obj.y - hd),
-            "SE": (obj.x + hw, obj.y - hd)
-        }[anchor]
-
-    def get_edge_pos(obj, anchor):
-        hw, hd = obj.width / 2, obj.depth / 2
-        return {
-            "NORTH": (obj.x, obj.y + hd),
-            "SOUTH": (obj.x, obj.y - hd),
-            "EAST": (obj.x + hw, obj.y),
-            "WEST": (obj.x - hw, obj.y)
-        }[anchor]
+def get_edge_position(obj, edge):
+    """Midpoint of obj's NORTH, SOUTH, EAST or WEST side, or None."""
+    half_width, half_depth = half_extents(obj)
+    return {
+        "NORTH": (obj.x, obj.y + half_depth),
+        "SOUTH": (obj.x, obj.y - half_depth),
+        "EAST": (obj.x + half_width, obj.y),
+        "WEST": (obj.x - half_width, obj.y)
+    }.get(edge)
 
+def aligned_position(target, mode, target_anchor, ref, ref_anchor, offset=0.2, direction=None):
+    """Centre (x, y) that aligns target's anchor to ref's as align_object does, or None for
+    an invalid mode, anchor or direction."""
     if mode == "corner":
-        ref_pos = get_corner_pos(ref, ref_anchor)
+        ref_pos = get_corner_position(ref, ref_anchor)
     elif mode == "edge":
-        ref_pos = get_edge_pos(ref, ref_anchor)
+        ref_pos = get_edge_position(ref, ref_anchor)
     else:
-        print("[Error] Invalid mode. Use 'corner' or 'edge'.")
-        return
+        log.error("Invalid mode. Use 'corner' or 'edge'.")
+        return None
+    if ref_pos is None:
+        log.error("Invalid %s anchor '%s'", mode, ref_anchor)
+        return None
+    ref_width, ref_depth = half_extents(ref)
+    half_width, half_depth = half_extents(target)
 
     # Compute new target center based on alignment
     if mode == "corner":
@@ -359,115 +848,103 @@ def align_object(target_name, mode, target_anchor, ref_name, ref_anchor, offset=
 
         # Compute center from corner
         center_offsets = {
-            "NW": (target.width / 2, -target.depth / 2),
-            "NE": (-target.width / 2, -target.depth / 2),
-            "SW": (target.width / 2, target.depth / 2),
-            "SE": (-target.width / 2, target.depth / 2)
+            "NW": (half_width, -half_depth),
+            "NE": (-half_width, -half_depth),
+            "SW": (half_width, half_depth),
+            "SE": (-half_width, half_depth)
         }
+        if target_anchor not in center_offsets:
+            log.error("Invalid corner anchor '%s'", target_anchor)
+            return None
         cx, cy = center_offsets[target_anchor]
-        new_x = corner_x + cx
-        new_y = corner_y + cy
-        z = target.height / 2
-        calculate_position_and_bbox(target, new_x, new_y, z)
-        
-        # Check for overlaps and room boundaries
-        overlaps, overlapping_obj = check_overlap_with_existing(target)
-        max_tries = 5
-        try_count = 0
-        while overlaps and try_count < max_tries:
-            print(f"[Warning] Overlap with {overlapping_obj} - adjusting {target_name} attempt {try_count+1}")
-            if 'EAST' in target_anchor:
-                new_x += target.width
-            elif 'WEST' in target_anchor:
-                new_x -= target.width
-            if 'NORTH' in target_anchor:
-                new_y += target.depth
-            elif 'SOUTH' in target_anchor:
-                new_y -= target.depth
-            calculate_position_and_bbox(target, new_x, new_y, z)
-            overlaps, overlapping_obj = check_overlap_with_existing(target)
-            try_count += 1
-        
-        if overlaps or not within_room_boundaries(target):
-            # Revert the object to its original state if it was previously placed
-            if original_x is not None and original_y is not None and original_z is not None:
-                target.x, target.y, target.z = original_x, original_y, original_z
-                if original_bbox:
-                    target.bbox = original_bbox
-                print(f"[Warning] Failed to place {target_name} - reverted to original position")
+        return corner_x + cx, corner_y + cy
+
+    # Define offset based on direction for side-by-side placement
+    if direction:
+        if ref_anchor in ["NORTH", "SOUTH"]:
+            if direction == "EAST":
+                offset_x = ref_width + half_width + offset
+                offset_y = 0
+            elif direction == "WEST":
+                offset_x = -(ref_width + half_width + offset)
+                offset_y = 0
             else:
-                # If it was not previously placed, reset coordinates to None
-                target.x, target.y, target.z = None, None, None
-                target.bbox = None
-                print(f"[Warning] Failed to place {target_name} - object remains unplaced")
-            return
-    else:  # edge
-        # Define offset based on direction for side-by-side placement
-        if direction:
-            if ref_anchor in ["NORTH", "SOUTH"]:
-                if direction == "EAST":
-                    offset_x = ref.width / 2 + target.width / 2 + offset
-                    offset_y = 0
-                elif direction == "WEST":
-                    offset_x = -(ref.width / 2 + target.width / 2 + offset)
-                    offset_y = 0
-                else:
-                    print(f"[Error] Invalid direction '{direction}' for NORTH/SOUTH alignment. Use 'east' or 'west'.")
-                    return
-            elif ref_anchor in ["EAST", "WEST"]:
-                if direction == "NORTH":
-                    offset_x = 0
-                    offset_y = ref.depth / 2 + target.depth / 2 + offset
-                elif direction == "SOUTH":
-                    offset_x = 0
-                    offset_y = -(ref.depth / 2 + target.depth / 2 + offset)
-                else:
-                    print(f"[Error] Invalid direction '{direction}' for EAST/WEST alignment. Use 'north' or 'south'.")
-                    return
+                log.error("Invalid direction '%s' for NORTH/SOUTH alignment. Use 'east' or 'west'.", direction)
+                return None
         else:
-            # Default offset (as before, but may cause overlap)
-            edge_offset_directions = {
-                "NORTH": (offset, 0),
-                "SOUTH": (offset, 0),
-                "EAST": (0, offset),
-                "WEST": (0, offset)
-            }
-            offset_x, offset_y = edge_offset_directions[ref_anchor]
-
-        tx, ty = ref_pos[0] + offset_x, ref_pos[1] + offset_y
-
-        edge_offset = {
-            "NORTH": (0, -target.depth / 2),
-            "SOUTH": (0, target.depth / 2),
-            "EAST": (-target.width / 2, 0),
-            "WEST": (target.width / 2, 0)
-        }[target_anchor]
-
-        cx, cy = edge_offset
-        x = tx + cx
-        y = ty + cy
-        z = target.height / 2
+            if direction == "NORTH":
+                offset_x = 0
+                offset_y = ref_depth + half_depth + offset
+            elif direction == "SOUTH":
+                offset_x = 0
+                offset_y = -(ref_depth + half_depth + offset)
+            else:
+                log.error("Invalid direction '%s' for EAST/WEST alignment. Use 'north' or 'south'.", direction)
+                return None
+    else:
+        # Default offset (as before, but may cause overlap)
+        edge_offset_directions = {
+            "NORTH": (offset, 0),
+            "SOUTH": (offset, 0),
+            "EAST": (0, offset),
+            "WEST": (0, offset)
+        }
+        offset_x, offset_y = edge_offset_directions[ref_anchor]
+
+    tx, ty = ref_pos[0] + offset_x, ref_pos[1] + offset_y
+    edge_offset = {
+        "NORTH": (0, -half_depth),
+        "SOUTH": (0, half_depth),
+        "EAST": (-half_width, 0),
+        "WEST": (half_width, 0)
+    }
+    if target_anchor not in edge_offset:
+        log.error("Invalid edge anchor '%s'", target_anchor)
+        return None
+    cx, cy = edge_offset[target_anchor]
+    return tx + cx, ty + cy
+
+@undoable
+def align_object(target_name, mode, target_anchor, ref_name, ref_anchor, offset=0.2, direction=None):
+    target = next((obj for obj in scene["objects"] if obj.description == target_name), None)
+    ref = next((obj for obj in scene["objects"] if obj.description == ref_name), None)
+
+    if target is None or ref is None:
+        log.error("One or both objects not found.")
+        return
+    if ref.x is None or ref.y is None:
+        log.error("Reference '%s' must be placed before alignment.", ref_name)
+        return
+
+    # Store the original state (position, bounds and support) in case we need to revert
+    original_state = _object_state(target)
+
+    position = aligned_position(target, mode, target_anchor, ref, ref_anchor, offset, direction)
+    if position is None:
+        return
+    x, y = position
+    z = target.height / 2
+
+    if mode == "corner":
+        # Check for overlaps and room boundaries, moving to the nearest free spot if needed
+        overlaps, overlapping_obj = settle_placement(target, x, y, z)
+    else:
         calculate_position_and_bbox(target, x, y, z)
-        
-        # Check for overlaps and room boundaries
         overlaps, overlapping_obj = check_overlap_with_existing(target)
-        if overlaps or not within_room_boundaries(target):
-            # Revert the object to its original state if it was previously placed
-            if original_x is not None and original_y is not None and original_z is not None:
-                target.x, target.y, target.z = original_x, original_y, original_z
-                if original_bbox:
-                    target.bbox = original_bbox
-                print(f"[Warning] Failed to place {target_name} - reverted to original position")
-            else:
-                # If it was not previously placed, reset coordinates to None
-                target.x, target.y, target.z = None, None, None
-                target.bbox = None
-                print(f"[Warning] Failed to place {target_name} - object remains unplaced")
-            return
+
+    if overlaps or not within_room_boundaries(target):
+        # Revert the object to its original state (unplaced if it was not placed before)
+        _restore_object_state(target, original_state)
+        if original_state[0] is not None:
+            log.warning("Failed to place %s - reverted to original position", target_name)
+        else:
+            log.warning("Failed to place %s - object remains unplaced", target_name)
+        return
 
     # Successfully placed
     scene["constraints"].append(Constraint("ALIGN_OBJECT", {"target": target_name, "mode": mode, "target_anchor": target_anchor, "reference": ref_name, "reference_anchor": ref_anchor, "offset": offset, "direction": direction}))
-    print(f"[DSL] Aligned '{target_name}' {mode}({target_anchor}) to '{ref_name}' {mode}({ref_anchor}) with offset={offset} direction={direction}")
+    log.info("Aligned '%s' %s(%s) to '%s' %s(%s) with offset=%s direction=%s", target_name, mode, target_anchor, ref_name, mode, ref_anchor, offset, direction)
+    constraint_solver.propagate(target)
     save_scene()
 
 # def place_in_room_corner(obj_desc, corner, wall_distance=0.2):
@@ -519,6 +996,38 @@ def align_object(target_name, mode, target_anchor, ref_name, ref_anchor, offset=
 #     print(f"[DSL] Placed {obj_desc} in room corner {corner} at ({x:.2f}, {y:.2f}, {z:.2f})")
 #     save_scene()
 
+def on_top_position(top, bottom, x_offset=0, y_offset=0, z_offset=0):
+    """Centre (x, y, z) that stands top on bottom's top face, shifted by the offsets."""
+    return (bottom.x + x_offset, bottom.y + y_offset,
+            bottom.z + (bottom.height / 2) + (top.height / 2) + z_offset)
+
+def settle_on_top(top, base, x, y, z, supported=True):
+    """Place top at (x, y, z) on base; on overlap with another object resting there, move it
+    to the nearest free spot on base's top face.
+
+    Args:
+        supported: Record that top rests on base (if its centre is over the face)
+
+    Returns:
+        (overlaps, overlapping description) for the final position
+    """
+    calculate_position_and_bbox(top, x, y, z)
+    if supported:
+        set_support(top, base)
+        check_support(top)
+
+    # Only the objects sharing the base's top face can collide with a stacked object
+    siblings = [obj for obj in objects_on(base) if obj is not top]
+    overlaps, overlapping_obj = check_overlap_with_existing(top, objects=siblings)
+    if overlaps:
+        free = find_free_position_on(top, base, x, y)
+        if free is not None:
+            log.warning("Overlap with %s - moving %s to nearest free spot on %s (%.2f, %.2f)", overlapping_obj, top.description, base.description, free[0], free[1])
+            calculate_position_and_bbox(top, free[0], free[1], z)
+            overlaps, overlapping_obj = check_overlap_with_existing(top, objects=siblings)
+    return overlaps, overlapping_obj
+
+@undoable
 def place_on_top(top_obj_desc, bottom_obj_desc, x_offset=0, y_offset=0, z_offset=0):
     """Places an object on top of another object.
     
@@ -533,32 +1042,52 @@ def place_on_top(top_obj_desc, bottom_obj_desc, x_offset=0, y_offset=0, z_offset
     bottom_obj = next((o for o in scene["objects"] if o.description == bottom_obj_desc), None)
     
     if not top_obj or not bottom_obj:
-        print(f"[Error] Object {top_obj_desc} or {bottom_obj_desc} not found")
+        log.error("Object %s or %s not found", top_obj_desc, bottom_obj_desc)
         return
         
     if bottom_obj.x is None or bottom_obj.y is None:
-        print(f"[Error] Base object {bottom_obj_desc} must be placed first")
+        log.error("Base object %s must be placed first", bottom_obj_desc)
         return
         
     # Check if top object fits on bottom object
     if top_obj.width > bottom_obj.width or top_obj.depth > bottom_obj.depth:
-        print(f"[Warning] {top_obj_desc} is larger than {bottom_obj_desc} and may overhang")
+        log.warning("%s is larger than %s and may overhang", top_obj_desc, bottom_obj_desc)
         
     # Calculate position
-    x = bottom_obj.x + x_offset
-    y = bottom_obj.y + y_offset
-    z = bottom_obj.z + (bottom_obj.height / 2) + (top_obj.height / 2) + z_offset
-    
-    calculate_position_and_bbox(top_obj, x, y, z)
-    
-    # We don't check overlaps for stacked objects since they're meant to overlap vertically
+    x, y, z = on_top_position(top_obj, bottom_obj, x_offset, y_offset, z_offset)
+    overlaps, overlapping_obj = settle_on_top(top_obj, bottom_obj, x, y, z, supported=not z_offset)
+    if overlaps:
+        log.warning("%s overlaps with %s on %s - adjust manually", top_obj_desc, overlapping_obj, bottom_obj_desc)
     
     scene["constraints"].append(Constraint("PLACE_ON_TOP", 
                                {"top": top_obj_desc, "bottom": bottom_obj_desc, 
                                 "x_offset": x_offset, "y_offset": y_offset, "z_offset": z_offset}))
-    print(f"[DSL] Placed {top_obj_desc} on top of {bottom_obj_desc} at ({x:.2f}, {y:.2f}, {z:.2f})")
+    log.info("Placed %s on top of %s at (%.2f, %.2f, %.2f)", top_obj_desc, bottom_obj_desc, top_obj.x, top_obj.y, top_obj.z)
+    constraint_solver.propagate(top_obj)
     save_scene()
 
+def wall_position(obj, wall, position=0.5, wall_distance=0.2, room=None):
+    """Centre (x, y) and facing that put obj `wall_distance` off a wall, `position` of the way
+    along it, or None for an unknown wall.
+
+    Args:
+        room: (width, depth) to place in (default the scene's room)
+    """
+    room_width, room_depth = room or (scene["room_width"], scene["room_depth"])
+    half_width = obj.width / 2
+    half_depth = obj.depth / 2
+    if wall == "NORTH":
+        return room_width * position, room_depth - half_depth - wall_distance, "SOUTH"
+    if wall == "EAST":
+        return room_width - half_width - wall_distance, room_depth * position, "WEST"
+    if wall == "SOUTH":
+        return room_width * position, half_depth + wall_distance, "NORTH"
+    if wall == "WEST":
+        return half_width + wall_distance, room_depth * position, "EAST"
+    log.error("Invalid wall %s, use 'NORTH', 'EAST', 'SOUTH', or 'WEST'", wall)
+    return None
+
+@undoable
 def mount_on_wall(obj_desc, wall, distance=0.05, position=0.5, height=None):
     """Mounts an object on a specified wall.
     
@@ -570,12 +1099,12 @@ def mount_on_wall(obj_desc, wall, distance=0.05, position=0.5, height=None):
         height: Height from floor (if None, uses 2/3 of room height)
     """
     if not all([scene["room_width"], scene["room_depth"], scene["room_height"]]):
-        print("[Error] Room dimensions must be set before using mount_on_wall")
+        log.error("Room dimensions must be set before using mount_on_wall")
         return
         
     obj = next((o for o in scene["objects"] if o.description == obj_desc), None)
     if not obj:
-        print(f"[Error] Object {obj_desc} not found")
+        log.error("Object %s not found", obj_desc)
         return
         
     # Set default mounting height if not specified
@@ -583,43 +1112,29 @@ def mount_on_wall(obj_desc, wall, distance=0.05, position=0.5, height=None):
         height = scene["room_height"] * (2/3)
     
     # Calculate position based on wall
-    half_width = obj.width / 2
-    half_depth = obj.depth / 2
-    
-    if wall == "NORTH":
-        x = scene["room_width"] * position
-        y = scene["room_depth"] - half_depth - distance
-        facing = "SOUTH"
-    elif wall == "EAST":
-        x = scene["room_width"] - half_width - distance
-        y = scene["room_depth"] * position
-        facing = "WEST"
-    elif wall == "SOUTH":
-        x = scene["room_width"] * position
-        y = half_depth + distance
-        facing = "NORTH"
-    elif wall == "WEST":
-        x = half_width + distance
-        y = scene["room_depth"] * position
-        facing = "EAST"
-    else:
-        print(f"[Error] Invalid wall {wall}, use 'NORTH', 'EAST', 'SOUTH', or 'WEST'")
+    placement = wall_position(obj, wall, position, distance)
+    if placement is None:
         return
+    x, y, facing = placement
         
     z = height
     calculate_position_and_bbox(obj, x, y, z)
     obj.facing = facing
     
+    # Objects placed relative to / on top of this one follow it
+    constraint_solver.propagate(obj)
+
     overlaps, overlapping_obj = check_overlap_with_existing(obj)
     if overlaps:
-        print(f"[Warning] {obj_desc} overlaps with {overlapping_obj} - adjust manually")
+        log.warning("%s overlaps with %s - adjust manually", obj_desc, overlapping_obj)
         
     scene["constraints"].append(Constraint("MOUNT_ON_WALL", 
                                {"object": obj_desc, "wall": wall, 
                                 "distance": distance, "position": position, "height": height}))
-    print(f"[DSL] Mounted {obj_desc} on {wall} wall at ({x:.2f}, {y:.2f}, {z:.2f}) facing {facing}")
+    log.info("Mounted %s on %s wall at (%.2f, %.2f, %.2f) facing %s", obj_desc, wall, x, y, z, facing)
     save_scene()
 
+@undoable
 def move_object(obj_desc, direction, distance):
     """Moves an object in the specified direction by a given distance.
     
@@ -630,13 +1145,15 @@ def move_object(obj_desc, direction, distance):
     """
     obj = next((o for o in scene["objects"] if o.description == obj_desc), None)
     if not obj:
-        print(f"[Error] Object {obj_desc} not found")
+        log.error("Object %s not found", obj_desc)
         return
         
     if obj.x is None or obj.y is None:
-        print(f"[Error] Object {obj_desc} must be placed before moving")
+        log.error("Object %s must be placed before moving", obj_desc)
         return
         
+    _touch(obj)
+    
     # Calculate new position based on direction
     if direction == "NORTH":
         obj.y += distance
@@ -647,24 +1164,28 @@ def move_object(obj_desc, direction, distance):
     elif direction == "WEST":
         obj.x -= distance
     else:
-        print(f"[Error] Invalid direction {direction}, use 'NORTH', 'EAST', 'SOUTH', or 'WEST'")
+        log.error("Invalid direction %s, use 'NORTH', 'EAST', 'SOUTH', or 'WEST'", direction)
         return
         
     # Update bounding box
     calculate_position_and_bbox(obj, obj.x, obj.y, obj.z)
     
+    # Objects placed relative to / on top of this one follow it
+    constraint_solver.propagate(obj)
+
     overlaps, overlapping_obj = check_overlap_with_existing(obj)
     if overlaps:
-        print(f"[Warning] {obj_desc} now overlaps with {overlapping_obj} after moving")
+        log.warning("%s now overlaps with %s after moving", obj_desc, overlapping_obj)
         
     if not within_room_boundaries(obj):
-        print(f"[Warning] {obj_desc} is now outside room boundaries after moving")
+        log.warning("%s is now outside room boundaries after moving", obj_desc)
         
     scene["constraints"].append(Constraint("MOVE", 
                                {"object": obj_desc, "direction": direction, "distance": distance}))
-    print(f"[DSL] Moved {obj_desc} {direction} by {distance}m to ({obj.x:.2f}, {obj.y:.2f}, {obj.z:.2f})")
+    log.info("Moved %s %s by %sm to (%.2f, %.2f, %.2f)", obj_desc, direction, distance, obj.x, obj.y, obj.z)
     save_scene()
 
+@undoable
 def rotate_object(obj_desc, turns=1):
     """Rotates an object by 90-degree increments clockwise.
     
@@ -674,21 +1195,22 @@ def rotate_object(obj_desc, turns=1):
     """
     obj = next((o for o in scene["objects"] if o.description == obj_desc), None)
     if not obj:
-        print(f"[Error] Object {obj_desc} not found")
+        log.error("Object %s not found", obj_desc)
         return
         
     if obj.x is None or obj.y is None:
-        print(f"[Error] Object {obj_desc} must be placed before rotating")
+        log.error("Object %s must be placed before rotating", obj_desc)
         return
     
     # Store original position and dimensions
+    _touch(obj)
     original_x, original_y = obj.x, obj.y
     original_width, original_depth = obj.width, obj.depth
     
     # Normalize turns to 0-3 range
     turns = turns % 4
     if turns == 0:
-        print(f"[Info] No rotation needed (0 degrees)")
+        log.info("No rotation needed (0 degrees)")
         return
     
     # Update facing direction
@@ -723,128 +1245,125 @@ def rotate_object(obj_desc, turns=1):
     calculate_rotated_bbox(obj)
     
     # Check for collisions with the new position and bbox
+    # Objects placed relative to / on top of this one follow it
+    constraint_solver.propagate(obj)
+
     overlaps, overlapping_obj = check_overlap_with_existing(obj)
     if overlaps:
-        print(f"[Warning] {obj_desc} now overlaps with {overlapping_obj} after rotation")
+        log.warning("%s now overlaps with %s after rotation", obj_desc, overlapping_obj)
         
     if not within_room_boundaries(obj):
-        print(f"[Warning] {obj_desc} is now outside room boundaries after rotation")
+        log.warning("%s is now outside room boundaries after rotation", obj_desc)
     
     scene["constraints"].append(Constraint("ROTATE", 
                               {"object": obj_desc, "turns": turns}))
-    print(f"[DSL] Rotated {obj_desc} {turns*90} degrees clockwise to face {obj.facing}")
-    print(f"[DSL] New center position: ({obj.x:.2f}, {obj.y:.2f})")
+    log.info("Rotated %s %s degrees clockwise to face %s", obj_desc, turns*90, obj.facing)
+    log.info("New center position: (%.2f, %.2f)", obj.x, obj.y)
     save_scene()
 
 def calculate_rotated_bbox(obj):
     """Calculate bounding box for a rotated object."""
-    x, y, z = obj.x, obj.y, obj.z
-    half_width = float(obj.width) / 2
-    half_depth = float(obj.depth) / 2
-    half_height = float(obj.height) / 2
-    
-    # Determine rotation angle in radians
-    angle_rad = math.radians(obj.rotation)
-    
-    # Calculate the corners of the bounding box (before rotation, around origin)
-    corners = [
-        [-half_width, -half_depth],  # back-left
-        [half_width, -half_depth],   # back-right
-        [half_width, half_depth],    # front-right
-        [-half_width, half_depth],   # front-left
-    ]
-    
-    # Apply rotation around the origin, then translate to final position
-    rotated_corners = []
-    for corner_x, corner_y in corners:
-        # Apply rotation
-        rx = corner_x * math.cos(angle_rad) - corner_y * math.sin(angle_rad)
-        ry = corner_x * math.sin(angle_rad) + corner_y * math.cos(angle_rad)
-        
-        # Translate to final position
-        rotated_corners.append([rx + x, ry + y])
-    
-    # Find the min and max x, y coordinates for the axis-aligned bounding box
-    min_x = min(corner[0] for corner in rotated_corners)
-    max_x = max(corner[0] for corner in rotated_corners)
-    min_y = min(corner[1] for corner in rotated_corners)
-    max_y = max(corner[1] for corner in rotated_corners)
-    
-    # Update the object's bounding box
-    obj.bbox = {
-        "x": [min_x, max_x],
-        "y": [min_y, max_y],
-        "z": [z - half_height, z + half_height]
-    }
+    calculate_position_and_bbox(obj, obj.x, obj.y, obj.z)
+
+def refit_bboxes(objects=None, track=True):
+    """Recompute the rotated bounding boxes of many objects in one vectorized pass.
+
+    Args:
+        objects: Objects to refit (default all objects in the scene); unplaced ones are skipped
+        track: Record and restamp the refitted objects (False for probe objects outside the scene)
+
+    Returns:
+        Number of objects refitted
+    """
+    objects = [obj for obj in (scene["objects"] if objects is None else objects) if obj.x is not None]
+    if not objects:
+        return 0
+    params = np.array([[obj.x, obj.y, obj.z, obj.width, obj.depth, obj.height, obj.rotation] for obj in objects], dtype=float)
+    _fit_bboxes(objects, params, track)
+    return len(objects)
+
+def _fit_bboxes(objects, params, track=True):
+    """Set the rotated bboxes of objects from their (N, 7) x, y, z, width, depth, height, rotation rows."""
+    min_x, max_x, min_y, max_y = rotated_bounds(params[:, 0], params[:, 1], params[:, 3], params[:, 4], params[:, 6])
+    min_z = params[:, 2] - params[:, 5] / 2
+    max_z = params[:, 2] + params[:, 5] / 2
+    # Outside a command and without a grid there is nothing to record or restamp
+    tracked = track and (history["current"] is not None or scene.get("occupancy") is not None)
+    for obj, bounds in zip(objects, zip(min_x.tolist(), max_x.tolist(), min_y.tolist(),
+                                        max_y.tolist(), min_z.tolist(), max_z.tolist())):
+        if tracked:
+            _touch(obj)
+        obj.bounds = bounds
+        if tracked:
+            update_occupancy(obj)
+
+def room_corner_position(obj, corner, wall_distance=0.2, facing=None, room=None):
+    """Centre (x, y), facing and rotation that put obj `wall_distance` off both walls of a
+    corner, turned to face the room, or None for an unknown corner or facing.
+
+    Args:
+        facing: Facing to turn obj to (default away from the corner's side wall)
+        room: (width, depth) to place in (default the scene's room)
+    """
+    room_width, room_depth = room or (scene["room_width"], scene["room_depth"])
+    # default facing by corner
+    if facing is None :
+        facing = {"NE":"WEST", "NW":"EAST", "SE":"WEST", "SW":"EAST"}.get(corner, "NORTH")
+    facings = ["NORTH","EAST","SOUTH","WEST"]
+    if facing not in facings or corner not in ["NE","NW","SE","SW"]:
+        log.error("Invalid corner/facing: %s, %s", corner, facing)
+        return None
     
-    print(f"[Debug] Rotated {obj.description} at ({x:.2f}, {y:.2f}, {z:.2f})")
-    print(f"[Debug] Rotated BBox: x=[{min_x:.2f}, {max_x:.2f}], y=[{min_y:.2f}, {max_y:.2f}]")
+    # Calculate number of turns needed to reach the target facing
+    original_facing = "NORTH"
+    turns = (facings.index(facing) - facings.index(original_facing)) % 4
     
+    # Footprint extents after the rotation needed to reach the target facing
+    half_x, half_y = (float(v) for v in rotated_half_extents(obj.width, obj.depth, turns * 90))
+    x = wall_distance + half_x if corner[1] == "W" else room_width - wall_distance - half_x
+    y = wall_distance + half_y if corner[0] == "S" else room_depth - wall_distance - half_y
+    return x, y, facing, turns * 90
+
+@undoable
 def place_in_room_corner(obj_desc, corner, wall_distance=0.2, facing=None):
     """Places an object in a specified corner of the room using its final rotated extents."""
     # sanity checks
     if not all([scene["room_width"], scene["room_depth"], scene["room_height"]]):
-        print("[Error] Room dimensions must be set before using place_in_room_corner")
+        log.error("Room dimensions must be set before using place_in_room_corner")
         return
     obj = next((o for o in scene["objects"] if o.description == obj_desc), None)
     if not obj:
-        print(f"[Error] Object {obj_desc} not found")
+        log.error("Object %s not found", obj_desc)
         return
     
-    # default facing by corner
-    if facing is None :
-        facing = {"NE":"WEST", "NW":"EAST", "SE":"WEST", "SW":"EAST"}.get(corner, "NORTH")
-    facings = ["NORTH","EAST","SOUTH","WEST"]
-    if facing not in facings or corner not in ["NE","NW","SE","SW"]:
-        print(f"[Error] Invalid corner/facing: {corner}, {facing}")
+    placement = room_corner_position(obj, corner, wall_distance, facing)
+    if placement is None:
         return
-    
-    # Calculate number of turns needed to reach the target facing
-    original_facing = "NORTH"
-    turns = (facings.index(facing) - facings.index(original_facing)) % 4
-    
-    # Calculate position based on corner and facing
-    if facing in ["EAST", "WEST"]:  # 90° or 270° rotation
-        # After rotation, width and depth will be swapped in the scene
-        place_width = obj.depth
-        place_depth = obj.width
-    else:  # 0° or 180° rotation (NORTH or SOUTH)
-        place_width = obj.width
-        place_depth = obj.depth
-    
-    # Calculate center position based on corner and post-rotation dimensions
-    if corner == "SW":  # Southwest corner (origin)
-        x = wall_distance + (place_width / 2)
-        y = wall_distance + (place_depth / 2)
-    elif corner == "SE":  # Southeast corner
-        x = scene["room_width"] - wall_distance - (place_width / 2)
-        y = wall_distance + (place_depth / 2)
-    elif corner == "NW":  # Northwest corner
-        x = wall_distance + (place_width / 2)
-        y = scene["room_depth"] - wall_distance - (place_depth / 2)
-    elif corner == "NE":  # Northeast corner
-        x = scene["room_width"] - wall_distance - (place_width / 2)
-        y = scene["room_depth"] - wall_distance - (place_depth / 2)
+    x, y, facing, rotation = placement
     
     # height is always half the object's height
     z = obj.height / 2
     
     # Set position
+    _touch(obj)
     obj.x, obj.y, obj.z = x, y, z
     
     # Set rotation properties
     obj.facing = facing
-    obj.rotation = turns * 90
+    obj.rotation = rotation
     
     # Calculate bounding box with the position and rotation
-    calculate_position_and_bbox(obj, x, y, z)
+    calculate_rotated_bbox(obj)
     
     # Checks
+    # Objects placed relative to / on top of this one follow it
+    constraint_solver.propagate(obj)
+
     overlaps, other = check_overlap_with_existing(obj)
     if overlaps:
-        print(f"[Warning] {obj_desc} overlaps with {other}")
+        log.warning("%s overlaps with %s", obj_desc, other)
     if not within_room_boundaries(obj):
-        print(f"[Warning] {obj_desc} out of bounds")
+        log.warning("%s out of bounds", obj_desc)
     
     # Record constraint & save
     scene["constraints"].append(
@@ -854,9 +1373,10 @@ def place_in_room_corner(obj_desc, corner, wall_distance=0.2, facing=None):
                    "wall_distance": wall_distance,
                    "facing": facing})
     )
-    print(f"[DSL] Placed {obj_desc} at ({x:.2f},{y:.2f},{z:.2f}) in {corner}, facing {facing}")
+    log.info("Placed %s at (%.2f,%.2f,%.2f) in %s, facing %s", obj_desc, x, y, z, corner, facing)
     save_scene()
     
+@undoable
 def place_along_wall(obj_desc, wall, position=0.5, wall_distance=0.2):
     """Places an object along a specified wall.
     
@@ -867,71 +1387,144 @@ def place_along_wall(obj_desc, wall, position=0.5, wall_distance=0.2):
         wall_distance: Distance from the wall (default 0.2)
     """
     if not all([scene["room_width"], scene["room_depth"], scene["room_height"]]):
-        print("[Error] Room dimensions must be set before using place_along_wall")
+        log.error("Room dimensions must be set before using place_along_wall")
         return
         
     obj = next((o for o in scene["objects"] if o.description == obj_desc), None)
     if not obj:
-        print(f"[Error] Object {obj_desc} not found")
+        log.error("Object %s not found", obj_desc)
         return
         
     # Calculate position based on wall
-    half_width = obj.width / 2
-    half_depth = obj.depth / 2
-    
-    if wall == "NORTH":
-        x = scene["room_width"] * position
-        y = scene["room_depth"] - half_depth - wall_distance
-        facing = "SOUTH"
-    elif wall == "EAST":
-        x = scene["room_width"] - half_width - wall_distance
-        y = scene["room_depth"] * position
-        facing = "WEST"
-    elif wall == "SOUTH":
-        x = scene["room_width"] * position
-        y = half_depth + wall_distance
-        facing = "NORTH"
-    elif wall == "WEST":
-        x = half_width + wall_distance
-        y = scene["room_depth"] * position
-        facing = "EAST"
-    else:
-        print(f"[Error] Invalid wall {wall}, use 'NORTH', 'EAST', 'SOUTH', or 'WEST'")
+    placement = wall_position(obj, wall, position, wall_distance)
+    if placement is None:
         return
+    x, y, facing = placement
         
     z = obj.height / 2
     calculate_position_and_bbox(obj, x, y, z)
     obj.facing = facing
     
+    # Objects placed relative to / on top of this one follow it
+    constraint_solver.propagate(obj)
+
     overlaps, overlapping_obj = check_overlap_with_existing(obj)
     if overlaps:
-        print(f"[Warning] {obj_desc} overlaps with {overlapping_obj} - adjust manually")
+        log.warning("%s overlaps with %s - adjust manually", obj_desc, overlapping_obj)
         
     scene["constraints"].append(Constraint("PLACE_ALONG_WALL", 
                                {"object": obj_desc, "wall": wall, 
                                 "position": position, "wall_distance": wall_distance}))
-    print(f"[DSL] Placed {obj_desc} along {wall} wall at ({x:.2f}, {y:.2f}, {z:.2f}) facing {facing}")
+    log.info("Placed %s along %s wall at (%.2f, %.2f, %.2f) facing %s", obj_desc, wall, x, y, z, facing)
     save_scene()
 
-def arrange_in_group(obj_descs, formation="circle", center_x=None, center_y=None, height=None, spacing=0.5, facing="inward"):
+def _formation_positions(objs, formation, center_x, center_y, spacing, columns=None):
+    """Target (x, y) of every object in a formation, or None for an unknown formation."""
+    count = len(objs)
+    widths = [float(obj.width) for obj in objs]
+    depths = [float(obj.depth) for obj in objs]
+    max_dimension = max(max(widths), max(depths))
+
+    if formation == "circle":
+        # Calculate radius based on object sizes and spacing
+        radius = max((count * max_dimension + count * spacing) / (2 * math.pi), 0.5)
+        angles = [2 * math.pi * i / count for i in range(count)]
+        return [(center_x + radius * math.cos(a), center_y + radius * math.sin(a)) for a in angles]
+
+    if formation == "semicircle":
+        radius = max((count * max_dimension + count * spacing) / math.pi, 1.0)
+        angles = [math.pi * i / max(count - 1, 1) for i in range(count)]
+        return [(center_x + radius * math.cos(a), center_y + radius * math.sin(a)) for a in angles]
+
+    if formation == "row":
+        positions = []
+        current_x = center_x - (sum(widths) + spacing * (count - 1)) / 2
+        for width in widths:
+            positions.append((current_x + width / 2, center_y))
+            current_x += width + spacing
+        return positions
+
+    if formation == "grid":
+        # Uniform cells sized for the largest object, first row to the NORTH
+        columns = columns or math.ceil(math.sqrt(count))
+        rows = math.ceil(count / columns)
+        cell_w = max(widths) + spacing
+        cell_d = max(depths) + spacing
+        return [(center_x + (i % columns - (columns - 1) / 2) * cell_w,
+                 center_y + ((rows - 1) / 2 - i // columns) * cell_d) for i in range(count)]
+
+    if formation == "auditorium":
+        # Curved rows on a 120 degree arc SOUTH of the focus point (center_x, center_y),
+        # each row one seat depth further back and holding as many seats as its arc fits
+        cell_w = max(widths) + spacing
+        cell_d = max(depths) + spacing
+        radius = max(2 * cell_d, 1.0)
+        positions = []
+        while len(positions) < count:
+            seats = min(max(int(radius * 2 * math.pi / 3 // cell_w), 1), count - len(positions))
+            step = cell_w / radius
+            for k in range(seats):
+                angle = -math.pi / 2 + (k - (seats - 1) / 2) * step
+                positions.append((center_x + radius * math.cos(angle), center_y + radius * math.sin(angle)))
+            radius += cell_d
+        return positions
+
+    if formation == "packed":
+        # Shelf packing: deepest objects first, rows about as wide as the block is deep
+        area = sum((w + spacing) * (d + spacing) for w, d in zip(widths, depths))
+        limit = max(math.sqrt(area), max(widths) + spacing)
+        if scene["room_width"]:
+            limit = max(min(limit, scene["room_width"]), max(widths))
+        shelves = [[]]
+        shelf_width = 0.0
+        for i in sorted(range(count), key=lambda i: -depths[i]):
+            if shelves[-1] and shelf_width + widths[i] > limit:
+                shelves.append([])
+                shelf_width = 0.0
+            shelves[-1].append(i)
+            shelf_width += widths[i] + spacing
+        positions = [None] * count
+        total_depth = sum(max(depths[i] for i in shelf) for shelf in shelves) + spacing * (len(shelves) - 1)
+        y = center_y + total_depth / 2
+        for shelf in shelves:
+            shelf_depth = max(depths[i] for i in shelf)
+            x = center_x - (sum(widths[i] for i in shelf) + spacing * (len(shelf) - 1)) / 2
+            for i in shelf:
+                positions[i] = (x + widths[i] / 2, y - shelf_depth / 2)
+                x += widths[i] + spacing
+            y -= shelf_depth + spacing
+        return positions
+
+    return None
+
+@undoable
+def arrange_in_group(obj_descs, formation="circle", center_x=None, center_y=None, height=None, spacing=0.5, facing="inward",
+                     columns=None, optimize=False):
     """Arranges multiple objects in a specified formation.
     
     Args:
         obj_descs: List of object descriptions to arrange
-        formation: "circle", "row", or "semicircle" (default "circle")
+        formation: "circle", "row", "semicircle", "grid", "auditorium" (curved rows SOUTH of
+            the center, facing it) or "packed" (tight shelf packing) (default "circle")
         center_x: X-coordinate of formation center (default room center)
         center_y: Y-coordinate of formation center (default room center)
         height: Z-coordinate height for all objects (default None, which uses object's own height/2)
         spacing: Space between objects (default 0.5)
         facing: Where objects face - "inward", "outward", "same" (default "inward")
+        columns: Objects per row for the "grid" formation (default about the square root of the count)
+        optimize: Relax the formation so no member overlaps another member, an existing
+            object or a wall, moving each as little as possible (default False)
     """
     if not all([scene["room_width"], scene["room_depth"]]):
-        print("[Error] Room dimensions must be set before using arrange_in_group")
+        log.error("Room dimensions must be set before using arrange_in_group")
         return
         
     objs = [next((o for o in scene["objects"] if o.description == desc), None) for desc in obj_descs]
     if None in objs:
-        print(f"[Error] One or more objects not found")
+        log.error("One or more objects not found")
+        return
+    if not objs:
+        log.error("No objects to arrange")
         return
         
     # Set default center to room center if not specified
@@ -941,141 +1534,96 @@ def arrange_in_group(obj_descs, formation="circle", center_x=None, center_y=None
         center_y = scene["room_depth"] / 2
         
     # Calculate positions based on formation
-    count = len(objs)
-    
-    if formation == "circle":
-        # Calculate radius based on object sizes and spacing
-        max_dimension = max([max(float(obj.width), float(obj.depth)) for obj in objs])
-        radius = (count * max_dimension + count * spacing) / (2 * math.pi)
-        radius = max(radius, 0.5)  # Minimum radius
-        
-        for i, obj in enumerate(objs):
-            angle = 2 * math.pi * i / count
-            x = center_x + radius * math.cos(angle)
-            y = center_y + radius * math.sin(angle)
-            # Use specified height if provided, otherwise use object's half height
-            z = height if height is not None else float(obj.height) / 2
-            
-            calculate_position_and_bbox(obj, x, y, z)
-            
-            # Set facing direction
-            if facing == "inward":
-                obj.facing = "NORTH" if y < center_y else "SOUTH" if y > center_y else "EAST" if x < center_x else "WEST"
-            elif facing == "outward":
-                obj.facing = "SOUTH" if y < center_y else "NORTH" if y > center_y else "WEST" if x < center_x else "EAST"
-            
-            overlaps, overlapping_obj = check_overlap_with_existing(obj)
-            if overlaps:
-                print(f"[Warning] {obj.description} overlaps with {overlapping_obj} - adjust manually")
-    
-    elif formation == "row":
-        row_width = sum([float(obj.width) for obj in objs]) + spacing * (count - 1)
-        start_x = center_x - row_width / 2
-        
-        current_x = start_x
-        for obj in objs:
-            x = current_x + float(obj.width) / 2
-            y = center_y
-            # Use specified height if provided, otherwise use object's half height
-            z = height if height is not None else float(obj.height) / 2
-            
-            calculate_position_and_bbox(obj, x, y, z)
-            
-            # Set facing direction
-            if facing == "same":
-                obj.facing = "NORTH"
-            
-            overlaps, overlapping_obj = check_overlap_with_existing(obj)
-            if overlaps:
-                print(f"[Warning] {obj.description} overlaps with {overlapping_obj} - adjust manually")
-                
-            current_x += float(obj.width) + spacing
-    
-    elif formation == "semicircle":
-        # Calculate radius similar to circle but for half-circle
-        max_dimension = max([max(float(obj.width), float(obj.depth)) for obj in objs])
-        radius = (count * max_dimension + count * spacing) / math.pi
-        radius = max(radius, 1.0)  # Minimum radius
-        
-        for i, obj in enumerate(objs):
-            angle = math.pi * i / (count - 1)
-            x = center_x + radius * math.cos(angle)
-            y = center_y + radius * math.sin(angle)
-            # Use specified height if provided, otherwise use object's half height
-            z = height if height is not None else float(obj.height) / 2
-            
-            calculate_position_and_bbox(obj, x, y, z)
-            
-            # Set facing direction
-            if facing == "inward":
-                obj.facing = "NORTH" if y < center_y else "SOUTH" if y > center_y else "EAST" if x < center_x else "WEST"
-            elif facing == "outward":
-                obj.facing = "SOUTH" if y < center_y else "NORTH" if y > center_y else "WEST" if x < center_x else "EAST"
-            
+    positions = _formation_positions(objs, formation, center_x, center_y, spacing, columns)
+    if positions is None:
+        log.error("Invalid formation %s, use 'circle', 'row', 'semicircle', 'grid', 'auditorium' or 'packed'", formation)
+        return
+
+    stuck = None
+    if optimize:
+        members = set(map(id, objs))
+        obstacles = [obj.bounds[:4] for obj in scene["objects"] if id(obj) not in members and obj.x is not None]
+        half_x, half_y = rotated_half_extents([float(obj.width) for obj in objs],
+                                              [float(obj.depth) for obj in objs],
+                                              [obj.rotation for obj in objs])
+        with profiling.stage("relax_group", objects=len(objs)):
+            relaxed, stuck, steps = separate_boxes(positions, np.stack([half_x, half_y], axis=1), obstacles,
+                                                   (scene["room_width"], scene["room_depth"]), gap=spacing)
+        profiling.count("relaxation_steps", steps)
+        moved = np.hypot(*(relaxed - np.asarray(positions)).T)
+        log.info("Relaxed %s formation in %s step(s): moved %s object(s), at most %.2fm",
+                 formation, steps, int((moved > 1e-6).sum()), moved.max())
+        positions = relaxed.tolist()
+
+    radial = formation in ("circle", "semicircle", "auditorium")
+    for i, (obj, (x, y)) in enumerate(zip(objs, positions)):
+        # Use specified height if provided, otherwise use object's half height
+        z = height if height is not None else float(obj.height) / 2
+        calculate_position_and_bbox(obj, x, y, z)
+
+        # Set facing direction
+        if facing == "same":
+            obj.facing = "NORTH"
+        elif radial and facing == "inward":
+            obj.facing = "NORTH" if y < center_y else "SOUTH" if y > center_y else "EAST" if x < center_x else "WEST"
+        elif radial and facing == "outward":
+            obj.facing = "SOUTH" if y < center_y else "NORTH" if y > center_y else "WEST" if x < center_x else "EAST"
+
+        if stuck is None:
             overlaps, overlapping_obj = check_overlap_with_existing(obj)
             if overlaps:
-                print(f"[Warning] {obj.description} overlaps with {overlapping_obj} - adjust manually")
+                log.warning("%s overlaps with %s - adjust manually", obj.description, overlapping_obj)
+        elif stuck[i]:
+            log.warning("%s could not be cleared of overlaps - adjust manually", obj.description)
     
     scene["constraints"].append(Constraint("ARRANGE_IN_GROUP", 
                                {"objects": obj_descs, "formation": formation, 
                                 "center_x": center_x, "center_y": center_y, 
-                                "height": height, "spacing": spacing, "facing": facing}))
-    print(f"[DSL] Arranged {len(obj_descs)} objects in {formation} formation")
+                                "height": height, "spacing": spacing, "facing": facing,
+                                "columns": columns, "optimize": optimize}))
+    log.info("Arranged %s objects in %s formation", len(obj_descs), formation)
+    constraint_solver.propagate(objs)
     save_scene()
 
+def relative_multi_position(target, refs, directions, distances):
+    """Mean of the relative_position of target to each ref, or None for an unknown direction."""
+    total_x, total_y = 0, 0
+    count = 0
+    for ref, direction, distance in zip(refs, directions, distances):
+        position = relative_position(target, ref, direction, distance)
+        if position is None:
+            return None
+        x, y = position
+        total_x += x
+        total_y += y
+        count += 1
+        log.debug("%s from %s: (%.2f, %.2f)", direction, ref.description, x, y)
+    return total_x / count, total_y / count
+
+@undoable
 def place_relative_multi(target_desc, ref_descs, directions, distances):
     target = next((obj for obj in scene["objects"] if obj.description == target_desc), None)
     refs = [next((obj for obj in scene["objects"] if obj.description == d), None) for d in ref_descs]
     if not target or None in refs:
-        print(f"[Error] Object {target_desc} or references {ref_descs} not found")
+        log.error("Object %s or references %s not found", target_desc, ref_descs)
         return
     if any(ref.x is None or ref.y is None for ref in refs):
-        print(f"[Error] All references {ref_descs} must be placed first")
+        log.error("All references %s must be placed first", ref_descs)
         return
 
-    print(f"[Debug] Placing {target_desc} relative to {ref_descs} with directions={directions}, distances={distances}")
-    total_x, total_y = 0, 0
-    count = 0
-    for ref, direction, distance in zip(refs, directions, distances):
-        if direction == "EAST":
-            x = ref.x + (ref.width / 2) + (target.width / 2) + distance
-            y = ref.y
-        elif direction == "WEST":
-            x = ref.x - (ref.width / 2) - (target.width / 2) - distance
-            y = ref.y
-        elif direction == "NORTH":
-            x = ref.x
-            y = ref.y + (ref.depth / 2) + (target.depth / 2) + distance
-        elif direction == "SOUTH":
-            x = ref.x
-            y = ref.y - (ref.depth / 2) - (target.depth / 2) - distance
-        else:
-            print(f"[Error] Unsupported direction {direction}")
-            return
-        total_x += x
-        total_y += y
-        count += 1
-        print(f"[Debug] {direction} from {ref.description}: ({x:.2f}, {y:.2f})")
-
-    x = total_x / count
-    y = total_y / count
+    log.debug("Placing %s relative to %s with directions=%s, distances=%s", target_desc, ref_descs, directions, distances)
+    position = relative_multi_position(target, refs, directions, distances)
+    if position is None:
+        return
+    x, y = position
     z = target.height / 2
-    calculate_position_and_bbox(target, x, y, z)
-    overlaps, overlapping_obj = check_overlap_with_existing(target)
-    max_tries = 5
-    try_count = 0
-    while overlaps and try_count < max_tries:
-        print(f"[Warning] Overlap with {overlapping_obj} - adjusting {target_desc} attempt {try_count+1}")
-        x += target.width  # Try EAST
-        y -= target.depth  # Try SOUTH
-        calculate_position_and_bbox(target, x, y, z)
-        overlaps, overlapping_obj = check_overlap_with_existing(target)
-        try_count += 1
+    overlaps, overlapping_obj = settle_placement(target, x, y, z)
     if overlaps:
-        print(f"[Error] Could not place {target_desc} without overlap after {max_tries} tries")
+        log.error("Could not place %s without overlap - no free position found", target_desc)
     if not within_room_boundaries(target):
-        print(f"[Warning] {target_desc} out of bounds - adjust manually")
+        log.warning("%s out of bounds - adjust manually", target_desc)
     scene["constraints"].append(Constraint("PLACE_RELATIVE_MULTI", {"target": target_desc, "references": ref_descs, "directions": directions, "distances": distances}))
-    print(f"[DSL] Placed {target_desc} at ({target.x:.2f}, {target.y:.2f}, {target.z:.2f})")
+    log.info("Placed %s at (%.2f, %.2f, %.2f)", target_desc, target.x, target.y, target.z)
+    constraint_solver.propagate(target)
     save_scene()
 
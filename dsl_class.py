@@ -3,8 +3,9 @@ import os
 import re
 import numpy as np
 import zipfile
-from transformers import BertTokenizer, TFBertModel
-import tensorflow as tf
+
+# TensorFlow and transformers are imported where a model is built or loaded, so the keyword
+# features and predict_dsl work with any tokenizer/model pair (e.g. the benchmark stub)
 
 # Define command types
 command_types = [
@@ -63,6 +64,8 @@ def create_keyword_embedding(nlp_input):
 
 # Build model (for reference, not used unless rebuilding)
 def build_model():
+    import tensorflow as tf
+    from transformers import TFBertModel
     bert_model = TFBertModel.from_pretrained('bert-base-uncased')
     input_ids = tf.keras.layers.Input(shape=(50,), dtype=tf.int32, name='input_ids')
     attention_mask = tf.keras.layers.Input(shape=(50,), dtype=tf.int32, name='attention_mask')
@@ -102,6 +105,9 @@ def predict_dsl(nlp_input, model, tokenizer):
 
 # Main execution
 if __name__ == "__main__":
+    import tensorflow as tf
+    from transformers import BertTokenizer, TFBertModel
+
     # Unzip the model weights
     zip_path = '/content/my_command_classifier_model.zip'  # Path to the ZIP file
     extract_path = '/content/my_command_classifier_model'  # Directory to extract to
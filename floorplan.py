@@ -0,0 +1,148 @@
+import sys
+import json
+import numpy as np
+from geometry import footprint_corners, rotated_bounds
+from scene_binary import BinaryScene, load_scene_file
+
+# Unit direction (x, y) of each facing; NORTH is +y as in the DSL
+FACING_VECTORS = {
+    "NORTH": (0.0, 1.0),
+    "EAST": (1.0, 0.0),
+    "SOUTH": (0.0, -1.0),
+    "WEST": (-1.0, 0.0)
+}
+
+def footprint_arrays(scene_data):
+    """Collect placed objects as (descriptions, centers (N, 2), sizes (N, 2), rotations (N,), facings)."""
+    if isinstance(scene_data, BinaryScene):
+        centers = scene_data.columns[:2].T.astype(float)
+        placed = np.flatnonzero(~np.isnan(centers).any(axis=1))
+        facings = [scene_data.facing(i) or "NORTH" for i in placed.tolist()]
+        return (scene_data.descriptions.take(placed), centers[placed], scene_data.columns[3:5].T[placed].astype(float),
+                scene_data.column("rotation")[placed].astype(float), facings)
+    placed = [obj for obj in scene_data.get("objects", [])
+              if obj.get("x") is not None and obj.get("y") is not None]
+    descriptions = [obj["description"] for obj in placed]
+    centers = np.array([[obj["x"], obj["y"]] for obj in placed], dtype=float).reshape(-1, 2)
+    sizes = np.array([[obj["width"], obj["depth"]] for obj in placed], dtype=float).reshape(-1, 2)
+    rotations = np.array([obj.get("rotation", 0) for obj in placed], dtype=float)
+    facings = [obj.get("facing", "NORTH") for obj in placed]
+    return descriptions, centers, sizes, rotations, facings
+
+def rasterize_floorplan(scene_data, resolution=0.02):
+    """Rasterize the top-down footprints of a scene.
+
+    Args:
+        scene_data: Scene dictionary in the scene_state.json layout
+        resolution: Cell size in meters (default 0.02)
+
+    Returns:
+        int32 array of shape (rows, cols); 0 is free floor, i + 1 marks object i.
+        Row 0 is the NORTH wall so the array reads like a plan.
+    """
+    room = scene_data["room"]
+    cols = max(int(np.ceil(room["width"] / resolution)), 1)
+    rows = max(int(np.ceil(room["depth"] / resolution)), 1)
+    raster = np.zeros((rows, cols), dtype=np.int32)
+
+    _, centers, sizes, rotations, _ = footprint_arrays(scene_data)
+    min_x, max_x, min_y, max_y = rotated_bounds(centers[:, 0], centers[:, 1], sizes[:, 0], sizes[:, 1], rotations)
+    # Only the cells under each footprint's axis-aligned bounds are tested
+    col0 = np.maximum(np.floor(min_x / resolution), 0).astype(int)
+    col1 = np.minimum(np.ceil(max_x / resolution), cols).astype(int)
+    row0 = np.maximum(np.floor(min_y / resolution), 0).astype(int)
+    row1 = np.minimum(np.ceil(max_y / resolution), rows).astype(int)
+    theta = np.radians(rotations)
+    axes_u = np.stack([np.cos(theta), np.sin(theta)], axis=1)
+    axes_v = np.stack([-np.sin(theta), np.cos(theta)], axis=1)
+
+    for i in range(len(centers)):
+        c0, c1, r0, r1 = col0[i], col1[i], row0[i], row1[i]
+        if c0 >= c1 or r0 >= r1:
+            continue
+        xs = (np.arange(c0, c1) + 0.5) * resolution - centers[i, 0]
+        ys = (np.arange(r0, r1) + 0.5) * resolution - centers[i, 1]
+        dx, dy = np.meshgrid(xs, ys)
+        inside = ((np.abs(dx * axes_u[i, 0] + dy * axes_u[i, 1]) <= sizes[i, 0] / 2) &
+                  (np.abs(dx * axes_v[i, 0] + dy * axes_v[i, 1]) <= sizes[i, 1] / 2))
+        raster[r0:r1, c0:c1][inside] = i + 1
+
+    return raster[::-1]
+
+def floorplan_svg(scene_data, scale=100):
+    """Render the top-down floor plan as an SVG string with labels and facing arrows.
+
+    Args:
+        scene_data: Scene dictionary in the scene_state.json layout
+        scale: Pixels per meter (default 100)
+    """
+    room = scene_data["room"]
+    width, depth = room["width"] * scale, room["depth"] * scale
+    descriptions, centers, sizes, rotations, facings = footprint_arrays(scene_data)
+    corners = footprint_corners(centers, sizes, rotations) * scale
+    centers = centers * scale
+    # SVG y grows downwards, the scene's y grows NORTH
+    corners[..., 1] = depth - corners[..., 1]
+    centers[:, 1] = depth - centers[:, 1]
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{depth:.0f}" '
+        f'viewBox="0 0 {width:.1f} {depth:.1f}" font-family="sans-serif" font-size="12">',
+        f'<rect x="0" y="0" width="{width:.1f}" height="{depth:.1f}" fill="white" stroke="green" stroke-width="2"/>'
+    ]
+    for description, poly, (cx, cy), size, facing in zip(descriptions, corners, centers, sizes, facings):
+        points = " ".join(f"{px:.1f},{py:.1f}" for px, py in poly)
+        parts.append(f'<polygon points="{points}" fill="#f4cccc" stroke="red" stroke-width="1"/>')
+        fx, fy = FACING_VECTORS.get(facing, (0.0, 1.0))
+        arrow = 0.4 * scale * min(size)
+        parts.append(f'<line x1="{cx:.1f}" y1="{cy:.1f}" x2="{cx + fx * arrow:.1f}" y2="{cy - fy * arrow:.1f}" '
+                     f'stroke="blue" stroke-width="2"/>')
+        label = description.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        parts.append(f'<text x="{cx:.1f}" y="{cy:.1f}" text-anchor="middle">{label}</text>')
+    parts.append('</svg>')
+    return "\n".join(parts)
+
+def render_floorplan(json_file, output_file="scene_preview.svg", resolution=0.02):
+    """Write a top-down preview of a scene file without any GUI.
+
+    An output ending in '.svg' gets the labelled vector plan, '.npy' the raw raster
+    from rasterize_floorplan, and '.pgm' a greyscale image of it.
+    """
+    try:
+        scene_data = load_scene_file(json_file)
+    except FileNotFoundError:
+        print(f"[Error] JSON file '{json_file}' not found.")
+        return None
+    except json.JSONDecodeError:
+        print(f"[Error] Invalid JSON format in '{json_file}'.")
+        return None
+    except ValueError as e:
+        print(f"[Error] {e}")
+        return None
+
+    room = scene_data.get("room", {})
+    if not (room.get("width", 0) and room.get("depth", 0)):
+        print("[Error] Room dimensions missing or invalid in JSON.")
+        return None
+
+    if output_file.endswith(".svg"):
+        with open(output_file, "w") as f:
+            f.write(floorplan_svg(scene_data))
+    elif output_file.endswith(".npy"):
+        np.save(output_file, rasterize_floorplan(scene_data, resolution))
+    elif output_file.endswith(".pgm"):
+        raster = rasterize_floorplan(scene_data, resolution)
+        image = np.where(raster > 0, 96, 255).astype(np.uint8)
+        with open(output_file, "wb") as f:
+            f.write(f"P5 {image.shape[1]} {image.shape[0]} 255\n".encode())
+            f.write(image.tobytes())
+    else:
+        print(f"[Error] Unsupported preview format '{output_file}', use .svg, .npy or .pgm")
+        return None
+    return output_file
+
+
+if __name__ == "__main__":
+    # Usage: python floorplan.py [scene_state.json] [scene_preview.svg]
+    render_floorplan(sys.argv[1] if len(sys.argv) > 1 else 'scene_state.json',
+                     sys.argv[2] if len(sys.argv) > 2 else 'scene_preview.svg')
@@ -0,0 +1,240 @@
+import numpy as np
+
+# Corners of a unit footprint centred on the origin, counter-clockwise from back-left
+UNIT_FOOTPRINT = np.array([[-0.5, -0.5], [0.5, -0.5], [0.5, 0.5], [-0.5, 0.5]])
+
+def rotated_half_extents(width, depth, rotation):
+    """Half extents along x and y of footprints rotated by `rotation` degrees.
+
+    All arguments broadcast, so scalars, per-object arrays and (objects x rotations)
+    grids are all handled in one pass.
+    """
+    theta = np.radians(rotation)
+    cos, sin = np.abs(np.cos(theta)), np.abs(np.sin(theta))
+    half_width = np.asarray(width, dtype=float) / 2
+    half_depth = np.asarray(depth, dtype=float) / 2
+    return half_width * cos + half_depth * sin, half_width * sin + half_depth * cos
+
+def rotated_bounds(x, y, width, depth, rotation):
+    """Axis-aligned bounds of rotated footprints, computed for any number of objects at once.
+
+    Args:
+        x, y: Footprint centres
+        width, depth: Unrotated footprint sizes
+        rotation: Rotation about z in degrees
+
+    Returns:
+        (min_x, max_x, min_y, max_y) arrays broadcast from the inputs
+    """
+    half_x, half_y = rotated_half_extents(width, depth, rotation)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    return x - half_x, x + half_x, y - half_y, y + half_y
+
+def footprint_corners(centers, sizes, rotations):
+    """Return the (N, 4, 2) corners of N rotated rectangular footprints, counter-clockwise."""
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    sizes = np.asarray(sizes, dtype=float).reshape(-1, 2)
+    theta = np.radians(np.asarray(rotations, dtype=float).reshape(-1))
+    cos, sin = np.cos(theta)[:, None], np.sin(theta)[:, None]
+    local = UNIT_FOOTPRINT[None] * sizes[:, None, :]
+    corners = np.empty_like(local)
+    corners[..., 0] = local[..., 0] * cos - local[..., 1] * sin + centers[:, 0:1]
+    corners[..., 1] = local[..., 0] * sin + local[..., 1] * cos + centers[:, 1:2]
+    return corners
+
+def obb_overlaps(corners, others, eps=1e-9):
+    """Separating-axis test of one rotated rectangle against many.
+
+    Args:
+        corners: (4, 2) corners of the rectangle under test, in order around the rectangle
+        others: (M, 4, 2) corners of the candidate rectangles
+        eps: Tolerance in meters; rectangles that only touch do not overlap
+
+    Returns:
+        (M,) bool array, True where the interiors overlap
+    """
+    corners = np.asarray(corners, dtype=float).reshape(4, 2)
+    others = np.asarray(others, dtype=float).reshape(-1, 4, 2)
+    count = len(others)
+
+    # Candidate separating axes: the two edge directions of each rectangle
+    axes_a = np.broadcast_to(corners[[1, 3]] - corners[0], (count, 2, 2))
+    axes_b = others[:, [1, 3]] - others[:, [0]]
+    axes = np.concatenate([axes_a, axes_b], axis=1)  # (M, 4, 2)
+    axes = axes / np.maximum(np.linalg.norm(axes, axis=2, keepdims=True), eps)
+
+    proj_a = np.einsum('mkd,jd->mkj', axes, corners)  # (M, 4 axes, 4 corners)
+    proj_b = np.einsum('mkd,mjd->mkj', axes, others)
+    separated = ((proj_a.max(axis=2) <= proj_b.min(axis=2) + eps) |
+                 (proj_b.max(axis=2) <= proj_a.min(axis=2) + eps))
+    return ~separated.any(axis=1)
+
+def nearest_free_position(x, y, half_x, half_y, obstacles, room=None, max_obstacles=64, margin=1e-6, chunk=1024):
+    """Find the collision-free centre closest to (x, y) for a box of the given half extents.
+
+    Every obstacle is grown by the box's half extents (a Minkowski sum), so the box fits
+    wherever its centre lies outside all grown rectangles and inside the shrunk room. The
+    nearest such point lies on the query's own coordinates or on the edge lines of grown
+    rectangles and room, so the candidates are the grid of those lines, taken from the
+    `max_obstacles` grown rectangles nearest to the query. Candidates are tested against
+    all obstacles in distance order, a chunk at a time, which bounds the work per query.
+
+    Args:
+        x, y: Desired centre
+        half_x, half_y: Half extents of the box being placed
+        obstacles: (M, 4) array of (min_x, max_x, min_y, max_y) bounds of placed objects
+        room: Optional (width, depth); the box must then stay inside [0, width] x [0, depth]
+        max_obstacles: Number of nearest obstacles whose edges become candidate lines
+        margin: Clearance added so a box touching a neighbour is not reported as overlapping
+        chunk: Candidates tested per vectorized batch
+
+    Returns:
+        (x, y) of the nearest free centre, or None if no candidate is free
+    """
+    grown = np.asarray(obstacles, dtype=float).reshape(-1, 4) + [-half_x, half_x, -half_y, half_y]
+
+    if room is not None:
+        lo_x, hi_x = half_x + margin, room[0] - half_x - margin
+        lo_y, hi_y = half_y + margin, room[1] - half_y - margin
+        if lo_x > hi_x or lo_y > hi_y:
+            return None
+    else:
+        lo_x = lo_y = -np.inf
+        hi_x = hi_y = np.inf
+
+    # Candidate lines from the grown rectangles nearest to the query point
+    gap_x = np.maximum(np.maximum(grown[:, 0] - x, x - grown[:, 1]), 0)
+    gap_y = np.maximum(np.maximum(grown[:, 2] - y, y - grown[:, 3]), 0)
+    nearest = np.argsort(np.hypot(gap_x, gap_y))[:max_obstacles]
+    xs = np.concatenate([[x], grown[nearest, 0] - margin, grown[nearest, 1] + margin])
+    ys = np.concatenate([[y], grown[nearest, 2] - margin, grown[nearest, 3] + margin])
+    xs = np.unique(np.clip(xs, lo_x, hi_x))
+    ys = np.unique(np.clip(ys, lo_y, hi_y))
+
+    cand_x, cand_y = np.meshgrid(xs, ys)
+    cand_x, cand_y = cand_x.ravel(), cand_y.ravel()
+    order = np.argsort((cand_x - x) ** 2 + (cand_y - y) ** 2, kind='stable')
+    cand_x, cand_y = cand_x[order], cand_y[order]
+
+    for start in range(0, len(cand_x), chunk):
+        px = cand_x[start:start + chunk, None]
+        py = cand_y[start:start + chunk, None]
+        blocked = ((px > grown[:, 0]) & (px < grown[:, 1]) &
+                   (py > grown[:, 2]) & (py < grown[:, 3])).any(axis=1)
+        free = np.flatnonzero(~blocked)
+        if len(free):
+            return float(px[free[0], 0]), float(py[free[0], 0])
+    return None
+
+
+def candidate_pairs(min_x, max_x):
+    """Index pairs (i, j), i != j, whose x intervals overlap, found by sweep and prune.
+
+    Intervals are sorted by their lower end and each one is paired only with the
+    intervals starting before it ends, so the work grows with the number of pairs that
+    can actually collide rather than with the square of the count.
+    """
+    min_x = np.asarray(min_x, dtype=float)
+    max_x = np.asarray(max_x, dtype=float)
+    order = np.argsort(min_x, kind='stable')
+    starts = min_x[order]
+    ends = np.searchsorted(starts, max_x[order], side='left')
+    counts = np.maximum(ends - np.arange(len(order)) - 1, 0)
+    first = np.repeat(np.arange(len(order)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return order[first], order[first + 1 + offsets]
+
+def separate_boxes(centers, half_extents, obstacles=None, room=None, gap=0.0, iterations=100, tol=1e-6):
+    """Move a group of axis-aligned boxes as little as possible so that they overlap
+    neither each other, the obstacles nor the walls.
+
+    First a force-directed relaxation: each iteration finds the overlapping pairs at once
+    (sweep and prune on x, then an interval test on y) and pushes every pair apart along
+    its axis of least penetration - both boxes by half when they belong to the group, the
+    group member by the full amount when the other is an obstacle - then clamps the boxes
+    back inside the room. Boxes a dense jam leaves overlapping after `iterations` steps are
+    then legalized one at a time with nearest_free_position, against the obstacles and
+    the boxes already clear.
+
+    Args:
+        centers: (N, 2) starting centres
+        half_extents: (N, 2) half extents along x and y
+        obstacles: Optional (M, 4) array of (min_x, max_x, min_y, max_y) bounds that stay fixed
+        room: Optional (width, depth); boxes are kept inside [0, width] x [0, depth]
+        gap: Clearance kept between boxes and from obstacles
+        iterations: Maximum number of relaxation steps
+        tol: Penetration in meters below which boxes count as separated
+
+    Returns:
+        (centers, overlapping, steps): (N, 2) new centres, (N,) bool array of boxes that
+        could not be cleared, and the number of relaxation steps used
+    """
+    pos = np.array(centers, dtype=float).reshape(-1, 2)
+    half = np.asarray(half_extents, dtype=float).reshape(-1, 2)
+    count = len(pos)
+    fixed = np.zeros((0, 4)) if obstacles is None else np.asarray(obstacles, dtype=float).reshape(-1, 4)
+    # Obstacles join the sweep as immovable boxes after the group members
+    fixed_pos = np.stack([fixed[:, :2].mean(axis=1), fixed[:, 2:].mean(axis=1)], axis=1)
+    fixed_half = np.stack([fixed[:, 1] - fixed[:, 0], fixed[:, 3] - fixed[:, 2]], axis=1) / 2
+    all_half = np.concatenate([half, fixed_half]) + gap / 2
+    mobile = np.arange(count + len(fixed)) < count
+    if room is not None:
+        room = np.asarray(room, dtype=float)
+        lo = np.minimum(half, room / 2)
+        hi = room - lo
+        np.clip(pos, lo, hi, out=pos)
+
+    def overlapping_pairs(pos):
+        centres = np.concatenate([pos, fixed_pos])
+        i, j = candidate_pairs(centres[:, 0] - all_half[:, 0], centres[:, 0] + all_half[:, 0])
+        keep = mobile[i] | mobile[j]
+        i, j = i[keep], j[keep]
+        delta = centres[i] - centres[j]
+        pen = all_half[i] + all_half[j] - np.abs(delta)
+        hit = (pen > tol).all(axis=1)
+        return i[hit], j[hit], delta[hit], pen[hit]
+
+    steps = 0
+    while steps < iterations:
+        i, j, delta, pen = overlapping_pairs(pos)
+        if not len(i):
+            break
+        steps += 1
+        axis = (pen[:, 1] < pen[:, 0]).astype(int)
+        rows = np.arange(len(i))
+        # Push i away from j; coincident centres are split by index
+        direction = np.sign(delta[rows, axis])
+        direction[direction == 0] = np.where(i > j, 1.0, -1.0)[direction == 0]
+        share = np.where(mobile[i] & mobile[j], 0.5, 1.0)
+        amount = direction * pen[rows, axis] * share
+        moves = np.zeros((count + len(fixed), 2))
+        np.add.at(moves, (i, axis), amount)
+        np.add.at(moves, (j, axis), -amount)
+        pos += moves[:count]
+        if room is not None:
+            np.clip(pos, lo, hi, out=pos)
+
+    i, j, _, _ = overlapping_pairs(pos)
+    stuck = np.zeros(count + len(fixed), dtype=bool)
+    stuck[i[mobile[i]]] = True
+    stuck[j[mobile[j]]] = True
+    stuck = stuck[:count]
+    if stuck.any():
+        bounds = np.concatenate([pos[:, :1] - half[:, :1], pos[:, :1] + half[:, :1],
+                                 pos[:, 1:] - half[:, 1:], pos[:, 1:] + half[:, 1:]], axis=1)
+        clear = [fixed, bounds[~stuck]]
+        # Legalize the jammed boxes nearest to the group's centre first
+        jammed = np.flatnonzero(stuck)
+        jammed = jammed[np.argsort(np.hypot(*(pos[jammed] - pos.mean(axis=0)).T), kind='stable')]
+        for k in jammed:
+            spot = nearest_free_position(pos[k, 0], pos[k, 1], half[k, 0], half[k, 1],
+                                         np.concatenate(clear) + [-gap, gap, -gap, gap],
+                                         None if room is None else tuple(room))
+            if spot is None:
+                continue
+            pos[k] = spot
+            stuck[k] = False
+            clear.append(np.array([[pos[k, 0] - half[k, 0], pos[k, 0] + half[k, 0],
+                                    pos[k, 1] - half[k, 1], pos[k, 1] + half[k, 1]]]))
+    return pos, stuck, steps
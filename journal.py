@@ -0,0 +1,209 @@
+"""Record every DSL command run on the scene and replay the record to rebuild the scene.
+
+A journal is a JSON-lines file: a header holding the scene the recording started from,
+then one line per top-level DSL call (see dsl.recorded), in order:
+
+    {"journal": 1, "base": {scene_state.json dict, or null for an empty scene}}
+    {"command": "create_object", "args": ["table", 1.6, 0.9, 0.75], "kwargs": {}}
+    {"command": "undo", "args": [], "kwargs": {}}
+    {"base": {scene_state.json dict}}
+
+Undo and redo are journaled like any other command, so a replay reproduces them. Only
+calls that returned are written; a command that raised changed nothing replayable.
+load_scene is not journaled by path, since the file usually holds a later save by the
+time the journal is replayed: it starts a new segment holding the scene it loaded, and
+replay resets the scene to that base when it reaches it.
+
+replay() runs the commands again with output muted and a single save at the end. It can
+snapshot the scene every N commands into a checkpoints dict, and given such checkpoints
+it starts from the latest one instead of from the base scene:
+
+    checkpoints = {}
+    replay("session.jsonl", checkpoint_every=500, checkpoints=checkpoints)
+    save_checkpoints(checkpoints, "session.ckpt")
+    ...
+    replay("session.jsonl", checkpoints=load_checkpoints("session.ckpt"))
+
+Checkpoints belong to the journal they were taken from; replaying a different journal
+from them gives a meaningless scene.
+"""
+import os
+import json
+import time
+import pickle
+import importlib
+import dsl
+import log
+import scene_diff
+from storage import atomic_open
+
+VERSION = 1
+
+class Journal:
+    """Appends the DSL calls made while it is started to a list and, given a path, a file.
+
+    Args:
+        path: JSON-lines file to write; None keeps the journal in memory only
+        append: Continue an existing file (whose last command should have produced the
+            current scene) rather than starting it over from the current scene
+    """
+
+    def __init__(self, path=None, append=True):
+        self.path = path
+        self.append = append
+        self.base = None
+        self.entries = []
+        self.file = None
+
+    def start(self):
+        if self.path is not None:
+            new_file = not self.append or not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            self.file = open(self.path, "w" if new_file else "a")
+            if new_file:
+                self.base = _base_scene()
+                self.file.write(json.dumps({"journal": VERSION, "base": self.base}) + "\n")
+                self.file.flush()
+        else:
+            self.base = _base_scene()
+        dsl.command_hooks.append(self.record)
+        return self
+
+    def stop(self):
+        if self.record in dsl.command_hooks:
+            dsl.command_hooks.remove(self.record)
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def record(self, name, args, kwargs):
+        if name == "load_scene":
+            entry = {"base": _base_scene()}
+        else:
+            entry = {"command": name, "args": list(args), "kwargs": kwargs}
+        self.entries.append(entry)
+        if self.file is not None:
+            self.file.write(json.dumps(entry) + "\n")
+            self.file.flush()
+
+    def __len__(self):
+        return len(self.entries)
+
+def _base_scene():
+    """The scene a recording starts from, or None if it is empty."""
+    if not dsl.scene["objects"] and not dsl.scene["constraints"] and not dsl.scene["room_width"]:
+        return None
+    return dsl.scene_dict()
+
+def read_journal(path):
+    """A journal file as a Journal (not recording). Raises FileNotFoundError or ValueError."""
+    journal = Journal()
+    with open(path, "r") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "journal" in record:
+                if record["journal"] != VERSION:
+                    raise ValueError(f"Unsupported journal version {record['journal']} in '{path}'")
+                journal.base = record["base"]
+            elif "command" in record or "base" in record:
+                journal.entries.append(record)
+            else:
+                raise ValueError(f"Line {number} of '{path}' is not a journal record")
+    return journal
+
+def _resolve(name):
+    """The function a journaled command name refers to (dsl's own or module-qualified)."""
+    module, _, attr = name.rpartition(".")
+    return getattr(importlib.import_module(module) if module else dsl, attr)
+
+def _reset_to(base):
+    """Replace the scene with a journal base (None for an empty scene)."""
+    dsl.reset_scene()
+    if base is not None:
+        scene_diff.apply_patch(scene_diff.diff_scenes({}, base))
+
+def snapshot(index):
+    """The current scene and undo history, pickled, as the checkpoint after `index` commands."""
+    history = {key: dsl.history[key] for key in ("undo", "redo", "limit")}
+    return pickle.dumps({"index": index, "scene": dict(dsl.scene), "history": history})
+
+def restore(checkpoint):
+    """Replace the scene and undo history with a snapshot's; returns its command index."""
+    state = pickle.loads(checkpoint)
+    dsl.scene.clear()
+    dsl.scene.update(state["scene"])
+    dsl.history["undo"][:] = state["history"]["undo"]
+    dsl.history["redo"][:] = state["history"]["redo"]
+    dsl.history["limit"] = state["history"]["limit"]
+    return state["index"]
+
+def save_checkpoints(checkpoints, path):
+    with atomic_open(path, "wb") as f:
+        pickle.dump(checkpoints, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def load_checkpoints(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def replay(journal, stop=None, checkpoint_every=0, checkpoints=None):
+    """Rebuild the scene by running a journal's commands again.
+
+    Output is muted, saves are deferred to one at the end and active journals do not
+    record the replayed calls.
+
+    Args:
+        journal: Journal or path of a journal file
+        stop: Replay only the first `stop` commands (default all)
+        checkpoint_every: Add a snapshot to `checkpoints` after every this many commands
+        checkpoints: {command index: snapshot} dict; replay starts from the latest
+            snapshot at or before `stop` if there is one, and new snapshots are added to it
+
+    Returns:
+        True if every command ran, False if one raised (the scene is left as it was
+        after the command before it)
+    """
+    if not isinstance(journal, Journal):
+        journal = read_journal(journal)
+    entries = journal.entries[:stop]
+    checkpoints = {} if checkpoints is None else checkpoints
+    start_time = time.perf_counter()
+
+    hooks = list(dsl.command_hooks)
+    dsl.command_hooks.clear()
+    try:
+        with log.quiet(), dsl.deferred_saves():
+            usable = [index for index in checkpoints if index <= len(entries)]
+            if usable:
+                start = restore(checkpoints[max(usable)])
+            else:
+                start = 0
+                _reset_to(journal.base)
+            for index in range(start, len(entries)):
+                entry = entries[index]
+                try:
+                    if "base" in entry:
+                        _reset_to(entry["base"])
+                    else:
+                        _resolve(entry["command"])(*entry["args"], **entry["kwargs"])
+                except Exception as e:
+                    failed = (index, entry.get("command", "load_scene"), e)
+                    break
+                if checkpoint_every and (index + 1) % checkpoint_every == 0:
+                    checkpoints[index + 1] = snapshot(index + 1)
+            else:
+                failed = None
+    finally:
+        dsl.command_hooks[:] = hooks
+    if failed is not None:
+        log.error("Replay stopped at command %s (%s): %s", *failed)
+        return False
+    log.info("Replayed %s command(s) in %.2fs%s", len(entries) - start, time.perf_counter() - start_time,
+             f" from the checkpoint at {start}" if start else "")
+    return True
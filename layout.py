@@ -0,0 +1,325 @@
+"""Whole-room layouts generated from an object inventory.
+
+A layout is a sequence of DSL primitive calls (place_along_wall, place_in_room_corner,
+place_relative). The search places probe objects outside the scene with the primitives'
+own position helpers and tests them with the DSL's room and overlap checks, so thousands
+of candidate layouts can be scored without touching the scene; only the winner is
+applied through the DSL, which records the usual constraints.
+"""
+import re
+import sys
+import time
+import random
+import multiprocessing
+import numpy as np
+import dsl
+import log
+from occupancy import OccupancyGrid
+
+# Default (width, depth, height) in meters of common furniture
+DEFAULT_DIMENSIONS = {
+    "bed": (1.6, 2.0, 0.5),
+    "single bed": (1.0, 2.0, 0.5),
+    "nightstand": (0.5, 0.4, 0.55),
+    "desk": (1.2, 0.6, 0.75),
+    "chair": (0.5, 0.5, 0.9),
+    "wardrobe": (1.2, 0.6, 2.0),
+    "dresser": (1.0, 0.5, 0.9),
+    "bookshelf": (0.9, 0.3, 1.8),
+    "cabinet": (0.8, 0.45, 1.0),
+    "sofa": (2.0, 0.9, 0.85),
+    "armchair": (0.9, 0.9, 0.9),
+    "coffee table": (1.0, 0.6, 0.45),
+    "table": (1.6, 0.9, 0.75),
+    "tv stand": (1.5, 0.4, 0.5),
+    "plant": (0.4, 0.4, 1.0),
+}
+FALLBACK_DIMENSIONS = (0.6, 0.6, 0.8)
+
+# Objects that belong next to another kind: kind -> (anchor kind, gap in meters)
+COMPANIONS = {
+    "nightstand": ("bed", 0.05),
+    "chair": ("desk", 0.1),
+    "coffee table": ("sofa", 0.4),
+    "armchair": ("coffee table", 0.3),
+}
+
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+                "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+
+WALLS = ["NORTH", "EAST", "SOUTH", "WEST"]
+CORNERS = ["NE", "NW", "SE", "SW"]
+WALL_DISTANCE = 0.05
+# Fractions along a wall tried for place_along_wall, besides flush against either end
+WALL_POSITIONS = [0.15, 0.25, 0.35, 0.5, 0.65, 0.75, 0.85]
+# Depth of the strip in front of an object that should stay clear
+FRONT_CLEARANCE = 0.6
+
+def singular(name):
+    """Strip a plural ending from an inventory noun ("nightstands" -> "nightstand")."""
+    for plural, ending in (("shelves", "shelf"), ("ches", "ch"), ("shes", "sh"), ("sses", "ss")):
+        if name.endswith(plural):
+            return name[:-len(plural)] + ending
+    if name.endswith("s") and not name.endswith("ss"):
+        return name[:-1]
+    return name
+
+def parse_inventory(text):
+    """Parse "1 bed, 2 nightstands and a desk" into [("bed", 1), ("nightstand", 2), ("desk", 1)].
+
+    A plain noun counts as one; counts may be digits or number words up to ten.
+    """
+    items = []
+    for part in re.split(r",|\band\b|;", text.lower()):
+        words = part.split()
+        if not words:
+            continue
+        count = 1
+        if words[0].isdigit():
+            count = int(words[0])
+            words = words[1:]
+        elif words[0] in NUMBER_WORDS:
+            count = NUMBER_WORDS[words[0]]
+            words = words[1:]
+        if words and count > 0:
+            items.append((singular(" ".join(words)), count))
+    return items
+
+def expand_inventory(inventory, existing=()):
+    """Turn (kind, count) pairs into (description, kind, width, depth, height) items with unique descriptions.
+
+    Args:
+        inventory: Text for parse_inventory, or a list of (kind, count) pairs
+        existing: Descriptions already in use in the scene
+    """
+    if isinstance(inventory, str):
+        inventory = parse_inventory(inventory)
+    taken = {desc.lower() for desc in existing}
+    items = []
+    for kind, count in inventory:
+        if kind not in DEFAULT_DIMENSIONS:
+            log.warning("No default dimensions for '%s', using %s", kind, FALLBACK_DIMENSIONS)
+        width, depth, height = DEFAULT_DIMENSIONS.get(kind, FALLBACK_DIMENSIONS)
+        number = 1
+        for _ in range(count):
+            desc = kind if count == 1 else f"{kind} {number}"
+            while desc.lower() in taken:
+                number += 1
+                desc = f"{kind} {number}"
+            taken.add(desc.lower())
+            items.append((desc, kind, width, depth, height))
+            number += 1
+    return items
+
+def probe(item, x, y, rotation=0, facing="NORTH"):
+    """A SceneObject for an item standing on the floor at (x, y), outside the scene.
+    Its bounds are left to a dsl.refit_bboxes pass over all candidates."""
+    desc, kind, width, depth, height = item
+    obj = dsl.SceneObject(desc, width, depth, height)
+    obj.x, obj.y, obj.z = x, y, height / 2
+    obj.rotation, obj.facing = rotation, facing
+    return obj
+
+def candidate_placements(item, room, anchors):
+    """Every placement the primitives can give an item, as (call, probe) pairs.
+
+    Positions come from the helpers the primitives use themselves: dsl.wall_position
+    (place_along_wall), dsl.room_corner_position (place_in_room_corner) and
+    dsl.relative_position (place_relative next to each placed anchor of the item's
+    companion kind, given as (kind, probe) pairs).
+    """
+    desc, kind, width, depth, height = item
+    shape = dsl.SceneObject(desc, width, depth, height)
+    candidates = []
+
+    for wall in WALLS:
+        length, extent = (room[0], width) if wall in ("NORTH", "SOUTH") else (room[1], depth)
+        ends = [(WALL_DISTANCE + extent / 2) / length, 1 - (WALL_DISTANCE + extent / 2) / length]
+        for position in ends + WALL_POSITIONS:
+            x, y, facing = dsl.wall_position(shape, wall, position, WALL_DISTANCE, room[:2])
+            candidates.append((("place_along_wall", desc, wall, position, WALL_DISTANCE), probe(item, x, y, 0, facing)))
+
+    for corner in CORNERS:
+        x, y, facing, rotation = dsl.room_corner_position(shape, corner, WALL_DISTANCE, room=room[:2])
+        candidates.append((("place_in_room_corner", desc, corner, WALL_DISTANCE), probe(item, x, y, rotation, facing)))
+
+    anchor_kind, gap = COMPANIONS.get(kind, (None, 0))
+    for ref_kind, ref in anchors:
+        if ref_kind != anchor_kind:
+            continue
+        for direction in WALLS:
+            x, y = dsl.relative_position(shape, ref, direction, gap)
+            candidates.append((("place_relative", desc, ref.description, direction, gap), probe(item, x, y)))
+    dsl.refit_bboxes([obj for _, obj in candidates], track=False)
+    return candidates
+
+def fits(obj, room, obstacles):
+    """Whether a probe passes the DSL's own tests: inside the room and clear of every obstacle at its height."""
+    return dsl.within_room_boundaries(obj, room) and not dsl.check_overlap_with_existing(obj, objects=obstacles)[0]
+
+def front_strip(obj):
+    """A probe for the FRONT_CLEARANCE strip in front of a placed probe, as tall as the probe."""
+    min_x, max_x, min_y, max_y, min_z, max_z = obj.bounds
+    if obj.facing == "NORTH":
+        min_y, max_y = max_y, max_y + FRONT_CLEARANCE
+    elif obj.facing == "SOUTH":
+        min_y, max_y = min_y - FRONT_CLEARANCE, min_y
+    elif obj.facing == "EAST":
+        min_x, max_x = max_x, max_x + FRONT_CLEARANCE
+    else:
+        min_x, max_x = min_x - FRONT_CLEARANCE, min_x
+    strip = dsl.SceneObject(obj.description + " front", max_x - min_x, max_y - min_y, max_z - min_z)
+    strip.x, strip.y, strip.z = (min_x + max_x) / 2, (min_y + max_y) / 2, (min_z + max_z) / 2
+    strip.bounds = (min_x, max_x, min_y, max_y, min_z, max_z)
+    return strip
+
+def score_layout(plan, unplaced, room, obstacles):
+    """Score a layout; higher is better.
+
+    - every unplaced item costs 100
+    - every item next to its companion anchor earns 5
+    - every item whose front strip is clear and inside the room earns 1
+    - the largest open square of floor earns up to 10, by its share of the floor area
+    """
+    objects = [entry[1] for entry in plan] + list(obstacles)
+    score = -100.0 * len(unplaced)
+    score += 5.0 * sum(entry[0][0] == "place_relative" for entry in plan)
+    for i, (_, obj) in enumerate(plan):
+        score += float(fits(front_strip(obj), room, objects[:i] + objects[i + 1:]))
+
+    # Largest open square, by bisection on the occupancy grid's box test
+    grid = OccupancyGrid(room[0], room[1], resolution=0.1)
+    for key, obj in enumerate(objects):
+        grid.stamp(key, *obj.bounds[:4])
+    low, high = 0.0, min(room[0], room[1])
+    for _ in range(8):
+        side = (low + high) / 2
+        if grid.free_centers(side / 2, side / 2)[0].any():
+            low = side
+        else:
+            high = side
+    return score + 10.0 * low * low / (room[0] * room[1])
+
+def build_layout(items, room, obstacles, rng, greed=3.0):
+    """One randomized greedy pass: place items in order, each at a feasible candidate
+    drawn with probability favouring companions and clear fronts.
+
+    Returns:
+        (plan, unplaced): plan entries are (call, probe); unplaced holds descriptions
+    """
+    placed = list(obstacles)
+    anchors = []  # (kind, probe) of planned items, for place_relative
+    plan, unplaced = [], []
+    for item in items:
+        desc, kind = item[:2]
+        ok = [c for c in candidate_placements(item, room, anchors) if fits(c[1], room, placed)]
+        if not ok:
+            unplaced.append(desc)
+            continue
+        weights = np.array([5.0 if call[0] == "place_relative" else 1.0 for call, _ in ok])
+        fronts = np.array([fits(front_strip(obj), room, placed) for _, obj in ok], dtype=float)
+        weights = (weights + fronts) ** greed
+        call, obj = ok[rng.choices(range(len(ok)), weights=weights.tolist())[0]]
+        plan.append((call, obj))
+        placed.append(obj)
+        anchors.append((kind, obj))
+    return plan, unplaced
+
+def order_items(items, rng):
+    """Anchors before their companions, larger footprints first, ties shuffled."""
+    anchors = {anchor for anchor, _ in COMPANIONS.values()}
+    def key(item):
+        depth_in_chain = 0
+        kind = item[1]
+        while kind in COMPANIONS and depth_in_chain < len(COMPANIONS):
+            kind = COMPANIONS[kind][0]
+            depth_in_chain += 1
+        return (depth_in_chain, item[1] not in anchors, -item[2] * item[3], rng.random())
+    return sorted(items, key=key)
+
+def search_layouts(items, room, obstacles, seed, time_budget, min_restarts=1):
+    """Run randomized restarts until the time budget runs out; return (score, plan, unplaced, restarts)."""
+    rng = random.Random(seed)
+    deadline = time.monotonic() + time_budget
+    best = None
+    restarts = 0
+    while restarts < min_restarts or time.monotonic() < deadline:
+        plan, unplaced = build_layout(order_items(items, rng), room, obstacles, rng)
+        score = score_layout(plan, unplaced, room, obstacles)
+        restarts += 1
+        if best is None or score > best[0]:
+            best = (score, plan, unplaced)
+    return best + (restarts,)
+
+def _search_worker(args):
+    return search_layouts(*args)
+
+def generate_layout(inventory, time_budget=2.0, workers=None, seed=0):
+    """Search for the best-scoring collision-free layout of an inventory in the current room.
+
+    Objects already placed in the scene are treated as fixed obstacles, at their heights,
+    so an item can go under a wall-mounted shelf. Restarts run in
+    a process pool, one independent random stream per worker, until the time budget.
+
+    Args:
+        inventory: Text such as "1 bed, 2 nightstands, 1 desk", or (kind, count) pairs
+        time_budget: Search time in seconds (default 2.0)
+        workers: Worker processes (default the CPU count); 1 searches in-process
+        seed: Base random seed, for reproducible layouts with a fixed restart count
+
+    Returns:
+        Dict with "items", "plan" (DSL calls in order), "unplaced", "score" and "restarts",
+        or None if the room is not set
+    """
+    if not all([dsl.scene["room_width"], dsl.scene["room_depth"], dsl.scene["room_height"]]):
+        log.error("Room dimensions must be set before generating a layout")
+        return None
+    room = (float(dsl.scene["room_width"]), float(dsl.scene["room_depth"]), float(dsl.scene["room_height"]))
+    obstacles = [obj for obj in dsl.scene["objects"] if obj.x is not None]
+    items = expand_inventory(inventory, [obj.description for obj in dsl.scene["objects"]])
+    if not items:
+        log.error("Empty inventory")
+        return None
+
+    workers = workers or multiprocessing.cpu_count()
+    jobs = [(items, room, obstacles, seed + i, time_budget) for i in range(workers)]
+    start = time.perf_counter()
+    if workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(_search_worker, jobs)
+    else:
+        results = [_search_worker(jobs[0])]
+    score, plan, unplaced, _ = max(results, key=lambda result: result[0])
+    restarts = sum(result[3] for result in results)
+    log.info("Searched %s layouts in %.2fs on %s worker(s), best score %.2f",
+             restarts, time.perf_counter() - start, workers, score)
+    if unplaced:
+        log.warning("No collision-free spot for %s", unplaced)
+    return {"items": items, "plan": [entry[0] for entry in plan], "unplaced": unplaced,
+            "score": score, "restarts": restarts}
+
+def apply_layout(layout):
+    """Create the layout's objects and place them with the DSL primitives, in plan order."""
+    sizes = {desc: (width, depth, height) for desc, _, width, depth, height in layout["items"]}
+    for name, desc, *args in layout["plan"]:
+        dsl.create_object(desc, *sizes[desc])
+        getattr(dsl, name)(desc, *args)
+    log.info("Applied layout of %s objects", len(layout["plan"]))
+
+def layout_room(inventory, time_budget=2.0, workers=None, seed=0):
+    """Generate a layout for an inventory and apply it to the scene; returns the layout."""
+    layout = generate_layout(inventory, time_budget, workers, seed)
+    if layout is not None:
+        apply_layout(layout)
+    return layout
+
+
+if __name__ == "__main__":
+    # Usage: python layout.py "1 bed, 2 nightstands, 1 desk, 1 wardrobe" [width depth height] [seconds]
+    args = sys.argv[1:]
+    if not args:
+        print('Usage: python layout.py "<inventory>" [width depth height] [seconds]')
+        sys.exit(1)
+    dims = [float(v) for v in args[1:4]] if len(args) >= 4 else [4.0, 4.0, 3.0]
+    dsl.set_room(*dims)
+    layout_room(args[0], float(args[4]) if len(args) > 4 else 2.0)
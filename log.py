@@ -0,0 +1,141 @@
+"""Leveled output for the DSL and a structured-event sink for collecting diagnostics.
+
+Messages are printed with the tags the DSL has always used: "[Debug]", "[DSL]",
+"[Warning]" and "[Error]". Messages take printf-style arguments that are only formatted
+when the line is actually printed, so a disabled level costs one comparison per call:
+
+    log.debug("Placed %s at (%.2f, %.2f)", obj.description, x, y)
+
+The printed level comes from the TEXT3D_LOG_LEVEL environment variable ("debug",
+"info", "warning", "error" or "off"; default "info", so debug lines are off) or
+set_level(). Sinks added with add_sink() receive every record at or above their own
+level as a dict holding the unformatted message, its arguments and any keyword fields,
+whether or not the line is printed.
+"""
+import os
+import sys
+from contextlib import contextmanager
+
+DEBUG, INFO, WARNING, ERROR, OFF = 10, 20, 30, 40, 100
+
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR, "off": OFF}
+PREFIXES = {DEBUG: "[Debug]", INFO: "[DSL]", WARNING: "[Warning]", ERROR: "[Error]"}
+NAMES = {DEBUG: "debug", INFO: "info", WARNING: "warning", ERROR: "error"}
+
+def _parse_level(value):
+    if isinstance(value, int):
+        return value
+    try:
+        return LEVELS[str(value).strip().lower()]
+    except KeyError:
+        raise ValueError(f"Unknown log level {value!r}, use one of {', '.join(LEVELS)}")
+
+try:
+    level = _parse_level(os.environ.get("TEXT3D_LOG_LEVEL", "info"))
+except ValueError as e:
+    print(f"[Warning] {e} - using info", file=sys.stderr)
+    level = INFO
+
+# (callable, level) pairs receiving record dicts
+sinks = []
+
+# Lowest level anything listens to; every logging call returns at once below it
+_floor = level
+
+def _refresh():
+    global _floor
+    _floor = min([level] + [sink_level for _, sink_level in sinks])
+
+def set_level(new_level):
+    """Set the printed level (a name such as "warning" or a numeric level); returns the old one."""
+    global level
+    old, level = level, _parse_level(new_level)
+    _refresh()
+    return old
+
+def is_enabled(at):
+    """Whether a message at this level would be printed or collected; for guarding costly arguments."""
+    return at >= _floor
+
+def add_sink(sink, at=DEBUG):
+    """Send every record at or above `at` to sink(record).
+
+    A record is a dict with "level" (name), "msg" (unformatted), "args" and the keyword
+    fields of the call; "event" names structured events sent with event().
+    """
+    sinks.append((sink, _parse_level(at)))
+    _refresh()
+    return sink
+
+def remove_sink(sink):
+    sinks[:] = [(s, at) for s, at in sinks if s != sink]
+    _refresh()
+
+def format_record(record):
+    """The line a record prints as (structured events show their fields)."""
+    if "msg" not in record:
+        fields = ", ".join(f"{key}={value}" for key, value in record.items() if key not in ("level", "event"))
+        return f"{PREFIXES[LEVELS[record['level']]]} {record['event']}: {fields}"
+    msg = record["msg"] % record["args"] if record["args"] else record["msg"]
+    return f"{PREFIXES[LEVELS[record['level']]]} {msg}"
+
+def _log(at, msg, args, fields):
+    if at >= level:
+        print(f"{PREFIXES[at]} {msg % args if args else msg}")
+    if sinks:
+        record = None
+        for sink, sink_level in sinks:
+            if at >= sink_level:
+                if record is None:
+                    record = {"level": NAMES[at], "msg": msg, "args": args, **fields}
+                sink(record)
+
+def debug(msg, *args, **fields):
+    if DEBUG < _floor:
+        return
+    _log(DEBUG, msg, args, fields)
+
+def info(msg, *args, **fields):
+    if INFO < _floor:
+        return
+    _log(INFO, msg, args, fields)
+
+def warning(msg, *args, **fields):
+    if WARNING < _floor:
+        return
+    _log(WARNING, msg, args, fields)
+
+def error(msg, *args, **fields):
+    if ERROR < _floor:
+        return
+    _log(ERROR, msg, args, fields)
+
+def event(name, at=DEBUG, **fields):
+    """Send a structured record to the sinks only; nothing is printed or formatted."""
+    if not sinks or at < _floor:
+        return
+    record = None
+    for sink, sink_level in sinks:
+        if at >= sink_level:
+            if record is None:
+                record = {"level": NAMES[at], "event": name, **fields}
+            sink(record)
+
+@contextmanager
+def capture(at=DEBUG):
+    """Collect the records at or above `at` emitted inside the block into the yielded list."""
+    records = []
+    sink = add_sink(records.append, at)
+    try:
+        yield records
+    finally:
+        remove_sink(sink)
+
+@contextmanager
+def quiet(at=OFF):
+    """Print nothing below `at` inside the block (everything by default); sinks still collect."""
+    old = set_level(at)
+    try:
+        yield
+    finally:
+        set_level(old)
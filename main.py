@@ -6,8 +6,9 @@ from transformers import BertTokenizer, TFBertModel
 
 def initialize_scene(scene_file="scene_state.json"):
     """Initialize an empty scene_state.json with no content."""
+    from storage import atomic_open
     try:
-        with open(scene_file, "w") as f:
+        with atomic_open(scene_file) as f:
             json.dump({}, f, indent=4)
         print(f"New empty scene initialized: {scene_file} created.")
         return True
@@ -16,18 +17,18 @@ def initialize_scene(scene_file="scene_state.json"):
         return False
 
 def load_scene(scene_file="scene_state.json"):
-    """Load an existing scene_state.json file."""
-    try:
-        with open(scene_file, "r") as f:
-            scene_data = json.load(f)
-        print(f"Scene loaded successfully from {scene_file}.")
-        return True
-    except FileNotFoundError:
-        print(f"[Error] Scene file '{scene_file}' not found.")
-        return False
-    except json.JSONDecodeError:
-        print(f"[Error] Invalid JSON format in '{scene_file}'.")
+    """Rebuild the DSL scene from an existing scene file (JSON or binary)."""
+    import dsl
+    if not dsl.load_scene(scene_file):
         return False
+    print(f"Scene loaded successfully from {scene_file}.")
+    return True
+
+def has_display():
+    """Return True if an interactive 3-D window can be shown on this machine."""
+    if sys.platform in ("win32", "darwin"):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
 
 def main():
     """
@@ -44,9 +45,12 @@ def main():
     import dsl_class
     import nlp
     import dsl
-    import nlc
     import time
-    dsl.scene = {"objects": [], "constraints": [], "room_width": None, "room_depth": None, "room_height": None}
+    import floorplan
+    import profiling
+    import journal
+    from viz import SceneVisualizer
+    dsl.reset_scene()
     # Prompt user to load or create a scene
     print("\nWelcome to the 3D Scene Generator!")
     print("Would you like to:")
@@ -54,9 +58,14 @@ def main():
     print("2. Create a new scene")
     choice = input("Enter 1 or 2: ").strip()
 
+    loaded = False
     if choice == "1":
         scene_file = input("Enter the path to the scene file (default: scene_state.json): ").strip() or "scene_state.json"
-        if not load_scene(scene_file):
+        loaded = load_scene(scene_file)
+        if loaded:
+            # Let reference matching see the loaded objects
+            nlp.scene_state = dsl.scene_dict()
+        else:
             print("Falling back to creating a new empty scene.")
             if not initialize_scene(scene_file):
                 print("[Error] Failed to initialize a new scene. Exiting.")
@@ -69,6 +78,11 @@ def main():
     else:
         print("[Error] Invalid choice. Exiting.")
         return
+    dsl.scene_file = scene_file
+    # Every command of the session is journaled next to the scene file (see journal.replay);
+    # a loaded scene continues its journal, a new one (or a failed load) starts it over
+    session_journal = journal.Journal(os.path.splitext(scene_file)[0] + "_journal.jsonl",
+                                      append=loaded).start()
 
     # Initialize the BERT tokenizer and load the model
     print("Initializing models...")
@@ -88,6 +102,10 @@ def main():
     print("\nEnter natural language commands to build your scene, or 'exit' to quit.")
     print("Example: 'Create a room with dimensions 5x5x3 meters'")
 
+    # A top-down preview is written after every command; the 3-D window only opens with a display
+    preview_file = os.path.splitext(scene_file)[0] + "_preview.svg"
+    viewer = SceneVisualizer() if has_display() else None
+
     # Create a namespace for DSL execution that includes all DSL functions
     dsl_namespace = {}
     for name in dir(dsl):
@@ -103,26 +121,39 @@ def main():
 
         try:
             start_time = time.time()
-
-            # Step 1: Classify the command type using dsl_classifier
-            command_type = dsl_class.predict_dsl(user_input, model, tokenizer)
-            print(f"Classified command type: {command_type}")
-
-            # Step 2: Generate the DSL command string using nlp.py
-            nlp_function = getattr(nlp, command_type)
-            dsl_command_str = nlp_function(user_input)
-            print(f"Generated DSL command: {dsl_command_str}")
-
-            # Step 3: Execute the DSL command
-            exec(dsl_command_str, {}, dsl_namespace)
-            print("Command executed successfully!")
-            visualize_scene(scene_file)
+            with profiling.stage("command", text=user_input):
+                # Step 1: Classify the command type using dsl_classifier
+                with profiling.stage("classify"):
+                    command_type = dsl_class.predict_dsl(user_input, model, tokenizer)
+                print(f"Classified command type: {command_type}")
+
+                # Step 2: Generate the DSL command string using nlp.py
+                nlp_function = getattr(nlp, command_type)
+                with profiling.stage("generate_dsl", command=command_type):
+                    dsl_command_str = nlp_function(user_input)
+                print(f"Generated DSL command: {dsl_command_str}")
+
+                # Step 3: Execute the DSL command
+                with profiling.stage("execute_dsl"):
+                    exec(dsl_command_str, {}, dsl_namespace)
+                print("Command executed successfully!")
+                with profiling.stage("preview"):
+                    if floorplan.render_floorplan(scene_file, preview_file):
+                        print(f"Preview written to {preview_file}")
+                if viewer is not None:
+                    with profiling.stage("visualize"):
+                        viewer.update(scene_file)
             end_time = time.time()
             print(f"Time taken: {end_time - start_time:.2f} seconds")
         except Exception as e:
             print(f"Error: {str(e)}")
             print("Please try again with a different command.")
 
+    session_journal.stop()
+    if viewer is not None:
+        viewer.close()
+    if profiling.enabled:
+        profiling.report()
     print("\nExiting the scene generator. Goodbye!")
 
     # Ask if the user wants to transform the scene for import
@@ -1,10 +1,16 @@
 import re
 import spacy
 import json
+import profiling
 
 # Load spaCy English model
 nlp = spacy.load("en_core_web_sm")
 
+def parse(text):
+    """Run the spaCy pipeline on text, timed as the "spacy_parse" stage."""
+    with profiling.stage("spacy_parse"):
+        return nlp(text)
+
 # Direction and corner mappings
 DIRECTION_MAP = {
     "left":     "WEST",
@@ -35,6 +41,54 @@ DIRECTIONAL_WORDS = {
     "upper", "lower", "forward", "backward"
 }
 
+# Words align_object reads as the target and reference anchors, in order
+ANCHOR_WORDS = frozenset({"center", "left", "right", "top", "bottom"})
+
+# Articles stripped from the front of object references
+ARTICLES = ("the ", "a ", "an ")
+
+# Patterns shared by the generators, compiled once
+NUMBER_PATTERN = re.compile(r"\d+(\.\d+)?")
+CREATE_NAMED_PATTERN = re.compile(r"^create\s+([a-z]+)\s+(\d+)(?:\s+that\s+are\b)?")
+CREATE_COUNT_PATTERN = re.compile(r"^create\s+(\d+)\s+([a-z]+?)(?:s)?\b")
+TRAILING_NUMBER_PATTERN = re.compile(r"\s*\d+$")
+ALIGN_MODE_PATTERN = re.compile(r"align .*? (?:to|with) the (\w+)")
+OFFSET_PATTERN = re.compile(r"offset (\d+(\.\d+)?)")
+CORNER_PATTERN = re.compile(r"\b(" + "|".join(re.escape(phrase) for phrase in CORNER_MAP) + r")\b")
+FORMATION_PATTERN = re.compile(r"in a (\w+)")
+# "0.3m west of a bed", "0.4 to the south of a nightstand"
+REFERENCE_PATTERN = re.compile(r"(\d+\.\d+m?)\s+(west|east|north|south|to the\s+(west|east|north|south))\s+of\s+a\s+([\w\s]+?)(?:and|$)")
+AND_PATTERN = re.compile(r"\band\b")
+
+def scan(doc):
+    """Read the direction words, alignment anchors, corner phrase and numbers of a parsed
+    command, in one pass over its tokens (the corner and the numbers come from one regex
+    search of its text each).
+
+    Returns:
+        Dict with "directions" (DIRECTION_MAP values in order), "anchors" (ANCHOR_WORDS as
+        written), "corner" (CORNER_MAP value of the first corner phrase, or None) and
+        "numbers" (floats in order)
+    """
+    directions, anchors = [], []
+    for token in doc:
+        word = token.lower_
+        if word in DIRECTION_MAP:
+            directions.append(DIRECTION_MAP[word])
+        if word in ANCHOR_WORDS:
+            anchors.append(token.text)
+    corner_match = CORNER_PATTERN.search(doc.text.lower())
+    return {"directions": directions, "anchors": anchors,
+            "corner": CORNER_MAP[corner_match.group(1)] if corner_match else None,
+            "numbers": extract_numbers(doc.text)}
+
+def strip_articles(text):
+    """Drop leading articles ("the ", "a ", "an ", in that order, any case)."""
+    for article in ARTICLES:
+        if text.lower().startswith(article):
+            text = text[len(article):]
+    return text
+
 def load_scene_state(file_path="scene_state.json"):
     """Load the scene state from a JSON file."""
     try:
@@ -51,7 +105,22 @@ def load_scene_state(file_path="scene_state.json"):
 scene_state = load_scene_state()
 
 def extract_numbers(text: str):
-    return [float(m.group()) for m in re.finditer(r"\d+(\.\d+)?", text)]
+    return [float(m.group()) for m in NUMBER_PATTERN.finditer(text)]
+
+# Lowercased descriptions of scene_state["objects"], rebuilt when that list is replaced or
+# changes length
+_scene_index = {"objects": None, "count": 0, "exact": {}, "lowered": []}
+
+def _scene_descriptions(objects):
+    index = _scene_index
+    if index["objects"] is not objects or index["count"] != len(objects):
+        lowered = [(obj["description"], obj["description"].lower()) for obj in objects]
+        exact = {}
+        for description, lower in lowered:
+            exact.setdefault(lower, description)
+        index.update(objects=objects, count=len(objects), exact=exact,
+                     lowered=[(description, lower, set(lower.split())) for description, lower in lowered])
+    return index
 
 def match_object_in_scene(ref_text):
     """
@@ -61,25 +130,21 @@ def match_object_in_scene(ref_text):
     if not ref_text or "objects" not in scene_state:
         return None
     
-    clean_ref = ref_text.lower().strip()
-    for article in ["the ", "a ", "an "]:
-        if clean_ref.startswith(article):
-            clean_ref = clean_ref[len(article):]
+    clean_ref = strip_articles(ref_text.lower().strip())
+    index = _scene_descriptions(scene_state["objects"])
     
-    for obj in scene_state["objects"]:
-        if clean_ref == obj["description"].lower():
-            return obj["description"]
+    if clean_ref in index["exact"]:
+        return index["exact"][clean_ref]
     
-    for obj in scene_state["objects"]:
-        if clean_ref in obj["description"].lower() or obj["description"].lower() in clean_ref:
-            return obj["description"]
+    for description, lower, _ in index["lowered"]:
+        if clean_ref in lower or lower in clean_ref:
+            return description
     
     if " " in clean_ref:
-        for obj in scene_state["objects"]:
-            obj_parts = obj["description"].lower().split()
-            ref_parts = clean_ref.split()
+        ref_parts = clean_ref.split()
+        for description, _, obj_parts in index["lowered"]:
             if any(part in obj_parts for part in ref_parts):
-                return obj["description"]
+                return description
     
     return None
 
@@ -95,11 +160,7 @@ def extract_object_reference(doc, deps=None):
     
     for chunk in doc.noun_chunks:
         if chunk.root.dep_ in deps and chunk.root.text.lower() not in DIRECTIONAL_WORDS:
-            clean_text = chunk.text.strip()
-            for article in ["the ", "a ", "an "]:
-                if clean_text.lower().startswith(article):
-                    clean_text = clean_text[len(article):]
-            potential_refs.append(clean_text)
+            potential_refs.append(strip_articles(chunk.text.strip()))
     
     if not potential_refs:
         for token in doc:
@@ -120,7 +181,7 @@ def set_room(text: str) -> str:
 
 def create_object(text: str) -> str:
     text_l = text.lower().strip()
-    doc    = nlp(text_l)
+    doc    = parse(text_l)
 
     # Default
     desc = None
@@ -128,7 +189,7 @@ def create_object(text: str) -> str:
     dims_source = text_l
 
     # 1) EXACT “create chair 4” (with optional “that are …” afterwards)
-    m2 = re.match(r"^create\s+([a-z]+)\s+(\d+)(?:\s+that\s+are\b)?", text_l)
+    m2 = CREATE_NAMED_PATTERN.match(text_l)
     if m2:
         noun, num_str = m2.group(1), m2.group(2)
         desc = f"{noun}_{num_str}"
@@ -138,7 +199,7 @@ def create_object(text: str) -> str:
 
     else:
         # 2) “create 3 chairs …”
-        m1 = re.match(r"^create\s+(\d+)\s+([a-z]+?)(?:s)?\b", text_l)
+        m1 = CREATE_COUNT_PATTERN.match(text_l)
         if m1:
             qty = int(m1.group(1))
             noun = m1.group(2)
@@ -150,11 +211,8 @@ def create_object(text: str) -> str:
         for chunk in doc.noun_chunks:
             if (chunk.root.pos_ in ("NOUN","PROPN") 
                and chunk.root.text.lower() not in DIRECTIONAL_WORDS):
-                cleaned = chunk.text.strip()
-                for art in ("the ","a ","an "):
-                    if cleaned.startswith(art):
-                        cleaned = cleaned[len(art):]
-                desc = re.sub(r"\s*\d+$", "", cleaned)  # drop trailing numbers
+                cleaned = strip_articles(chunk.text.strip())
+                desc = TRAILING_NUMBER_PATTERN.sub("", cleaned)  # drop trailing numbers
                 break
 
     if not desc:
@@ -177,36 +235,40 @@ def create_object(text: str) -> str:
 
 
 def place_relative(text: str) -> str:
-    doc = nlp(text)
+    doc = parse(text)
     
     target = extract_object_reference(doc, ["dobj", "obj"])
     ref = extract_object_reference(doc, ["pobj"])
     
-    direction = next((DIRECTION_MAP.get(tok.text.lower()) for tok in doc if tok.text.lower() in DIRECTION_MAP), None)
-    dist = extract_numbers(text)[0] if extract_numbers(text) else None
+    keywords = scan(doc)
+    direction = keywords["directions"][0] if keywords["directions"] else None
+    dist = keywords["numbers"][0] if keywords["numbers"] else None
     
     return f"place_relative('{target}', '{ref}', '{direction}', {dist}, 0, 0)"
 
 def align_object(text: str) -> str:
-    doc = nlp(text)
+    doc = parse(text)
     
     target = extract_object_reference(doc, ["dobj", "obj"])
     ref_name = extract_object_reference(doc, ["pobj"])
     
-    mode_match = re.search(r"align .*? (?:to|with) the (\w+)", text.lower())
+    text_l = text.lower()
+    mode_match = ALIGN_MODE_PATTERN.search(text_l)
     mode = mode_match.group(1) if mode_match else None
     
-    anchors = [tok.text for tok in doc if tok.text.lower() in ("center", "left", "right", "top", "bottom")]
+    keywords = scan(doc)
+    anchors = keywords["anchors"]
     target_anchor = anchors[0] if anchors else None
     ref_anchor = anchors[1] if len(anchors) > 1 else None
     
-    offset = float(re.search(r"offset (\d+(\.\d+)?)", text.lower()).group(1)) if re.search(r"offset (\d+(\.\d+)?)", text.lower()) else 0.2
-    direction = next((DIRECTION_MAP.get(tok.text.lower()) for tok in doc if tok.text.lower() in DIRECTION_MAP), None)
+    offset_match = OFFSET_PATTERN.search(text_l)
+    offset = float(offset_match.group(1)) if offset_match else 0.2
+    direction = keywords["directions"][0] if keywords["directions"] else None
     
     return f"align_object('{target}', '{mode}', '{target_anchor}', '{ref_name}', '{ref_anchor}', {offset}, {repr(direction)})"
 
 def place_on_top(text: str) -> str:
-    doc = nlp(text)
+    doc = parse(text)
 
     # 1) Get the “thing to place” via dobj/obj → lemma
     top_tok = next(
@@ -235,12 +297,13 @@ def place_on_top(text: str) -> str:
 
 
 def mount_on_wall(text: str) -> str:
-    doc = nlp(text)
+    doc = parse(text)
     
     obj = extract_object_reference(doc, ["dobj", "obj"])
     
-    wall = next((DIRECTION_MAP[tok.text.lower()] for tok in doc if tok.text.lower() in DIRECTION_MAP), None)
-    nums = extract_numbers(text)
+    keywords = scan(doc)
+    wall = keywords["directions"][0] if keywords["directions"] else None
+    nums = keywords["numbers"]
     dist = nums[0] if nums else 0.05
     pos = nums[1] if len(nums) > 1 else 0.5
     height = nums[2] if len(nums) > 2 else None
@@ -250,7 +313,7 @@ def mount_on_wall(text: str) -> str:
 
 
 def move_object(text: str) -> str:
-    doc = nlp(text.lower())
+    doc = parse(text.lower())
 
     # 1) Extract the object as full noun phrase (compounds + head)
     obj_tok = next(
@@ -264,80 +327,71 @@ def move_object(text: str) -> str:
         obj = "object"
 
     # 2) Find the first directional word in the full map
-    dir_tok = next((tok.text for tok in doc if tok.text in DIRECTION_MAP), None)
-    direction = DIRECTION_MAP.get(dir_tok) if dir_tok else None
+    keywords = scan(doc)
+    direction = keywords["directions"][0] if keywords["directions"] else None
 
     # 3) First numeric token = distance
-    nums = extract_numbers(text)
+    nums = keywords["numbers"]
     dist = nums[0] if nums else None
 
     return f"move_object('{obj}', '{direction}', {dist})"
 
 
 def rotate_object(text: str) -> str:
-    doc = nlp(text)
+    doc = parse(text)
     
     obj = extract_object_reference(doc, ["dobj", "obj"])
     
-    turns = int(extract_numbers(text)[0] if extract_numbers(text) else 1)
+    nums = scan(doc)["numbers"]
+    turns = int(nums[0] if nums else 1)
     
     return f"rotate_object('{obj}', {turns})"
 
 def place_in_room_corner(text: str) -> str:
-    doc = nlp(text.lower())
+    doc = parse(text.lower())
     
     # Extract object reference
     obj = extract_object_reference(doc, ["dobj", "obj"])
     
-    # Create regex pattern for all corner keywords (case-insensitive)
-    corner_keywords = '|'.join([re.escape(phrase) for phrase in CORNER_MAP.keys()])
-    corner_pattern = rf'\b({corner_keywords})\b'
-    
-    # Find the first matching corner keyword in the text
-    corner_match = re.search(corner_pattern, text.lower())
-    corner = CORNER_MAP.get(corner_match.group(1)) if corner_match else None
-    
-    # Extract numbers for wall distance and fallback
-    nums = extract_numbers(text)
+    # First corner phrase, numbers for the wall distance and the facing direction
+    keywords = scan(doc)
+    corner = keywords["corner"]
+    nums = keywords["numbers"]
     wall_dist = nums[0] if nums else 0.2
-    
-    # Extract facing direction
-    facing = next((DIRECTION_MAP.get(tok.text.lower()) for tok in doc if tok.text.lower() in DIRECTION_MAP), None)
+    facing = keywords["directions"][0] if keywords["directions"] else None
     
     # Generate DSL command
     return f"place_in_room_corner('{obj}', '{corner}', {wall_dist}, '{facing}')"
 
 def place_along_wall(text: str) -> str:
-    doc = nlp(text)
+    doc = parse(text)
     
     obj = extract_object_reference(doc, ["dobj", "obj"])
     
-    wall = next((DIRECTION_MAP.get(tok.text.lower()) for tok in doc if tok.text.lower() in DIRECTION_MAP), None)
-    nums = extract_numbers(text)
+    keywords = scan(doc)
+    wall = keywords["directions"][0] if keywords["directions"] else None
+    nums = keywords["numbers"]
     pos = nums[0] if nums else 0.5
     dist = nums[1] if len(nums) > 1 else 0.2
     
     return f"place_along_wall('{obj}', '{wall}', {pos}, {dist})"
 
 def arrange_in_group(text: str) -> str:
-    doc = nlp(text)
+    doc = parse(text)
     
     objs = []
     for chunk in doc.noun_chunks:
         if 'in a' not in chunk.text.lower():
-            clean_text = chunk.text.strip()
-            for article in ["the ", "a ", "an "]:
-                if clean_text.lower().startswith(article):
-                    clean_text = clean_text[len(article):]
+            clean_text = strip_articles(chunk.text.strip())
             if clean_text.lower() != "circle" and chunk.root.text.lower() not in DIRECTIONAL_WORDS:
                 objs.append(clean_text)
     
-    formation_match = re.search(r"in a (\w+)", text.lower())
+    formation_match = FORMATION_PATTERN.search(text.lower())
     formation = formation_match.group(1) if formation_match else "circle"
     nums = extract_numbers(text)
     spacing = nums[0] if nums else 0.5
     
-    return f"arrange_in_group({objs!r}, '{formation}', None, None, {spacing}, 'inward')"
+    return f"arrange_in_group({objs!r}, '{formation}', spacing={spacing}, facing='inward')"
 
 def place_relative_multi(text: str) -> str:
     """
@@ -348,7 +402,7 @@ def place_relative_multi(text: str) -> str:
       place_relative_multi('lamp', ['bed', 'nightstand'], ['WEST', 'SOUTH'], [0.3, 0.4])
     """
     text_l = text.lower().strip()
-    doc = nlp(text)
+    doc = parse(text)
 
     # 1) Identify target object (last noun before directional phrases)
     target = "object"
@@ -365,16 +419,13 @@ def place_relative_multi(text: str) -> str:
     distances = extract_numbers(text_l)
     
     # Look for patterns like "X west of Y" or "X to the south of Y"
-    ref_pattern = r'(\d+\.\d+m?)\s+(west|east|north|south|to the\s+(west|east|north|south))\s+of\s+a\s+([\w\s]+?)(?:and|$)'
-    matches = list(re.finditer(ref_pattern, text_l))
-    
-    for match in matches:
+    for match in REFERENCE_PATTERN.finditer(text_l):
         distance, dir_full, dir_inner, ref_text = match.groups()
         # Clean direction
         direction = dir_inner if dir_inner else dir_full
         direction = direction.upper()
         # Clean reference object
-        doc_ref = nlp(ref_text.strip())
+        doc_ref = parse(ref_text.strip())
         compounds = [t.text for t in doc_ref if t.dep_ == "compound"]
         head = next((t for t in doc_ref if t.pos_ in ("NOUN", "PROPN")), None)
         if head:
@@ -386,10 +437,10 @@ def place_relative_multi(text: str) -> str:
     if not refs and "between" in text_l:
         before, after = text_l.split("between", 1)
         refs_text = after.split(",", 1)[0]
-        parts = [p.strip() for p in re.split(r"\band\b", refs_text)]
+        parts = [p.strip() for p in AND_PATTERN.split(refs_text)]
         
         for part in parts:
-            doc_ref = nlp(part)
+            doc_ref = parse(part)
             compounds = [tok.text for tok in doc_ref if tok.dep_ == "compound"]
             head = next((tok for tok in doc_ref if tok.pos_ in ("NOUN", "PROPN")), None)
             if head:
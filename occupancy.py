@@ -0,0 +1,99 @@
+import math
+import numpy as np
+
+class OccupancyGrid:
+    """Rasterized top-down occupancy of the room.
+
+    Cells hold how many footprints cover them, so footprints can be stamped and cleared
+    independently. An integral image of the occupied cells is rebuilt lazily after edits,
+    after which any rectangle can be tested for occupancy in constant time.
+
+    Rows run along y (row 0 at y = 0) and columns along x.
+    """
+
+    # Slack (in cells) so footprints that exactly touch do not share a cell
+    EPS = 1e-6
+
+    def __init__(self, width, depth, resolution=0.05):
+        self.width = float(width)
+        self.depth = float(depth)
+        self.resolution = float(resolution)
+        self.cols = max(math.ceil(self.width / self.resolution - self.EPS), 1)
+        self.rows = max(math.ceil(self.depth / self.resolution - self.EPS), 1)
+        self.counts = np.zeros((self.rows, self.cols), dtype=np.uint16)
+        self.stamps = {}  # key -> (r0, r1, c0, c1) of the stamped cells
+        self._integral = None
+
+    def cell_range(self, min_x, max_x, min_y, max_y):
+        """Cells covered by a rectangle, clipped to the grid, as (r0, r1, c0, c1)."""
+        res = self.resolution
+        c0 = min(max(math.floor(min_x / res + self.EPS), 0), self.cols)
+        c1 = min(max(math.ceil(max_x / res - self.EPS), 0), self.cols)
+        r0 = min(max(math.floor(min_y / res + self.EPS), 0), self.rows)
+        r1 = min(max(math.ceil(max_y / res - self.EPS), 0), self.rows)
+        return r0, max(r1, r0), c0, max(c1, c0)
+
+    def stamp(self, key, min_x, max_x, min_y, max_y):
+        """Mark a footprint as occupied, replacing any previous stamp under the same key."""
+        self.clear(key)
+        r0, r1, c0, c1 = self.cell_range(min_x, max_x, min_y, max_y)
+        self.counts[r0:r1, c0:c1] += 1
+        self.stamps[key] = (r0, r1, c0, c1)
+        self._integral = None
+
+    def clear(self, key):
+        """Remove the footprint stamped under key, if any."""
+        cells = self.stamps.pop(key, None)
+        if cells is not None:
+            r0, r1, c0, c1 = cells
+            self.counts[r0:r1, c0:c1] -= 1
+            self._integral = None
+
+    @property
+    def integral(self):
+        """Summed-area table of occupied cells, padded with a leading zero row and column."""
+        if self._integral is None:
+            integral = np.zeros((self.rows + 1, self.cols + 1), dtype=np.int64)
+            np.cumsum(np.cumsum(self.counts > 0, axis=0), axis=1, out=integral[1:, 1:])
+            self._integral = integral
+        return self._integral
+
+    def occupied_cells(self, min_x, max_x, min_y, max_y):
+        """Number of occupied cells under a rectangle, in constant time."""
+        r0, r1, c0, c1 = self.cell_range(min_x, max_x, min_y, max_y)
+        integral = self.integral
+        return int(integral[r1, c1] - integral[r0, c1] - integral[r1, c0] + integral[r0, c0])
+
+    def is_free(self, min_x, max_x, min_y, max_y):
+        """True if no stamped footprint covers any cell of the rectangle."""
+        return self.occupied_cells(min_x, max_x, min_y, max_y) == 0
+
+    def free_centers(self, half_x, half_y):
+        """Boolean mask of cell-aligned positions where a box of the given half extents fits.
+
+        Returns:
+            (mask, xs, ys): mask[r, c] is True when the box centred at (xs[c], ys[r]) is free
+        """
+        res = self.resolution
+        kw = max(math.ceil(2 * half_x / res - self.EPS), 1)
+        kh = max(math.ceil(2 * half_y / res - self.EPS), 1)
+        if kw > self.cols or kh > self.rows:
+            return np.zeros((0, 0), dtype=bool), np.zeros(0), np.zeros(0)
+        integral = self.integral
+        window = (integral[kh:, kw:] - integral[:-kh, kw:] - integral[kh:, :-kw] + integral[:-kh, :-kw])
+        xs = np.arange(window.shape[1]) * res + half_x
+        ys = np.arange(window.shape[0]) * res + half_y
+        return window == 0, xs, ys
+
+    def nearest_free(self, x, y, half_x, half_y):
+        """Centre of the free, cell-aligned box position closest to (x, y), or None."""
+        mask, xs, ys = self.free_centers(half_x, half_y)
+        rows, cols = np.nonzero(mask)
+        if not len(rows):
+            return None
+        best = np.argmin((xs[cols] - x) ** 2 + (ys[rows] - y) ** 2)
+        return float(xs[cols[best]]), float(ys[rows[best]])
+
+    def free_area(self):
+        """Floor area in square meters not covered by any footprint."""
+        return float((self.counts == 0).sum()) * self.resolution ** 2
@@ -0,0 +1,154 @@
+"""Low-overhead stage timing and counters for the scene pipeline.
+
+Profiling is off unless the TEXT3D_PROFILE environment variable is set to a non-empty
+value other than "0" (or enable() is called). While off, stage() hands back a shared
+no-op context manager and count() returns at once, so instrumented code pays one flag
+test per call.
+
+When TEXT3D_PROFILE_FILE names a file, the recorded events are written there at exit:
+Chrome trace format (open in chrome://tracing or Perfetto) if it ends in ".json",
+otherwise one JSON object per line.
+"""
+import os
+import json
+import time
+import atexit
+import threading
+import functools
+from contextlib import nullcontext
+
+enabled = os.environ.get("TEXT3D_PROFILE", "") not in ("", "0")
+
+# Recorded stages as (name, start_ns, duration_ns, depth, args); bounded so a long
+# session cannot grow without limit
+MAX_EVENTS = 200000
+events = []
+counters = {}
+dropped = 0
+
+_NULL = nullcontext()
+_local = threading.local()
+_origin = time.perf_counter_ns()
+
+class _Stage:
+    __slots__ = ("name", "args", "start", "depth")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.depth = getattr(_local, "depth", 0)
+        _local.depth = self.depth + 1
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        global dropped
+        duration = time.perf_counter_ns() - self.start
+        _local.depth = self.depth
+        if len(events) < MAX_EVENTS:
+            events.append((self.name, self.start - _origin, duration, self.depth, self.args))
+        else:
+            dropped += 1
+        return False
+
+def stage(name, **args):
+    """Context manager timing one pipeline stage; nested stages are kept as children."""
+    if not enabled:
+        return _NULL
+    return _Stage(name, args or None)
+
+def timed(name=None):
+    """Decorator timing every call of a function as a stage (default name: the function's)."""
+    def decorate(func):
+        label = name or func.__name__
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            with _Stage(label, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def count(name, n=1):
+    """Add n to a named counter (overlap checks, retries, ...)."""
+    if not enabled:
+        return
+    counters[name] = counters.get(name, 0) + n
+
+def enable():
+    global enabled
+    enabled = True
+
+def disable():
+    global enabled
+    enabled = False
+
+def reset():
+    """Forget all recorded stages and counters."""
+    global dropped
+    events.clear()
+    counters.clear()
+    dropped = 0
+
+def summary():
+    """Per-stage call count, total and mean milliseconds, plus the counters."""
+    stages = {}
+    for name, _, duration, _, _ in events:
+        entry = stages.setdefault(name, {"calls": 0, "total_ms": 0.0})
+        entry["calls"] += 1
+        entry["total_ms"] += duration / 1e6
+    for entry in stages.values():
+        entry["mean_ms"] = entry["total_ms"] / entry["calls"]
+    return {"stages": stages, "counters": dict(counters), "dropped": dropped}
+
+def report():
+    """Print the summary, slowest stages first."""
+    data = summary()
+    for name, entry in sorted(data["stages"].items(), key=lambda item: -item[1]["total_ms"]):
+        print(f"[Profile] {name}: {entry['calls']} call(s), {entry['total_ms']:.2f} ms total, "
+              f"{entry['mean_ms']:.3f} ms mean")
+    for name, value in sorted(data["counters"].items()):
+        print(f"[Profile] {name}: {value}")
+    if data["dropped"]:
+        print(f"[Profile] {data['dropped']} stage(s) not recorded (over {MAX_EVENTS} events)")
+
+def export(path, format=None):
+    """Write the recorded stages and counters.
+
+    Args:
+        path: Output file
+        format: "chrome" for the Chrome trace event format, "jsonl" for one JSON object per
+            line (default chosen by extension: ".json" is chrome, anything else jsonl)
+    """
+    format = format or ("chrome" if path.endswith(".json") else "jsonl")
+    pid = os.getpid()
+    if format == "chrome":
+        trace = [{"name": name, "cat": "text3d", "ph": "X", "ts": start / 1e3, "dur": duration / 1e3,
+                  "pid": pid, "tid": 0, "args": args or {}} for name, start, duration, _, args in events]
+        end = max((start + duration for _, start, duration, _, _ in events), default=0)
+        if counters:
+            trace.append({"name": "counters", "ph": "C", "ts": end / 1e3, "pid": pid, "tid": 0, "args": dict(counters)})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+    else:
+        with open(path, "w") as f:
+            for name, start, duration, depth, args in events:
+                record = {"type": "stage", "name": name, "start_us": start / 1e3, "duration_us": duration / 1e3,
+                          "depth": depth}
+                if args:
+                    record["args"] = args
+                f.write(json.dumps(record) + "\n")
+            for name, value in sorted(counters.items()):
+                f.write(json.dumps({"type": "counter", "name": name, "value": value}) + "\n")
+    print(f"[Profile] Wrote {len(events)} stage(s) to {path}")
+    return path
+
+def _export_at_exit():
+    path = os.environ.get("TEXT3D_PROFILE_FILE")
+    if enabled and path and (events or counters):
+        export(path)
+
+atexit.register(_export_at_exit)
@@ -2,6 +2,7 @@ import trimesh
 import numpy as np
 import json
 import os
+from scene_binary import BinaryScene, load_scene_file
 
 def transform_glb(input_path, output_path, params):
     mesh = trimesh.load(input_path, process=False, force='mesh')
@@ -58,12 +59,12 @@ def transform_glb(input_path, output_path, params):
     mesh.export(output_path)
 
 def process_scene(scene_file, input_dir, output_dir):
-    # Load JSON
-    with open(scene_file, 'r') as f:
-        scene = json.load(f)
+    # Load JSON, or map a binary scene and decode one object at a time
+    scene = load_scene_file(scene_file)
+    objects = scene.iter_objects() if isinstance(scene, BinaryScene) else scene['objects']
 
     # Process each object
-    for obj in scene['objects']:
+    for obj in objects:
         params = {
             'description': obj['description'],
             'length': obj['width'],   # Blender x-axis
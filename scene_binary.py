@@ -0,0 +1,229 @@
+"""Compact binary scene files, readable through numpy.memmap without parsing the whole scene.
+
+A scene in the scene_state.json layout is stored as (all little-endian):
+
+    header        magic, version, object count and the offset/size of each section
+    columns       float32 x, y, z, width, depth, height, rotation, one contiguous column
+                  each (NaN for an unplaced coordinate); uint32 string offsets (N + 1);
+                  int32 support index (-1 if none); uint8 index into the facing table
+    strings       UTF-8 descriptions, back to back
+    meta          JSON: room dimensions and the facing table
+    constraints   JSON list of constraint records, parsed only when asked for
+
+Opening a file maps the columns and decodes nothing else, so the visualizer, floor plan,
+audit and sc.process_scene read geometry straight from the arrays. Coordinates are kept
+to float32 precision; JSON export rounds them to micrometers.
+
+Usage: python scene_binary.py scene_state.json scene_state.t3ds   (or the other way round)
+"""
+import sys
+import json
+import struct
+import numpy as np
+from storage import atomic_open
+
+MAGIC = b"T3DSCENE"
+VERSION = 1
+HEADER = struct.Struct("<8sII8Q")  # magic, version, count, (offset, size) x 4 sections
+ALIGN = 8
+
+# Geometry columns in file order
+COLUMNS = ("x", "y", "z", "width", "depth", "height", "rotation")
+NO_FACING = 255
+
+# Decimal places kept when float32 values are converted back to JSON numbers
+JSON_DECIMALS = 6
+
+def _pad(size):
+    return -size % ALIGN
+
+def is_binary_scene(path):
+    """Whether a file starts with the binary scene magic."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+def write_scene(scene_data, path):
+    """Write a scene dictionary in the scene_state.json layout as a binary scene file,
+    replacing any existing file atomically."""
+    objects = scene_data.get("objects", [])
+    count = len(objects)
+    columns = np.array([[np.nan if obj.get(key) is None else obj[key] for key in COLUMNS] for obj in objects],
+                       dtype="<f4").reshape(count, len(COLUMNS)).T
+    # Objects saved without a rotation face the default way
+    columns[COLUMNS.index("rotation"), np.isnan(columns[COLUMNS.index("rotation")])] = 0
+
+    encoded = [obj["description"].encode("utf-8") for obj in objects]
+    offsets = np.zeros(count + 1, dtype="<u4")
+    np.cumsum([len(name) for name in encoded], out=offsets[1:])
+    index = {obj["description"]: i for i, obj in enumerate(objects)}
+    support = np.array([index.get(obj.get("support"), -1) for obj in objects], dtype="<i4")
+    facings = sorted({obj["facing"] for obj in objects if obj.get("facing") is not None})
+    if len(facings) >= NO_FACING:
+        raise ValueError(f"Too many distinct facings ({len(facings)}) for a binary scene")
+    facing_codes = {facing: code for code, facing in enumerate(facings)}
+    facing = np.array([facing_codes.get(obj.get("facing"), NO_FACING) for obj in objects], dtype="u1")
+
+    column_bytes = columns.tobytes() + offsets.tobytes() + support.tobytes() + facing.tobytes()
+    strings = b"".join(encoded)
+    meta = json.dumps({"room": scene_data.get("room", {}), "facings": facings, "columns": COLUMNS}).encode()
+    constraints = json.dumps(scene_data.get("constraints", []), separators=(",", ":")).encode()
+
+    sections, position = [], HEADER.size + _pad(HEADER.size)
+    for data in (column_bytes, strings, meta, constraints):
+        sections.append((position, len(data)))
+        position += len(data) + _pad(len(data))
+    with atomic_open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, count, *[value for section in sections for value in section]))
+        f.write(b"\0" * _pad(HEADER.size))
+        for data in (column_bytes, strings, meta, constraints):
+            f.write(data)
+            f.write(b"\0" * _pad(len(data)))
+    return path
+
+class StringTable:
+    """Descriptions decoded one at a time from the mapped string section."""
+
+    def __init__(self, data, starts, ends):
+        self.data = data
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, i):
+        return bytes(self.data[self.starts[i]:self.ends[i]]).decode("utf-8")
+
+    def __iter__(self):
+        # One copy of the section, then plain bytes slicing: indexing the memmap per
+        # description costs more than decoding it
+        data = bytes(self.data)
+        return (data[start:end].decode("utf-8") for start, end in zip(self.starts.tolist(), self.ends.tolist()))
+
+    def take(self, indices):
+        """The descriptions at the given indices, still undecoded."""
+        return StringTable(self.data, self.starts[indices], self.ends[indices])
+
+class BinaryScene:
+    """A memory-mapped binary scene file.
+
+    Geometry columns are float32 arrays backed by the file (see column()), descriptions
+    decode on access and constraints parse on first use. Dictionary-style access
+    (scene["room"], scene.get("objects")) builds the scene_state.json layout, so code
+    written for JSON scenes works unchanged, if more slowly.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.raw = np.memmap(path, dtype=np.uint8, mode="r")
+        if len(self.raw) < HEADER.size or bytes(self.raw[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"'{path}' is not a binary scene file")
+        magic, version, count, *sections = HEADER.unpack(bytes(self.raw[:HEADER.size]))
+        if version != VERSION:
+            raise ValueError(f"Unsupported binary scene version {version} in '{path}'")
+        self.count = count
+        (columns_at, _), (strings_at, strings_size), (meta_at, meta_size), (constraints_at, constraints_size) = \
+            zip(sections[::2], sections[1::2])
+
+        position = columns_at
+        self.columns = self._array(position, "<f4", (len(COLUMNS), count))
+        position += self.columns.nbytes
+        offsets = self._array(position, "<u4", (count + 1,))
+        position += offsets.nbytes
+        self.support = self._array(position, "<i4", (count,))
+        position += self.support.nbytes
+        self.facing_codes = self._array(position, "u1", (count,))
+
+        meta = json.loads(bytes(self.raw[meta_at:meta_at + meta_size]))
+        self.room = meta["room"]
+        self.facings = meta["facings"]
+        self.descriptions = StringTable(self.raw[strings_at:strings_at + strings_size], offsets[:-1], offsets[1:])
+        self._constraints_span = (constraints_at, constraints_at + constraints_size)
+        self._constraints = None
+
+    def _array(self, offset, dtype, shape):
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        return self.raw[offset:offset + size].view(dtype).reshape(shape)
+
+    def __len__(self):
+        return self.count
+
+    def column(self, name):
+        """One float32 geometry column (x, y, z, width, depth, height or rotation)."""
+        return self.columns[COLUMNS.index(name)]
+
+    def facing(self, i):
+        code = int(self.facing_codes[i])
+        return None if code == NO_FACING else self.facings[code]
+
+    @property
+    def constraints(self):
+        if self._constraints is None:
+            start, end = self._constraints_span
+            self._constraints = json.loads(bytes(self.raw[start:end]))
+        return self._constraints
+
+    def iter_objects(self, indices=None):
+        """Yield objects as scene_state.json dictionaries, decoding one at a time."""
+        for i in range(self.count) if indices is None else indices:
+            values = [None if np.isnan(value) else round(float(value), JSON_DECIMALS)
+                      for value in self.columns[:, i].tolist()]
+            obj = {"description": self.descriptions[i], **dict(zip(COLUMNS, values))}
+            obj["facing"] = self.facing(i)
+            support = int(self.support[i])
+            obj["support"] = self.descriptions[support] if support >= 0 else None
+            yield obj
+
+    def to_dict(self):
+        """The whole scene in the scene_state.json layout."""
+        return {"room": dict(self.room), "objects": list(self.iter_objects()), "constraints": self.constraints}
+
+    def __getitem__(self, key):
+        if key == "room":
+            return self.room
+        if key == "objects":
+            return list(self.iter_objects())
+        if key == "constraints":
+            return self.constraints
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+def read_scene(path):
+    """Open a binary scene file (see BinaryScene)."""
+    return BinaryScene(path)
+
+def load_scene_file(path):
+    """Open a scene file of either format: a BinaryScene for binary files, otherwise the
+    parsed JSON dictionary. Raises FileNotFoundError, json.JSONDecodeError or ValueError."""
+    if is_binary_scene(path):
+        return BinaryScene(path)
+    with open(path, "r") as f:
+        return json.load(f)
+
+def convert(source, destination):
+    """Convert between formats; the source format is detected, the destination is binary
+    unless its name ends in '.json'."""
+    scene_data = load_scene_file(source)
+    if isinstance(scene_data, BinaryScene):
+        scene_data = scene_data.to_dict()
+    if destination.endswith(".json"):
+        with atomic_open(destination, "w") as f:
+            json.dump(scene_data, f, indent=4)
+    else:
+        write_scene(scene_data, destination)
+    return destination
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python scene_binary.py <source> <destination>")
+        sys.exit(2)
+    print(f"[DSL] Wrote {convert(sys.argv[1], sys.argv[2])}")
@@ -0,0 +1,218 @@
+"""Minimal differences between two scenes, and applying them to the dsl scene.
+
+A patch lists only what changed between two scenes in the scene_state.json layout:
+
+    {
+        "room": {...},                          # only if the room dimensions changed
+        "added": [object records],              # whole records of new objects
+        "removed": [descriptions],
+        "changed": [{"description": ..., field: new value, ...}],   # changed fields only
+        "constraints": {"base": 12, "added": [records]}  # or {"replace": [records]}
+    }
+
+Objects are matched by description. The geometry of every object present in both scenes
+is compared in one vectorized pass, so diffing two 50k-object scenes where a handful of
+objects moved costs about as much as building their coordinate arrays. Constraint
+records are an append-only log, so a patch normally carries only the records appended
+since the old scene ("base" is the old record count); if the old log is not a prefix of
+the new one (after compaction) the whole log is sent.
+
+Usage: python scene_diff.py old.json new.json [patch.json]
+"""
+import sys
+import json
+from operator import itemgetter
+import numpy as np
+import dsl
+import log
+from storage import atomic_open
+from scene_binary import COLUMNS, NO_FACING, BinaryScene, load_scene_file
+
+# Fields compared as strings rather than numbers
+TEXT_FIELDS = ("facing", "support")
+FIELDS = COLUMNS + TEXT_FIELDS
+_fields = itemgetter(*FIELDS)
+
+def _table(data):
+    """A scene's objects as (descriptions, (N, 7) float geometry with NaN for None,
+    (N, 2) object array of facing and support, record(i) returning one object record)."""
+    if isinstance(data, BinaryScene):
+        descriptions = list(data.descriptions)
+        text = np.empty((len(data), len(TEXT_FIELDS)), dtype=object)
+        text[:, 0] = [data.facings[code] if code != NO_FACING else None for code in data.facing_codes.tolist()]
+        text[:, 1] = [descriptions[i] if i >= 0 else None for i in data.support.tolist()]
+        return descriptions, data.columns.T.astype(float), text, lambda i: next(data.iter_objects([i]))
+    records = data.get("objects", [])
+    try:
+        rows = [_fields(record) for record in records]
+    except KeyError:  # hand-written files may leave fields out
+        rows = [tuple(record.get(key) for key in FIELDS) for record in records]
+    table = np.array(rows, dtype=object).reshape(-1, len(FIELDS))
+    return ([record["description"] for record in records], table[:, :len(COLUMNS)].astype(float),
+            table[:, len(COLUMNS):], lambda i: dict(records[i]))
+
+def diff_scenes(old, new, tolerance=0.0):
+    """The patch turning scene `old` into scene `new`.
+
+    Args:
+        old: Scene in the scene_state.json layout (dict or BinaryScene)
+        new: Scene in the same layout
+        tolerance: Largest difference in a geometry field still counted as unchanged
+            (binary scenes hold float32, about seven significant digits, so allow for that
+            when diffing one against a JSON scene)
+
+    Returns:
+        Patch dict (see the module docstring); empty lists and no "room" or
+        "constraints" key when nothing of that kind changed
+    """
+    old_names, old_geometry, old_text, _ = _table(old)
+    new_names, new_geometry, new_text, new_record = _table(new)
+    old_index = {name: i for i, name in enumerate(old_names)}
+    new_set = set(new_names)
+    patch = {"added": [], "removed": [name for name in old_names if name not in new_set], "changed": []}
+    if (old.get("room") or {}) != (new.get("room") or {}):
+        patch["room"] = dict(new.get("room") or {})
+
+    matched = np.array([old_index.get(name, -1) for name in new_names], dtype=np.int64)
+    patch["added"] = [new_record(i) for i in np.flatnonzero(matched < 0).tolist()]
+    common = np.flatnonzero(matched >= 0)
+    if len(common):
+        before, after = matched[common], common
+        differs = np.hstack([
+            ~np.isclose(old_geometry[before], new_geometry[after], rtol=0.0, atol=tolerance, equal_nan=True),
+            old_text[before] != new_text[after],
+        ])
+        for row in np.flatnonzero(differs.any(axis=1)).tolist():
+            record = new_record(int(common[row]))
+            entry = {"description": record["description"]}
+            for column in np.flatnonzero(differs[row]).tolist():
+                entry[FIELDS[column]] = record.get(FIELDS[column])
+            patch["changed"].append(entry)
+
+    old_constraints, new_constraints = old.get("constraints", []), new.get("constraints", [])
+    base = len(old_constraints)
+    if new_constraints[:base] == old_constraints:
+        if len(new_constraints) > base:
+            patch["constraints"] = {"base": base, "added": new_constraints[base:]}
+    else:
+        patch["constraints"] = {"replace": new_constraints}
+    return patch
+
+def is_empty(patch):
+    """Whether a patch changes nothing."""
+    return not (patch["added"] or patch["removed"] or patch["changed"] or "room" in patch or "constraints" in patch)
+
+def diff_files(old_path, new_path, tolerance=0.0):
+    """diff_scenes of two scene files of either format."""
+    return diff_scenes(load_scene_file(old_path), load_scene_file(new_path), tolerance)
+
+def diff_scene(old, tolerance=0.0):
+    """The patch from `old` (a scene_state.json dict, e.g. the last one shipped) to the
+    current dsl scene."""
+    return diff_scenes(old, dsl.scene_dict(), tolerance)
+
+def _set_fields(obj, record):
+    for key in COLUMNS:
+        if key in record:
+            setattr(obj, key, record[key])
+    if record.get("rotation", 0) is None:
+        obj.rotation = 0
+    if "facing" in record:
+        obj.facing = dsl.FACINGS.get(record["facing"]) or record["facing"] or "NORTH"
+
+@dsl.recorded
+def apply_patch(patch):
+    """Apply a patch from diff_scenes to the dsl scene.
+
+    Changed and added objects get their bboxes refitted in one vectorized pass and the
+    occupancy grid, if enabled, is kept in step. Like load_scene this replaces scene state
+    wholesale, so the undo history is cleared and nothing is saved.
+
+    Args:
+        patch: Patch dict from diff_scenes (or parsed from its JSON)
+
+    Returns:
+        True if the patch was applied, False (with the scene untouched) if it does not
+        fit the current scene
+    """
+    objects = dsl.scene["objects"]
+    by_description = {obj.description: obj for obj in objects}
+    missing = [desc for desc in patch["removed"] + [entry["description"] for entry in patch["changed"]]
+               if desc not in by_description]
+    duplicates = [record["description"] for record in patch["added"] if record["description"] in by_description]
+    constraints = patch.get("constraints", {})
+    if missing or duplicates:
+        log.error("Patch does not fit the scene: %s",
+                  ", ".join([f"no object '{desc}'" for desc in missing[:5]] +
+                            [f"'{desc}' already exists" for desc in duplicates[:5]]))
+        return False
+    if "base" in constraints and constraints["base"] != len(dsl.scene["constraints"]):
+        log.error("Patch does not fit the scene: it extends %s constraint record(s), the scene has %s",
+                  constraints["base"], len(dsl.scene["constraints"]))
+        return False
+
+    grid = dsl.scene.get("occupancy")
+    if "room" in patch:
+        room = patch["room"]
+        dsl.scene["room_width"], dsl.scene["room_depth"], dsl.scene["room_height"] = \
+            room.get("width"), room.get("depth"), room.get("height")
+        if grid is not None and dsl.scene["room_width"] and dsl.scene["room_depth"]:
+            dsl.enable_occupancy_grid(grid.resolution)
+            grid = dsl.scene["occupancy"]
+
+    if patch["removed"]:
+        removed = {by_description.pop(desc) for desc in patch["removed"]}
+        for obj in removed:
+            dsl.set_support(obj, None)
+            for resting in list(dsl.scene["surfaces"].get(obj, [])):
+                dsl.set_support(resting, None)
+            if grid is not None:
+                grid.clear(obj)
+        objects[:] = [obj for obj in objects if obj not in removed]
+
+    touched, supports = [], []
+    for entry in patch["changed"]:
+        obj = by_description[entry["description"]]
+        _set_fields(obj, entry)
+        touched.append(obj)
+        if "support" in entry:
+            supports.append((obj, entry["support"]))
+    for record in patch["added"]:
+        obj = dsl.SceneObject(record["description"], record["width"], record["depth"], record["height"])
+        _set_fields(obj, record)
+        objects.append(obj)
+        by_description[obj.description] = obj
+        touched.append(obj)
+        supports.append((obj, record.get("support")))
+
+    for obj in touched:
+        if obj.x is None or obj.y is None or obj.z is None:
+            obj.bounds = None
+            if grid is not None:
+                grid.clear(obj)
+    dsl.refit_bboxes(touched)
+    for obj, support in supports:
+        dsl.set_support(obj, by_description.get(support))
+
+    if "replace" in constraints:
+        dsl.scene["constraints"] = [dsl.Constraint(record["type"], record["details"]) for record in constraints["replace"]]
+    else:
+        dsl.scene["constraints"].extend(dsl.Constraint(record["type"], record["details"])
+                                        for record in constraints.get("added", []))
+    dsl.history["undo"].clear()
+    dsl.history["redo"].clear()
+    log.info("Applied patch: %s added, %s removed, %s changed", len(patch["added"]), len(patch["removed"]),
+             len(patch["changed"]))
+    return True
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4):
+        print("Usage: python scene_diff.py <old scene> <new scene> [patch.json]")
+        sys.exit(2)
+    result = diff_files(sys.argv[1], sys.argv[2])
+    if len(sys.argv) == 4:
+        with atomic_open(sys.argv[3], "w") as f:
+            json.dump(result, f, separators=(",", ":"))
+    else:
+        print(json.dumps(result, indent=4))
@@ -0,0 +1,67 @@
+"""Crash-safe file replacement for scene files.
+
+atomic_open() writes to a temporary file next to the target and renames it over the
+target only once the write has completed, so a reader (nlp, viz, the floor plan) sees
+either the previous file or the new one, never a half-written one, and a crash mid-write
+leaves the previous file intact. The new file's data is always forced to disk (fsync)
+before the rename, so the name never points at unwritten data. Forcing the rename itself
+to disk (an fsync of the directory) is the caller's choice; DSL saves batch that (see
+dsl.fsync_every).
+"""
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+
+def fsync_directory(path):
+    """Force the directory entry naming a file (and so a rename onto it) to disk."""
+    _fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+def _file_mode(path, directory):
+    """Mode for a file replacing `path`: the old file's, or for a new file the directory's
+    read/write bits (temporary files are created private)."""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        return stat.S_IMODE(os.stat(directory).st_mode) & 0o666
+
+def _fsync_directory(directory):
+    # Makes a rename durable on POSIX; directories cannot be opened this way on Windows
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+@contextmanager
+def atomic_open(path, mode="w", sync_directory=True):
+    """Open a temporary file that replaces `path` when the block exits without an error.
+
+    Args:
+        path: File to replace
+        mode: "w" for text or "wb" for bytes
+        sync_directory: Also force the rename to disk before returning; without it a
+            crash may bring back the previous file, but never a partial one
+
+    Yields:
+        The open temporary file; on an exception it is deleted and `path` left untouched
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            os.chmod(temp_path, _file_mode(path, directory))
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    if sync_directory:
+        _fsync_directory(directory)
@@ -0,0 +1,186 @@
+"""Try many variants of a scene edit in parallel and rank them, leaving the live scene alone.
+
+A variant is a sequence of DSL command strings, as nlp generates and main executes, with
+{placeholders} filled from one combination of a parameter grid:
+
+    commands = ["arrange_in_group({chairs}, {formation}, spacing={spacing})"]
+    grid = {"chairs": [["chair 1", "chair 2", "chair 3"]], "formation": ["circle", "grid"],
+            "spacing": [0.3, 0.5, 0.8]}
+    best = explore(commands, grid)
+
+The current dsl scene is pickled once and every variant runs on its own unpickled copy
+in a worker process, with saves and output off. Each result is scored by the free floor
+area left, the largest open square of floor, and the collisions, objects out of bounds
+and unplaced objects it ends with.
+"""
+import time
+import pickle
+import itertools
+import multiprocessing
+import numpy as np
+import dsl
+import log
+from audit import audit_scene
+from floorplan import rasterize_floorplan
+from occupancy import OccupancyGrid
+
+# Default score: share of the floor left free and taken by the largest open square,
+# minus penalties per problem
+FREE_AREA_WEIGHT = 10.0
+OPEN_SQUARE_WEIGHT = 10.0
+COLLISION_PENALTY = 5.0
+OUT_OF_BOUNDS_PENALTY = 5.0
+UNPLACED_PENALTY = 2.0
+
+# Objects whose bottom is higher than this (stacked or wall-mounted) do not take up floor
+FLOOR_CLEARANCE = 0.01
+
+# Floor raster cell size in meters for the free area
+AREA_RESOLUTION = 0.05
+
+def expand_grid(grid):
+    """Every combination of a {name: [values]} grid, as a list of {name: value} dicts."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def format_commands(commands, params):
+    """Fill the {placeholders} of each command string; values are written as Python literals."""
+    literals = {name: repr(value) for name, value in params.items()}
+    return [command.format(**literals) for command in commands]
+
+def largest_open_square(width, depth, boxes):
+    """Side in meters of the largest square of floor clear of the (min_x, max_x, min_y, max_y)
+    boxes, by bisection on the occupancy grid's box test (as layout.score_layout does)."""
+    grid = OccupancyGrid(width, depth, resolution=AREA_RESOLUTION)
+    for key, box in enumerate(boxes):
+        grid.stamp(key, *box)
+    low, high = 0.0, min(width, depth)
+    for _ in range(10):
+        side = (low + high) / 2
+        if grid.free_centers(side / 2, side / 2)[0].any():
+            low = side
+        else:
+            high = side
+    return low
+
+def scene_metrics():
+    """Free floor area, largest open square, collisions, out-of-bounds and unplaced objects
+    of the current dsl scene."""
+    data = dsl.scene_dict()
+    report = audit_scene(data)
+    width, depth = float(dsl.scene["room_width"]), float(dsl.scene["room_depth"])
+    room_area = width * depth
+    floor = dict(data, objects=[obj for obj in data["objects"] if obj["z"] - obj["height"] / 2 <= FLOOR_CLEARANCE])
+    covered = np.count_nonzero(rasterize_floorplan(floor, AREA_RESOLUTION)) * AREA_RESOLUTION ** 2
+    free_area = max(room_area - covered, 0.0)
+    boxes = [obj.bounds[:4] for obj in dsl.scene["objects"]
+             if obj.x is not None and obj.bounds[4] <= FLOOR_CLEARANCE]
+    open_square = largest_open_square(width, depth, boxes)
+    return {
+        "free_area": round(free_area, 4),
+        "free_ratio": round(free_area / room_area, 4),
+        "open_square": round(open_square, 4),
+        "collisions": len(report["collisions"]),
+        "out_of_bounds": len(report["out_of_bounds"]),
+        "unplaced": sum(obj.x is None for obj in dsl.scene["objects"]),
+    }
+
+def default_score(metrics):
+    """Higher is better."""
+    room_area = float(dsl.scene["room_width"]) * float(dsl.scene["room_depth"])
+    return (FREE_AREA_WEIGHT * metrics["free_ratio"] + OPEN_SQUARE_WEIGHT * metrics["open_square"] ** 2 / room_area
+            - COLLISION_PENALTY * metrics["collisions"]
+            - OUT_OF_BOUNDS_PENALTY * metrics["out_of_bounds"] - UNPLACED_PENALTY * metrics["unplaced"])
+
+def _namespace():
+    return {name: getattr(dsl, name) for name in dir(dsl) if not name.startswith("__")}
+
+# Pickled scene each worker restores before every variant
+_snapshot = None
+
+def _init_worker(snapshot):
+    global _snapshot
+    _snapshot = snapshot
+    dsl.save_enabled = False
+    dsl.command_hooks.clear()  # journals of the live scene must not see scratch runs
+    log.set_level("off")
+
+def _run_variant(args):
+    """Run one variant on a fresh copy of the snapshot scene; returns its result dict."""
+    commands, params, score = args
+    dsl.reset_scene()
+    dsl.scene.update(pickle.loads(_snapshot))
+    result = {"params": params, "commands": format_commands(commands, params)}
+    try:
+        namespace = _namespace()
+        for command in result["commands"]:
+            exec(command, {}, namespace)
+        result.update(scene_metrics())
+        result["score"] = score(result)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["score"] = float("-inf")
+    return result
+
+def explore(commands, grid, top=5, workers=None, score=default_score):
+    """Run every combination of a parameter grid over the current scene and rank the results.
+
+    The live scene, its undo history and the scene file are left untouched.
+
+    Args:
+        commands: DSL command strings with {name} placeholders for the grid parameters
+        grid: {name: [values]} to try; every combination is one variant
+        top: Number of best variants to return (None for all)
+        workers: Worker processes (default the CPU count); 1 runs in this process
+        score: Function of a result's metrics returning a number, higher is better;
+            must be a module-level function to reach worker processes
+
+    Returns:
+        Results sorted best first, each with "params", "commands", "score", the metrics
+        of scene_metrics and "error" if a command raised
+    """
+    if not all([dsl.scene["room_width"], dsl.scene["room_depth"], dsl.scene["room_height"]]):
+        log.error("Room dimensions must be set before exploring variants")
+        return []
+    combinations = expand_grid(grid)
+    snapshot = pickle.dumps({key: value for key, value in dsl.scene.items()})
+    jobs = [(commands, params, score) for params in combinations]
+    workers = min(workers or multiprocessing.cpu_count(), len(jobs))
+    start = time.perf_counter()
+    if workers > 1:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(snapshot,)) as pool:
+            results = pool.map(_run_variant, jobs)
+    else:
+        results = _run_in_process(snapshot, jobs)
+    results.sort(key=lambda result: result["score"], reverse=True)
+    failed = sum("error" in result for result in results)
+    log.info("Explored %s variant(s) in %.2fs on %s worker(s), best score %.2f%s", len(results),
+             time.perf_counter() - start, workers, results[0]["score"] if results else float("nan"),
+             f", {failed} failed" if failed else "")
+    return results if top is None else results[:top]
+
+def _run_in_process(snapshot, jobs):
+    """Run variants here, swapping the live scene and history out and back in."""
+    live_scene = dict(dsl.scene)
+    live_history = {key: list(value) if isinstance(value, list) else value for key, value in dsl.history.items()}
+    live_save, live_level, live_hooks = dsl.save_enabled, log.level, list(dsl.command_hooks)
+    try:
+        _init_worker(snapshot)
+        return [_run_variant(job) for job in jobs]
+    finally:
+        dsl.scene.clear()
+        dsl.scene.update(live_scene)
+        for key, value in live_history.items():
+            if isinstance(value, list):
+                dsl.history[key][:] = value
+            else:
+                dsl.history[key] = value
+        dsl.save_enabled = live_save
+        dsl.command_hooks[:] = live_hooks
+        log.set_level(live_level)
+
+def apply_variant(result):
+    """Run a chosen variant's commands on the live scene (recorded and saved as usual)."""
+    namespace = _namespace()
+    for command in result["commands"]:
+        exec(command, {}, namespace)
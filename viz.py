@@ -1,88 +1,105 @@
+import sys
 import json
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from mpl_toolkits.mplot3d import Axes3D  # Needed for 3D projection, even if unused
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+from geometry import rotated_bounds
+from scene_binary import BinaryScene, load_scene_file
 
-def visualize_scene(json_file):
-    """Visualize the 3D scene from a JSON scene file using Matplotlib, non-blocking."""
-    try:
-        with open(json_file, "r") as f:
-            scene_data = json.load(f)
-    except FileNotFoundError:
-        print(f"[Error] JSON file '{json_file}' not found.")
-        return
-    except json.JSONDecodeError:
-        print(f"[Error] Invalid JSON format in '{json_file}'.")
-        return
+# Corners of a unit box centred on the origin and the 12 edges joining them
+BOX_CORNERS = np.array([
+    [0.5, 0.5, 0.5], [0.5, 0.5, -0.5], [0.5, -0.5, 0.5], [0.5, -0.5, -0.5],
+    [-0.5, 0.5, 0.5], [-0.5, 0.5, -0.5], [-0.5, -0.5, 0.5], [-0.5, -0.5, -0.5]
+])
+BOX_EDGES = np.array([
+    [0, 1], [0, 2], [0, 4], [1, 3], [1, 5], [2, 3],
+    [2, 6], [3, 7], [4, 5], [4, 6], [5, 7], [6, 7]
+])
+
+# Text artists are by far the slowest thing to draw, so large scenes skip labels by default
+MAX_AUTO_LABELS = 200
+
+def box_segments(centers, sizes, rotations):
+    """Build the wireframe edges of N boxes in one vectorized pass.
 
+    Args:
+        centers: (N, 3) array of box centres
+        sizes: (N, 3) array of (width, depth, height)
+        rotations: (N,) array of rotations about z, in degrees
+
+    Returns:
+        (N * 12, 2, 3) array of line segments, ready for a Line3DCollection
+    """
+    centers = np.asarray(centers, dtype=float).reshape(-1, 3)
+    sizes = np.asarray(sizes, dtype=float).reshape(-1, 3)
+    theta = np.radians(np.asarray(rotations, dtype=float).reshape(-1))
+    cos, sin = np.cos(theta)[:, None], np.sin(theta)[:, None]
+
+    local = BOX_CORNERS[None, :, :] * sizes[:, None, :]  # (N, 8, 3)
+    vertices = np.empty_like(local)
+    vertices[..., 0] = local[..., 0] * cos - local[..., 1] * sin
+    vertices[..., 1] = local[..., 0] * sin + local[..., 1] * cos
+    vertices[..., 2] = local[..., 2]
+    vertices += centers[:, None, :]
+
+    return vertices[:, BOX_EDGES].reshape(-1, 2, 3)
+
+def scene_object_arrays(scene_data):
+    """Collect the placed objects of a scene as (descriptions, centers, sizes, rotations).
+
+    Centres are shifted so the room is centred on the origin, matching the room wireframe.
+    """
     room = scene_data.get("room", {})
     room_width = room.get("width", 0)
     room_length = room.get("depth", 0)
-    room_height = room.get("height", 0)
-    if not (room_width and room_length and room_height):
-        print("[Error] Room dimensions missing or invalid in JSON.")
-        return
 
-    # Create figure and 3D axes
-    plt.ion()  # Enable interactive mode for non-blocking
-    fig = plt.figure(figsize=(8, 8))
-    ax = fig.add_subplot(111, projection='3d')
+    if isinstance(scene_data, BinaryScene):
+        centers = scene_data.columns[:3].T.astype(float)
+        placed = ~np.isnan(centers).any(axis=1)
+        for i in np.flatnonzero(~placed).tolist():
+            print(f"[Warning] Skipping {scene_data.descriptions[i]} due to missing coordinates.")
+        centers = centers[placed]
+        sizes = scene_data.columns[3:6].T[placed].astype(float)
+        rotations = scene_data.column("rotation")[placed].astype(float)
+        centers[:, 0] -= room_width / 2
+        centers[:, 1] -= room_length / 2
+        return scene_data.descriptions.take(np.flatnonzero(placed)), centers, sizes, rotations
 
-    # Plot room outline (wireframe)
-    r = [-room_width/2, room_width/2]
-    s = [-room_length/2, room_length/2]
-    t = [0, room_height]
-    for x in r:
-        for y in s:
-            ax.plot3D([x, x], [y, y], t, 'g')
-    for z in t:
-        for x in r:
-            ax.plot3D([x, x], s, [z, z], 'g')
-        for y in s:
-            ax.plot3D(r, [y, y], [z, z], 'g')
-
-    # Plot objects (bounding boxes)
+    placed = []
     for obj in scene_data.get("objects", []):
         if obj["x"] is None or obj["y"] is None or obj["z"] is None:
             print(f"[Warning] Skipping {obj['description']} due to missing coordinates.")
             continue
+        placed.append(obj)
+
+    descriptions = [obj["description"] for obj in placed]
+    centers = np.array([[obj["x"], obj["y"], obj["z"]] for obj in placed], dtype=float).reshape(-1, 3)
+    sizes = np.array([[obj["width"], obj["depth"], obj["height"]] for obj in placed], dtype=float).reshape(-1, 3)
+    rotations = np.array([obj["rotation"] for obj in placed], dtype=float)
+    centers[:, 0] -= room_width / 2
+    centers[:, 1] -= room_length / 2
+    return descriptions, centers, sizes, rotations
 
-        x_center = obj["x"] - room_width / 2
-        y_center = obj["y"] - room_length / 2
-        z_center = obj["z"]
-        width = obj["width"]
-        depth = obj["depth"]
-        height = obj["height"]
-        rotation = obj["rotation"] * (np.pi / 180)
-
-        dx = width / 2
-        dy = depth / 2
-        dz = height / 2
-        vertices = np.array([
-            [dx, dy, dz], [dx, dy, -dz], [dx, -dy, dz], [dx, -dy, -dz],
-            [-dx, dy, dz], [-dx, dy, -dz], [-dx, -dy, dz], [-dx, -dy, -dz]
-        ])
-
-        rot_matrix = np.array([
-            [np.cos(rotation), -np.sin(rotation), 0],
-            [np.sin(rotation), np.cos(rotation), 0],
-            [0, 0, 1]
-        ])
-        vertices = vertices @ rot_matrix.T
-        vertices += [x_center, y_center, z_center]
-
-        edges = [
-            [0, 1], [0, 2], [0, 4], [1, 3], [1, 5], [2, 3],
-            [2, 6], [3, 7], [4, 5], [4, 6], [5, 7], [6, 7]
-        ]
-
-        for edge in edges:
-            x = vertices[edge, 0]
-            y = vertices[edge, 1]
-            z = vertices[edge, 2]
-            ax.plot3D(x, y, z, 'r')
-
-        ax.text(x_center, y_center, z_center, obj["description"], color='black')
+def _draw_scene(ax, scene_data, labels=None):
+    """Draw the room wireframe and all object boxes onto a 3D axes."""
+    room = scene_data["room"]
+    room_width, room_length, room_height = room["width"], room["depth"], room["height"]
+
+    # Room outline (wireframe) as a single collection
+    room_segments = box_segments([[0, 0, room_height / 2]], [[room_width, room_length, room_height]], [0])
+    ax.add_collection3d(Line3DCollection(room_segments, colors='g'))
+
+    # Objects (bounding boxes) as a single collection
+    descriptions, centers, sizes, rotations = scene_object_arrays(scene_data)
+    if descriptions:
+        ax.add_collection3d(Line3DCollection(box_segments(centers, sizes, rotations), colors='r'))
+        if labels is None:
+            labels = len(descriptions) <= MAX_AUTO_LABELS
+        if labels:
+            for description, (x_center, y_center, z_center) in zip(descriptions, centers):
+                ax.text(x_center, y_center, z_center, description, color='black')
 
     ax.set_xlabel('X (Width)')
     ax.set_ylabel('Y (Length)')
@@ -90,15 +107,210 @@ def visualize_scene(json_file):
     ax.set_title('3D Scene Visualization')
 
     max_range = max(room_width, room_length, room_height) * 1.5
+    if descriptions:
+        # Widen the view so objects pushed outside the room stay visible
+        min_x, max_x, min_y, max_y = rotated_bounds(centers[:, 0], centers[:, 1], sizes[:, 0], sizes[:, 1], rotations)
+        reach = max(np.abs(min_x).max(), np.abs(max_x).max(), np.abs(min_y).max(), np.abs(max_y).max())
+        max_range = max(max_range, 2 * reach)
     ax.set_xlim(-max_range/2, max_range/2)
     ax.set_ylim(-max_range/2, max_range/2)
     ax.set_zlim(0, max_range)
 
-    # Draw and pause briefly to show the plot, then close
+def load_scene_data(json_file):
+    """Read a scene file (JSON, or binary as a BinaryScene), returning None (with a message)
+    if it is missing or invalid."""
+    try:
+        scene_data = load_scene_file(json_file)
+    except FileNotFoundError:
+        print(f"[Error] JSON file '{json_file}' not found.")
+        return None
+    except json.JSONDecodeError:
+        print(f"[Error] Invalid JSON format in '{json_file}'.")
+        return None
+    except ValueError as e:
+        print(f"[Error] {e}")
+        return None
+
+    room = scene_data.get("room", {})
+    if not (room.get("width", 0) and room.get("depth", 0) and room.get("height", 0)):
+        print("[Error] Room dimensions missing or invalid in JSON.")
+        return None
+    return scene_data
+
+def visualize_scene(json_file, output_file=None, pause=20, labels=None):
+    """Visualize the 3D scene from a JSON scene file using Matplotlib.
+
+    Args:
+        json_file: Path to the scene JSON file
+        output_file: If given, render headlessly to this image file (e.g. PNG) instead of
+            opening a window; no pause is made and the figure is discarded afterwards
+        pause: Seconds to keep the interactive window responsive (default 20)
+        labels: Draw object descriptions next to each box (default None: only when the
+            scene has at most MAX_AUTO_LABELS objects)
+    """
+    scene_data = load_scene_data(json_file)
+    if scene_data is None:
+        return None
+
+    if output_file:
+        # Non-interactive: a bare Figure never touches pyplot's window manager
+        fig = Figure(figsize=(8, 8))
+        ax = fig.add_subplot(111, projection='3d')
+        _draw_scene(ax, scene_data, labels)
+        fig.savefig(output_file)
+        return output_file
+
+    # Create figure and 3D axes
+    plt.ion()  # Enable interactive mode for non-blocking
+    fig = plt.figure(figsize=(8, 8))
+    ax = fig.add_subplot(111, projection='3d')
+    _draw_scene(ax, scene_data, labels)
+
+    # Draw and pause briefly to show the plot
     plt.draw()
-    
-    plt.pause(20)  # Show plot for 2 seconds
+
+    plt.pause(pause)  # Keep the window responsive for `pause` seconds
     # plt.close(fig)  # Close to allow input
+    return fig
+
+class SceneVisualizer:
+    """Persistent 3D view of a scene that only redraws what changed between frames.
+
+    One figure is kept for the whole session, with one Line3DCollection (and label) per
+    object keyed by description. Each update diffs the new scene against the previous
+    frame: moved or resized objects get new segments, removed objects lose their artists
+    and new objects get fresh ones. Nothing else is touched.
+
+    Args:
+        interactive: Draw into a pyplot window (False renders off-screen for save())
+        pause: Seconds to pause after each interactive redraw
+        labels: Draw object descriptions next to each box (default None: only while the
+            scene has at most MAX_AUTO_LABELS objects)
+    """
+
+    def __init__(self, interactive=True, pause=0.5, labels=None):
+        self.interactive = interactive
+        self.pause = pause
+        self.labels = labels
+        self.showing_labels = False
+        if interactive:
+            plt.ion()
+            self.fig = plt.figure(figsize=(8, 8))
+        else:
+            self.fig = Figure(figsize=(8, 8))
+        self.ax = self.fig.add_subplot(111, projection='3d')
+        self.ax.set_xlabel('X (Width)')
+        self.ax.set_ylabel('Y (Length)')
+        self.ax.set_zlabel('Z (Height)')
+        self.ax.set_title('3D Scene Visualization')
+        self.room = None
+        self.room_artist = None
+        self.artists = {}  # description -> (collection, label or None)
+        self.geometry = {}  # description -> geometry tuple drawn last frame
+
+    def _set_room(self, room):
+        room_key = (room["width"], room["depth"], room["height"])
+        if room_key == self.room:
+            return
+        room_width, room_length, room_height = room_key
+        segments = box_segments([[0, 0, room_height / 2]], [[room_width, room_length, room_height]], [0])
+        if self.room_artist is None:
+            self.room_artist = Line3DCollection(segments, colors='g')
+            self.ax.add_collection3d(self.room_artist)
+        else:
+            self.room_artist.set_segments(segments)
+        max_range = max(room_key) * 1.5
+        self.ax.set_xlim(-max_range/2, max_range/2)
+        self.ax.set_ylim(-max_range/2, max_range/2)
+        self.ax.set_zlim(0, max_range)
+        self.room = room_key
+
+    def _remove(self, description):
+        collection, label = self.artists.pop(description)
+        collection.remove()
+        if label is not None:
+            label.remove()
+        del self.geometry[description]
+
+    def _set_labels(self, labels, current):
+        """Add or remove the labels of the objects already drawn."""
+        for description, (collection, label) in self.artists.items():
+            if label is not None:
+                label.remove()
+                label = None
+            if labels:
+                x_center, y_center, z_center = current.get(description, self.geometry[description])[0]
+                label = self.ax.text(x_center, y_center, z_center, description, color='black')
+            self.artists[description] = (collection, label)
+        self.showing_labels = labels
+
+    def update(self, scene):
+        """Bring the view in line with a scene file path or scene dictionary.
+
+        Returns:
+            (added, changed, removed) counts for this frame
+        """
+        scene_data = load_scene_data(scene) if isinstance(scene, str) else scene
+        if scene_data is None:
+            return 0, 0, 0
+        self._set_room(scene_data["room"])
+
+        descriptions, centers, sizes, rotations = scene_object_arrays(scene_data)
+        current = {}
+        for i, description in enumerate(descriptions):
+            current[description] = (tuple(centers[i]), tuple(sizes[i]), rotations[i])
+
+        removed = [description for description in self.geometry if description not in current]
+        for description in removed:
+            self._remove(description)
+
+        labels = self.labels if self.labels is not None else len(descriptions) <= MAX_AUTO_LABELS
+        if labels != self.showing_labels:
+            self._set_labels(labels, current)
+
+        dirty = [i for i, description in enumerate(descriptions)
+                 if self.geometry.get(description) != current[description]]
+        added = 0
+        if dirty:
+            # All changed boxes are still built in one vectorized pass
+            segments = box_segments(centers[dirty], sizes[dirty], rotations[dirty]).reshape(len(dirty), 12, 2, 3)
+            for k, i in enumerate(dirty):
+                description = descriptions[i]
+                x_center, y_center, z_center = centers[i]
+                if description in self.artists:
+                    collection, label = self.artists[description]
+                    collection.set_segments(segments[k])
+                    if label is not None:
+                        label.set_position_3d((x_center, y_center, z_center))
+                else:
+                    collection = Line3DCollection(segments[k], colors='r')
+                    self.ax.add_collection3d(collection)
+                    label = None
+                    if labels:
+                        label = self.ax.text(x_center, y_center, z_center, description, color='black')
+                    self.artists[description] = (collection, label)
+                    added += 1
+                self.geometry[description] = current[description]
+
+        if self.interactive:
+            self.fig.canvas.draw_idle()
+            plt.pause(self.pause)
+        return added, len(dirty) - added, len(removed)
+
+    def save(self, output_file):
+        """Write the current frame to an image file."""
+        self.fig.savefig(output_file)
+        return output_file
+
+    def close(self):
+        """Release the figure; the visualizer must not be used afterwards."""
+        if self.interactive:
+            plt.close(self.fig)
+        self.artists.clear()
+        self.geometry.clear()
 
 
-visualize_scene('scene_state.json')
\ No newline at end of file
+if __name__ == "__main__":
+    # Usage: python viz.py [scene_state.json] [output.png]
+    visualize_scene(sys.argv[1] if len(sys.argv) > 1 else 'scene_state.json',
+                    sys.argv[2] if len(sys.argv) > 2 else None)